@@ -1,8 +1,10 @@
 """
 Aura Backend - FastAPI Application
 """
+import logging
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
+from typing import Any
 
 import uvicorn
 from fastapi import FastAPI
@@ -10,37 +12,145 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 
 from src.config.env import settings
-from src.config.supabase import supabase_client
+from src.config.supabase import admin_client, supabase_client
 from src.middleware.auth import AuthMiddleware
+from src.middleware.deadline import DeadlineMiddleware
+from src.middleware.disconnect import DisconnectMiddleware
 from src.middleware.error_handler import ErrorHandlerMiddleware
+from src.middleware.metrics import MetricsMiddleware
+from src.middleware.rate_limit import RateLimitMiddleware
 from src.routes import api_router
+from src.services.algorithm import algorithm_client
+from src.services.avatar import avatar_cache
+from src.services.background import background_tasks
+from src.services.cache import service_cache
+from src.services.rate_limit import rate_limiter
+from src.services.realtime import realtime_hub
+from src.services.recompute import recompute_sweeper
+from src.services.retention import analysis_retention
+from src.services.scheduler import algorithm_scheduler
+from src.utils.log import RequestIdMiddleware, configure_logging, shutdown_logging
+from src.utils.metrics import instrument_postgrest, loop_lag_monitor
+from src.utils.tracing import (
+    TracedMiddleware,
+    TracingMiddleware,
+    configure_tracing,
+    trace_postgrest,
+)
+from src.utils.watchdog import (
+    WatchdogRouteMiddleware,
+    blocking_watchdog,
+    track_postgrest,
+)
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """Application lifespan manager"""
     # Startup
-    print("🚀 Starting Aura Backend Server...")
-    print(f"🌐 Environment: {settings.ENVIRONMENT}")
-    print(f"📊 Supabase URL: {settings.SUPABASE_URL}")
+    configure_logging()
+    logger.info("Starting Aura Backend Server...")
+    logger.info("Environment: %s", settings.ENVIRONMENT)
+    logger.info("Supabase URL: %s", settings.SUPABASE_URL)
+
+    if settings.PROMETHEUS_METRICS:
+        try:
+            instrument_postgrest(supabase_client)
+            instrument_postgrest(admin_client)
+        except Exception as e:
+            logger.warning("PostgREST metrics warning: %s", e)
+        loop_lag_monitor.start()
+
+    if settings.TRACING_ENABLED:
+        try:
+            trace_postgrest(supabase_client)
+            trace_postgrest(admin_client)
+        except Exception as e:
+            logger.warning("PostgREST tracing warning: %s", e)
+
+    if settings.BLOCKING_WATCHDOG_ENABLED:
+        try:
+            track_postgrest(supabase_client)
+            track_postgrest(admin_client)
+        except Exception as e:
+            logger.warning("Blocking watchdog warning: %s", e)
+        blocking_watchdog.start()
 
     # Test Supabase connection
     try:
         # Simple health check for Supabase
         supabase_client.table('profiles').select('count').limit(1).execute()
-        print("✅ Supabase connection successful")
+        logger.info("Supabase connection successful")
     except Exception as e:
-        print(f"⚠️  Supabase connection warning: {e}")
+        logger.warning("Supabase connection warning: %s", e)
+
+    # Warm avatar cache and compile greeting templates
+    try:
+        await avatar_cache.load()
+        logger.info("Avatar cache loaded (%s avatars)", len(avatar_cache.all()))
+    except Exception as e:
+        logger.warning("Avatar cache warning: %s", e)
+
+    # Connect the shared service cache
+    try:
+        await service_cache.start()
+        logger.info("Service cache started")
+        if service_cache.redis is not None:
+            # Share rate limit state between instances
+            rate_limiter.use_redis(service_cache.redis)
+    except Exception as e:
+        logger.warning("Service cache warning: %s", e)
+
+    # Start realtime fan-out hub
+    try:
+        await realtime_hub.start()
+        logger.info("Realtime hub started")
+    except Exception as e:
+        logger.warning("Realtime hub warning: %s", e)
+
+    # Learn the deployed algorithm version before stamping results
+    try:
+        version = await algorithm_client.refresh_version()
+        logger.info("Algorithm service version %s", version)
+    except Exception as e:
+        logger.warning("Algorithm version warning: %s", e)
+
+    # Schedule profile analysis history compaction
+    analysis_retention.start()
+
+    # Schedule re-computation of results from older algorithm versions
+    recompute_sweeper.start()
 
     yield
 
     # Shutdown
-    print("🔻 Shutting down Aura Backend Server...")
+    logger.info("Shutting down Aura Backend Server...")
+    await recompute_sweeper.stop()
+    await analysis_retention.stop()
+    await background_tasks.shutdown()
+    await realtime_hub.stop()
+    await service_cache.stop()
+    await loop_lag_monitor.stop()
+    blocking_watchdog.stop()
+    shutdown_logging()
+
+
+def add_middleware(app: FastAPI, middleware: type, **options: Any) -> None:
+    """Add a middleware, wrapped in its own span when tracing is enabled"""
+    if settings.TRACING_ENABLED:
+        app.add_middleware(TracedMiddleware, middleware=middleware, **options)
+    else:
+        app.add_middleware(middleware, **options)
 
 
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application"""
 
+    if settings.TRACING_ENABLED:
+        configure_tracing()
+
     app = FastAPI(
         title="Aura Backend API",
         description="Backend API for Aura astrology and fortune telling app",
@@ -51,7 +161,8 @@ def create_app() -> FastAPI:
     )
 
     # CORS Middleware
-    app.add_middleware(
+    add_middleware(
+        app,
         CORSMiddleware,
         allow_origins=settings.CORS_ORIGINS,
         allow_credentials=True,
@@ -60,14 +171,39 @@ def create_app() -> FastAPI:
     )
 
     # Security Middleware
-    app.add_middleware(
+    add_middleware(
+        app,
         TrustedHostMiddleware,
         allowed_hosts=["*"] if settings.ENVIRONMENT == "development" else ["localhost", "127.0.0.1"]
     )
 
-    # Custom Middleware
-    app.add_middleware(AuthMiddleware)
-    app.add_middleware(ErrorHandlerMiddleware)
+    # Custom Middleware (the limiter runs inside auth to see the user)
+    if settings.RATE_LIMITING_ENABLED:
+        add_middleware(app, RateLimitMiddleware)
+    add_middleware(app, AuthMiddleware)
+    add_middleware(app, ErrorHandlerMiddleware)
+
+    # Stop work for clients that went away
+    add_middleware(app, DisconnectMiddleware)
+
+    # Request ids for log records (and the algorithm service)
+    add_middleware(app, RequestIdMiddleware)
+
+    # Lets the blocking watchdog name the request it caught
+    if settings.BLOCKING_WATCHDOG_ENABLED:
+        add_middleware(app, WatchdogRouteMiddleware)
+
+    # Outside everything but tracing and metrics, so the deadline covers the
+    # whole request
+    add_middleware(app, DeadlineMiddleware)
+
+    # Server span per request, continuing the caller's trace
+    if settings.TRACING_ENABLED:
+        app.add_middleware(TracingMiddleware)
+
+    # Serves /metrics and times every request
+    if settings.PROMETHEUS_METRICS:
+        app.add_middleware(MetricsMiddleware)
 
     # Routes
     app.include_router(api_router, prefix="/api/v1")
@@ -81,6 +217,11 @@ def create_app() -> FastAPI:
             "version": "1.0.0"
         }
 
+    @app.get("/health/algorithm")
+    async def algorithm_health() -> dict[str, Any]:
+        """Algorithm call concurrency, queue depth and wait times (authenticated)"""
+        return algorithm_scheduler.metrics()
+
     return app
 
 
@@ -0,0 +1,151 @@
+"""
+initiate_chat Latency Benchmark
+
+Measures end-to-end ChatService.initiate_chat latency against the mock
+algorithm service (in-process by default, or a running instance via
+--algorithm-url) and a fake PostgREST client that blocks for a fixed
+round-trip time per query, like the synchronous Supabase client does.
+
+Usage:
+    python scripts/bench_initiate_chat.py --iterations 50 --db-latency 0.03
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+from uuid import uuid4
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scripts.mock_algorithm_service import app as mock_algorithm_app  # noqa: E402
+from src.services.algorithm import AlgorithmClient  # noqa: E402
+from src.services.avatar import AvatarCache  # noqa: E402
+from src.services.chat import ChatService  # noqa: E402
+from src.types.database import ChatInitiateRequest  # noqa: E402
+
+AVATAR_ID = str(uuid4())
+
+
+class FakeResponse:
+    def __init__(self, data: list[dict[str, Any]]) -> None:
+        self.data = data
+        self.count = None
+
+
+class FakeQuery:
+    """Blocking query builder that sleeps for one PostgREST round trip"""
+
+    def __init__(self, table: str, latency: float) -> None:
+        self.table = table
+        self.latency = latency
+        self.payload: dict[str, Any] | None = None
+
+    def insert(self, payload: dict[str, Any]) -> "FakeQuery":
+        self.payload = payload
+        return self
+
+    def select(self, *args: Any, **kwargs: Any) -> "FakeQuery":
+        return self
+
+    def delete(self) -> "FakeQuery":
+        return self
+
+    def eq(self, *args: Any) -> "FakeQuery":
+        return self
+
+    def execute(self) -> FakeResponse:
+        time.sleep(self.latency)
+        now = datetime.now().isoformat()
+
+        if self.table == "avatars":
+            return FakeResponse(
+                [
+                    {
+                        "id": AVATAR_ID,
+                        "name": "星语者·小满",
+                        "initial_dialogue_prompt": "你好呀，我是小满~✨",
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                ]
+            )
+
+        row = {"id": str(uuid4()), "created_at": now, "updated_at": now}
+        if self.table == "chat_messages":
+            row.update({"timestamp": now, "message_type": "text"})
+        return FakeResponse([{**row, **(self.payload or {})}])
+
+
+class FakeClient:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(name, self.latency)
+
+
+async def run(args: argparse.Namespace) -> None:
+    db_client = FakeClient(args.db_latency)
+
+    if args.algorithm_url:
+        algorithm = AlgorithmClient()
+        algorithm_url = args.algorithm_url
+    else:
+        algorithm = AlgorithmClient(
+            transport=httpx.ASGITransport(app=mock_algorithm_app)  # type: ignore[arg-type]
+        )
+        algorithm_url = "http://mock-algorithm"
+
+    avatar_cache = AvatarCache(db_client=db_client)
+    await avatar_cache.load()
+
+    service = ChatService(
+        db_client=db_client,  # type: ignore[arg-type]
+        auth_client=None,  # type: ignore[arg-type]
+        algorithm=algorithm,
+    )
+    request = ChatInitiateRequest(avatar_id=AVATAR_ID)  # type: ignore[arg-type]
+
+    with patch("src.services.chat.avatar_cache", avatar_cache), patch(
+        "src.services.chat.settings.ALGORITHM_SERVICE_URL", algorithm_url
+    ), patch("src.services.chat.settings.CHAT_GREETING_TIMEOUT", 30.0):
+        # Warm up connections
+        await service.initiate_chat(str(uuid4()), request)
+
+        latencies = []
+        for _ in range(args.iterations):
+            started = time.perf_counter()
+            await service.initiate_chat(str(uuid4()), request)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    latencies.sort()
+    print(
+        f"initiate_chat x{args.iterations} "
+        f"(db {args.db_latency * 1000:.0f}ms/query): "
+        f"mean {statistics.mean(latencies):.1f}ms "
+        f"p50 {latencies[len(latencies) // 2]:.1f}ms "
+        f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.1f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument(
+        "--db-latency", type=float, default=0.03, help="Seconds per PostgREST call"
+    )
+    parser.add_argument(
+        "--algorithm-url", default="", help="Use a running mock algorithm service"
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
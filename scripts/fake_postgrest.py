@@ -0,0 +1,402 @@
+"""
+Fake PostgREST for Benchmarks
+
+In-memory stand-in for the Supabase REST and auth APIs, installed as the
+transport of the synchronous httpx sessions the Supabase clients use, so
+the real query builders, response parsing and session event hooks all run.
+Every call blocks the calling thread for a sampled round trip (log-normal
+around ``latency``, plus ``row_cost`` per row returned), just as a real
+PostgREST call blocks the event loop it is made from. Database-side
+contention is not modelled.
+
+Supports the PostgREST subset the services use: select lists with embedded
+to-one relations, eq/neq/gt/gte/lt/lte/is/in filters, or/and groups,
+order, limit/offset, counts, single-object responses, insert, upsert,
+update, delete and rpc, plus the triggers that maintain the denormalized
+session and profile columns. ``GET /auth/v1/user`` accepts any bearer
+token and uses it as the user id.
+"""
+import json
+import random
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from datetime import date, datetime
+from typing import Any
+from uuid import uuid4
+
+import httpx
+
+SINGLE_OBJECT = "application/vnd.pgrst.object+json"
+
+# Column defaults from supabase/migrations
+TABLE_DEFAULTS: dict[str, dict[str, Callable[[], Any]]] = {
+    "profiles": {
+        "analysis_completed": lambda: False,
+        "latest_analysis_id": lambda: None,
+    },
+    "chat_sessions": {
+        "session_start_time": lambda: _now(),
+        "last_message_at": lambda: _now(),
+        "is_active": lambda: True,
+        "message_count": lambda: 0,
+        "unread_count": lambda: 0,
+        "last_message_preview": lambda: None,
+    },
+    "chat_messages": {
+        "timestamp": lambda: _now(),
+        "message_type": lambda: "text",
+        "related_data": lambda: None,
+    },
+    "daily_fortunes": {"generated_at": lambda: _now(), "is_pushed": lambda: False},
+    "compatibility_analysis_results": {
+        "analysis_date": lambda: date.today().isoformat()
+    },
+}
+
+# Tables keyed on something other than a generated id
+PRIMARY_KEYS = {"birth_charts": ("chart_key", "algorithm_version")}
+
+# (table, embedded table) -> foreign key column on ``table``
+RELATIONS = {
+    ("profiles", "avatars"): "selected_avatar_id",
+    ("chat_sessions", "avatars"): "avatar_id",
+    ("compatibility_analysis_results", "other_profiles"): "other_profile_id",
+}
+
+OPERATIONS = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "gt": lambda a, b: a > b,
+    "gte": lambda a, b: a >= b,
+    "lt": lambda a, b: a < b,
+    "lte": lambda a, b: a <= b,
+}
+
+_RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+def _split(text: str) -> list[str]:
+    """Split on top-level commas (outside parentheses and quotes)"""
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    if current:
+        parts.append(current)
+    return [part.strip() for part in parts]
+
+
+def _coerce(stored: Any, raw: str) -> Any:
+    """Filter value converted to the type of the stored value"""
+    raw = raw.strip('"')
+    if isinstance(stored, bool):
+        return raw == "true"
+    if isinstance(stored, int | float):
+        try:
+            return float(raw)
+        except ValueError:
+            return raw
+    return raw
+
+
+def _compare(stored: Any, op: str, raw: str) -> bool:
+    if op == "is":
+        expected = {"null": None, "true": True, "false": False}[raw]
+        return stored is expected
+    if op == "in":
+        values = [value.strip('"') for value in _split(raw.strip("()"))]
+        return str(stored) in values
+    if stored is None:
+        return False
+    value = _coerce(stored, raw)
+    if isinstance(stored, int | float) and not isinstance(stored, bool):
+        stored = float(stored)
+    elif not isinstance(stored, bool):
+        stored = str(stored)
+    return bool(OPERATIONS[op](stored, value))
+
+
+def _condition(column: str, expression: str) -> Callable[[dict[str, Any]], bool]:
+    """Predicate for ``column=op.value`` (optionally ``not.op.value``)"""
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, raw = expression.partition(".")
+
+    def check(row: dict[str, Any]) -> bool:
+        return _compare(row.get(column), op, raw) != negate
+
+    return check
+
+
+def _logical(kind: str, body: str) -> Callable[[dict[str, Any]], bool]:
+    """Predicate for an ``or=(...)``/``and=(...)`` group"""
+    terms = []
+    for term in _split(body.strip()[1:-1]):
+        if term.startswith(("and(", "or(")):
+            name, _, rest = term.partition("(")
+            terms.append(_logical(name, "(" + rest))
+        else:
+            column, _, expression = term.partition(".")
+            terms.append(_condition(column, expression))
+    combine = any if kind == "or" else all
+    return lambda row: combine(term(row) for term in terms)
+
+
+class FakePostgrest(httpx.BaseTransport):
+    """In-memory PostgREST and GoTrue served from an httpx transport"""
+
+    def __init__(
+        self,
+        latency: float = 0.01,
+        jitter: float = 0.3,
+        row_cost: float = 0.00002,
+        seed: int = 0,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.row_cost = row_cost
+        self.tables: dict[str, list[dict[str, Any]]] = {}
+        self.rpc: dict[str, Callable[[dict[str, Any]], Any]] = {
+            "compact_user_profiles_analysis": lambda params: 0,
+        }
+        self.calls: Counter[str] = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def install(self, *clients: Any) -> None:
+        """Route the REST and auth calls of Supabase clients to this fake"""
+        for client in clients:
+            client.postgrest.session._transport = self
+            client.auth._http_client._transport = self
+
+    def seed(self, table: str, rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Insert rows directly (no latency, no call counted)"""
+        with self._lock:
+            return [self._insert(table, dict(row)) for row in rows]
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path.startswith("/auth/v1/"):
+            response = self._auth(request)
+            rows = 1
+        else:
+            _, _, resource = path.partition("/rest/v1/")
+            with self._lock:
+                response, rows = self._rest(request, resource)
+            self.calls[f"{request.method} {resource}"] += 1
+        time.sleep(self._delay(rows))
+        return response
+
+    def _delay(self, rows: int) -> float:
+        with self._lock:
+            factor = self._rng.lognormvariate(0, self.jitter) if self.jitter else 1
+        return self.latency * factor + self.row_cost * rows
+
+    def _auth(self, request: httpx.Request) -> httpx.Response:
+        token = request.headers.get("authorization", "").removeprefix("Bearer ")
+        if request.url.path != "/auth/v1/user" or not token:
+            return httpx.Response(401, json={"msg": "Invalid token"})
+        self.calls["GET auth/user"] += 1
+        return httpx.Response(
+            200,
+            json={
+                "id": token,
+                "aud": "authenticated",
+                "role": "authenticated",
+                "email": f"{token}@bench.local",
+                "app_metadata": {},
+                "user_metadata": {},
+                "created_at": "2025-01-01T00:00:00Z",
+            },
+        )
+
+    # PostgREST
+
+    def _rest(
+        self, request: httpx.Request, resource: str
+    ) -> tuple[httpx.Response, int]:
+        if resource.startswith("rpc/"):
+            handler = self.rpc.get(resource[4:])
+            if handler is None:
+                return httpx.Response(404, json={"message": "Unknown function"}), 0
+            return httpx.Response(200, json=handler(json.loads(request.content))), 1
+
+        params = request.url.params
+        prefer = request.headers.get("prefer", "")
+        table = self.tables.setdefault(resource, [])
+        matches = [row for row in table if self._matches(row, params)]
+
+        if request.method in ("GET", "HEAD"):
+            rows = self._order(matches, params.get("order"))
+            offset = int(params.get("offset", 0))
+            limit = params.get("limit")
+            total = len(rows)
+            rows = rows[offset : offset + int(limit) if limit else None]
+            status = 200
+        elif request.method == "POST":
+            payload = json.loads(request.content)
+            items = payload if isinstance(payload, list) else [payload]
+            if "resolution=merge-duplicates" in prefer:
+                rows = [
+                    self._upsert(resource, item, params.get("on_conflict"))
+                    for item in items
+                ]
+            else:
+                rows = [self._insert(resource, item) for item in items]
+            total, status = len(rows), 201
+        elif request.method == "PATCH":
+            changes = json.loads(request.content)
+            for row in matches:
+                row.update(changes, updated_at=_now())
+            rows, total, status = matches, len(matches), 200
+        elif request.method == "DELETE":
+            deleted = {id(row) for row in matches}
+            self.tables[resource] = [row for row in table if id(row) not in deleted]
+            rows, total, status = matches, len(matches), 200
+        else:
+            return httpx.Response(405), 0
+
+        rows = [self._project(resource, row, params.get("select", "*")) for row in rows]
+        rows = [row for row in rows if row is not None]
+
+        headers = {}
+        if "count=" in prefer:
+            returned = f"0-{len(rows) - 1}" if rows else "*"
+            headers["content-range"] = f"{returned}/{total}"
+        if request.method != "GET" and "return=representation" not in prefer:
+            return httpx.Response(status, headers=headers), 0
+
+        if request.headers.get("accept") == SINGLE_OBJECT:
+            if len(rows) != 1:
+                return httpx.Response(406, json={"code": "PGRST116"}), 0
+            return httpx.Response(status, json=rows[0], headers=headers), 1
+        return httpx.Response(status, json=rows, headers=headers), len(rows)
+
+    @staticmethod
+    def _matches(row: dict[str, Any], params: httpx.QueryParams) -> bool:
+        for column, expression in params.multi_items():
+            if column in _RESERVED_PARAMS:
+                continue
+            if column in ("or", "and"):
+                if not _logical(column, expression)(row):
+                    return False
+            elif not _condition(column, expression)(row):
+                return False
+        return True
+
+    @staticmethod
+    def _order(rows: list[dict[str, Any]], order: str | None) -> list[dict[str, Any]]:
+        rows = list(rows)
+        for term in reversed(_split(order or "")):
+            column, _, direction = term.partition(".")
+            rows.sort(
+                key=lambda row: (
+                    row.get(column) is None,
+                    row.get(column) if row.get(column) is not None else 0,
+                ),
+                reverse=direction.startswith("desc"),
+            )
+        return rows
+
+    def _project(
+        self, table: str, row: dict[str, Any], select: str
+    ) -> dict[str, Any] | None:
+        """Row restricted to a select list; None when an inner embed is empty"""
+        result: dict[str, Any] = {}
+        for item in _split(select):
+            alias = ""
+            if ":" in item.split("(", 1)[0]:
+                alias, _, item = item.partition(":")
+            if "(" not in item:
+                if item == "*":
+                    result.update(row)
+                else:
+                    result[alias or item] = row.get(item)
+                continue
+
+            target, _, columns = item.partition("(")
+            target, *hints = target.split("!")
+            related = self._related(table, target, row)
+            if related is None and "inner" in hints:
+                return None
+            result[alias or target] = (
+                self._project(target, related, columns[:-1])
+                if related is not None
+                else None
+            )
+        return result
+
+    def _related(
+        self, table: str, target: str, row: dict[str, Any]
+    ) -> dict[str, Any] | None:
+        foreign_key = RELATIONS.get((table, target))
+        if foreign_key is None or row.get(foreign_key) is None:
+            return None
+        return next(
+            (
+                other
+                for other in self.tables.get(target, [])
+                if str(other.get("id")) == str(row[foreign_key])
+            ),
+            None,
+        )
+
+    def _insert(self, table: str, item: dict[str, Any]) -> dict[str, Any]:
+        now = _now()
+        row: dict[str, Any] = {"created_at": now, "updated_at": now}
+        if table not in PRIMARY_KEYS:
+            row["id"] = str(uuid4())
+        for column, default in TABLE_DEFAULTS.get(table, {}).items():
+            row[column] = default()
+        row.update(item)
+        self.tables.setdefault(table, []).append(row)
+        self._after_insert(table, row)
+        return row
+
+    def _upsert(
+        self, table: str, item: dict[str, Any], on_conflict: str | None
+    ) -> dict[str, Any]:
+        keys = (
+            tuple(on_conflict.split(","))
+            if on_conflict
+            else PRIMARY_KEYS.get(table, ("id",))
+        )
+        for row in self.tables.setdefault(table, []):
+            if all(str(row.get(key)) == str(item.get(key)) for key in keys):
+                row.update(item, updated_at=_now())
+                return row
+        return self._insert(table, item)
+
+    def _after_insert(self, table: str, row: dict[str, Any]) -> None:
+        """The triggers from supabase/migrations"""
+        if table == "chat_messages":
+            for session in self.tables.get("chat_sessions", []):
+                if session["id"] == row["session_id"]:
+                    if row["timestamp"] >= session["last_message_at"]:
+                        session["last_message_preview"] = row["content"][:120]
+                        session["last_message_at"] = row["timestamp"]
+                    session["message_count"] += 1
+                    session["unread_count"] = (
+                        session["unread_count"] + 1 if row["sender_type"] == "ai" else 0
+                    )
+        elif table == "user_profiles_analysis":
+            for profile in self.tables.get("profiles", []):
+                if profile["id"] == row["user_id"]:
+                    profile["analysis_completed"] = True
+                    profile["latest_analysis_id"] = row["id"]
@@ -0,0 +1,591 @@
+"""
+End-to-End Load Benchmark
+
+Drives the whole application over HTTP, middleware stack included, with a
+fixed mix of simulated users. Each user runs scripted journeys (onboarding,
+chat, fortune, compatibility) chosen by weight from a seeded generator, so
+the same arguments always produce the same request sequence. The app runs
+under uvicorn against the mock algorithm service (in-process, or a running
+instance via --algorithm-url) and the in-process fake PostgREST from
+scripts/fake_postgrest.py, which injects a sampled round trip per query.
+
+Reports throughput and p50/p95/p99 latency per endpoint and writes them as
+JSON, so runs on different commits can be compared:
+
+Usage:
+    python scripts/load_benchmark.py --mix default --users 20 --journeys 10 \\
+        --output bench/$(git rev-parse --short HEAD).json
+    python scripts/load_benchmark.py --baseline bench/<older commit>.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+from uuid import UUID
+
+import httpx
+import uvicorn
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from scripts import mock_algorithm_service  # noqa: E402
+from scripts.fake_postgrest import FakePostgrest  # noqa: E402
+from src.config.env import settings  # noqa: E402
+from src.config.supabase import admin_client, supabase_client  # noqa: E402
+
+API_PREFIX = "/api/v1"
+
+# Journey weights per mix
+MIXES: dict[str, dict[str, int]] = {
+    "default": {"chat": 50, "fortune": 25, "compatibility": 15, "onboarding": 10},
+    "onboarding": {"onboarding": 1},
+    "chat": {"chat": 1},
+    "fortune": {"fortune": 1},
+    "compatibility": {"compatibility": 1},
+}
+
+CITIES = [("北京市", 116.4074, 39.9042), ("上海市", 121.4737, 31.2304)]
+
+
+class Recorder:
+    """Latency samples and error counts per endpoint (method + route)"""
+
+    def __init__(self) -> None:
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter[str] = Counter()
+        self.recording = False
+
+    def add(self, endpoint: str, seconds: float, ok: bool) -> None:
+        if not self.recording:
+            return
+        self.samples[endpoint].append(seconds)
+        if not ok:
+            self.errors[endpoint] += 1
+
+
+class VirtualUser:
+    """A simulated client with an onboarded account and a long chat session"""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        recorder: Recorder,
+        rng: random.Random,
+        user_id: str,
+        session_id: str,
+        avatar_ids: list[str],
+        think_time: float,
+    ) -> None:
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.user_id = user_id
+        self.session_id = session_id
+        self.avatar_ids = avatar_ids
+        self.think_time = think_time
+
+    def new_id(self) -> str:
+        return str(UUID(int=self.rng.getrandbits(128), version=4))
+
+    def birth_info(self) -> dict[str, Any]:
+        location, longitude, latitude = self.rng.choice(CITIES)
+        return {
+            "year": self.rng.randint(1970, 2005),
+            "month": self.rng.randint(1, 12),
+            "day": self.rng.randint(1, 28),
+            "hour": self.rng.randint(0, 23),
+            "minute": self.rng.randint(0, 59),
+            "location": location,
+            "longitude": longitude,
+            "latitude": latitude,
+        }
+
+    async def call(
+        self,
+        method: str,
+        route: str,
+        json: dict[str, Any] | None = None,
+        params: dict[str, Any] | None = None,
+        user_id: str | None = None,
+        **path: str,
+    ) -> Any:
+        """Send one request, recorded under its route template"""
+        endpoint = f"{method} {route}"
+        headers = {"Authorization": f"Bearer {user_id or self.user_id}"}
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(
+                method,
+                API_PREFIX + route.format(**path),
+                json=json,
+                params=params,
+                headers=headers,
+            )
+        except httpx.HTTPError:
+            self.recorder.add(endpoint, time.perf_counter() - started, ok=False)
+            return None
+
+        ok = response.status_code < 400
+        self.recorder.add(endpoint, time.perf_counter() - started, ok)
+        if self.think_time:
+            await asyncio.sleep(self.rng.expovariate(1 / self.think_time))
+        return response.json() if ok else None
+
+
+async def onboarding_journey(user: VirtualUser) -> None:
+    """A new account going through onboarding"""
+    user_id = user.new_id()
+    await user.call("GET", "/onboarding/status", user_id=user_id)
+    await user.call("GET", "/onboarding/avatars", user_id=user_id)
+    await user.call(
+        "POST",
+        "/onboarding/profile",
+        json={
+            "nickname": "压测用户",
+            "gender": user.rng.choice(["male", "female"]),
+            "birth_info": user.birth_info(),
+            "selected_avatar_id": user.rng.choice(user.avatar_ids),
+        },
+        user_id=user_id,
+    )
+    await user.call("GET", "/onboarding/profile", user_id=user_id)
+    await user.call("GET", "/onboarding/status", user_id=user_id)
+
+
+async def chat_journey(user: VirtualUser) -> None:
+    """Start a chat, exchange a few messages, then browse sessions"""
+    initiated = await user.call(
+        "POST", "/chat/initiate", json={"avatar_id": user.rng.choice(user.avatar_ids)}
+    )
+    if initiated:
+        for content in ("最近运势怎么样？", "工作上需要注意什么？", "谢谢！"):
+            await user.call(
+                "POST",
+                "/chat/sessions/{session_id}/messages",
+                json={"content": content},
+                session_id=initiated["session_id"],
+            )
+    await user.call("GET", "/chat/sessions")
+    await user.call(
+        "GET",
+        "/chat/sessions/{session_id}/history",
+        params={"limit": 50},
+        session_id=user.session_id,
+    )
+
+
+async def fortune_journey(user: VirtualUser) -> None:
+    """Check today's fortune and the fortune history"""
+    await user.call("GET", "/fortune/daily")
+    await user.call("GET", "/fortune/history")
+
+
+async def compatibility_journey(user: VirtualUser) -> None:
+    """Add someone, analyse the match and look at past analyses"""
+    created = await user.call(
+        "POST",
+        "/compatibility/other-profiles",
+        json={
+            "name": "小明",
+            "gender": user.rng.choice(["male", "female"]),
+            "birth_info": user.birth_info(),
+            "relation_type": "friend",
+        },
+    )
+    await user.call("GET", "/compatibility/other-profiles")
+    if created:
+        await user.call(
+            "POST",
+            "/compatibility/analyze",
+            json={"other_profile_id": created["id"]},
+        )
+    await user.call("GET", "/compatibility/history")
+
+
+JOURNEYS: dict[str, Callable[[VirtualUser], Awaitable[None]]] = {
+    "onboarding": onboarding_journey,
+    "chat": chat_journey,
+    "fortune": fortune_journey,
+    "compatibility": compatibility_journey,
+}
+
+
+def seed_database(
+    fake: FakePostgrest, users: int, history: int, rng: random.Random
+) -> tuple[list[str], list[tuple[str, str]]]:
+    """Avatars plus ``users`` onboarded accounts, each with a chat session
+    holding ``history`` messages; returns avatar ids and (user, session) ids
+    """
+    avatars = fake.seed(
+        "avatars",
+        [
+            {
+                "name": name,
+                "description": f"{name}擅长{ability}",
+                "image_url": f"https://example.com/{index}.png",
+                "abilities": [ability],
+                "initial_dialogue_prompt": f"你好，我是{name}~ {{nickname}}",
+            }
+            for index, (name, ability) in enumerate(
+                [("星语者·小满", "星盘解读"), ("塔罗师·阿月", "塔罗占卜")]
+            )
+        ],
+    )
+    avatar_ids = [avatar["id"] for avatar in avatars]
+
+    accounts = []
+    start = datetime(2025, 1, 1)
+    for _ in range(users):
+        user_id = str(UUID(int=rng.getrandbits(128), version=4))
+        fake.seed(
+            "profiles",
+            [
+                {
+                    "id": user_id,
+                    "nickname": "压测用户",
+                    "gender": "female",
+                    "birth_year": 1995,
+                    "birth_month": 8,
+                    "birth_day": 15,
+                    "birth_hour": 14,
+                    "birth_minute": 30,
+                    "birth_location": "北京市",
+                    "birth_longitude": 116.4074,
+                    "birth_latitude": 39.9042,
+                    "selected_avatar_id": avatar_ids[0],
+                }
+            ],
+        )
+        fake.seed(
+            "user_profiles_analysis",
+            [{"user_id": user_id, "analysis_data": {"general_insights": ["..."]}}],
+        )
+        (session,) = fake.seed(
+            "chat_sessions",
+            [
+                {
+                    "user_id": user_id,
+                    "avatar_id": avatar_ids[0],
+                    "session_start_time": start.isoformat(),
+                    "last_message_at": start.isoformat(),
+                }
+            ],
+        )
+        fake.seed(
+            "chat_messages",
+            [
+                {
+                    "session_id": session["id"],
+                    "sender_type": "user" if index % 2 else "ai",
+                    "content": f"第{index}条消息：今天的星象如何？",
+                    "timestamp": (start + timedelta(minutes=index)).isoformat(),
+                }
+                for index in range(history)
+            ],
+        )
+        accounts.append((user_id, session["id"]))
+    return avatar_ids, accounts
+
+
+class ServerThread(threading.Thread):
+    """Serves an ASGI app with uvicorn on its own thread and event loop"""
+
+    def __init__(self, app: Any, name: str) -> None:
+        super().__init__(name=name, daemon=True)
+        self.server = uvicorn.Server(
+            uvicorn.Config(
+                app,
+                host="127.0.0.1",
+                port=0,
+                log_config=None,
+                access_log=False,
+            )
+        )
+
+    def run(self) -> None:
+        self.server.run()
+
+    def start_serving(self, timeout: float = 60.0) -> str:
+        """Start the thread and return the base URL once it accepts requests"""
+        self.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if not self.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError(f"{self.name} failed to start")
+            time.sleep(0.05)
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.join()
+
+
+def percentile_stats(samples: list[float], errors: int, elapsed: float) -> dict:
+    """Count, throughput and latency percentiles (ms) of one sample set"""
+    if len(samples) > 1:
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = samples[0]
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "mean_ms": round(statistics.mean(samples) * 1000, 2),
+        "p50_ms": round(p50 * 1000, 2),
+        "p95_ms": round(p95 * 1000, 2),
+        "p99_ms": round(p99 * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2),
+    }
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict[str, Any]:
+    endpoints = {
+        endpoint: percentile_stats(samples, recorder.errors[endpoint], elapsed)
+        for endpoint, samples in sorted(recorder.samples.items())
+    }
+    all_samples = [value for samples in recorder.samples.values() for value in samples]
+    return {
+        "total": percentile_stats(all_samples, sum(recorder.errors.values()), elapsed)
+        if all_samples
+        else {},
+        "endpoints": endpoints,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results: dict[str, Any]) -> None:
+    print(
+        f"\n{results['config']['mix']} mix, {results['config']['users']} users, "
+        f"{results['elapsed_s']}s"
+    )
+    print(
+        f"{'endpoint':<50} {'count':>6} {'err':>4} {'rps':>8} "
+        f"{'p50':>8} {'p95':>8} {'p99':>8}"
+    )
+    rows = [*results["endpoints"].items(), ("total", results["total"])]
+    for endpoint, stats in rows:
+        if not stats:
+            continue
+        print(
+            f"{endpoint:<50} {stats['count']:>6} {stats['errors']:>4} "
+            f"{stats['throughput_rps']:>8.1f} {stats['p50_ms']:>8.1f} "
+            f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}"
+        )
+    print(f"PostgREST calls per request: {results['postgrest_calls_per_request']}")
+
+
+def print_comparison(results: dict[str, Any], baseline: dict[str, Any]) -> None:
+    """Relative change against a previous run (positive = slower / more)"""
+    print(f"\nChange vs {baseline.get('commit') or 'baseline'}")
+    print(f"{'endpoint':<50} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    rows = [*results["endpoints"].items(), ("total", results["total"])]
+    for endpoint, stats in rows:
+        before = (
+            baseline["total"]
+            if endpoint == "total"
+            else baseline["endpoints"].get(endpoint)
+        )
+        if not stats or not before:
+            continue
+        changes = [
+            (stats[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+        ]
+        print(f"{endpoint:<50} " + " ".join(f"{change:>+7.1f}%" for change in changes))
+
+
+async def drive(
+    base_url: str,
+    accounts: list[tuple[str, str]],
+    avatar_ids: list[str],
+    args: argparse.Namespace,
+    recorder: Recorder,
+    on_measure: Callable[[], None],
+) -> float:
+    """Run the warm-up and measured journeys; returns the measured seconds"""
+    weights = MIXES[args.mix]
+    limits = httpx.Limits(
+        max_connections=args.users, max_keepalive_connections=args.users
+    )
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=args.timeout
+    ) as client:
+        users = [
+            VirtualUser(
+                client,
+                recorder,
+                random.Random(f"{args.seed}:{index}"),
+                user_id,
+                session_id,
+                avatar_ids,
+                args.think_time,
+            )
+            for index, (user_id, session_id) in enumerate(accounts)
+        ]
+
+        async def run_user(user: VirtualUser, journeys: int) -> None:
+            names = user.rng.choices(list(weights), list(weights.values()), k=journeys)
+            for name in names:
+                await JOURNEYS[name](user)
+
+        await asyncio.gather(*(run_user(user, args.warmup) for user in users))
+
+        on_measure()
+        recorder.recording = True
+        started = time.perf_counter()
+        await asyncio.gather(*(run_user(user, args.journeys) for user in users))
+        elapsed = time.perf_counter() - started
+        recorder.recording = False
+    return elapsed
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    fake = FakePostgrest(
+        latency=args.db_latency,
+        jitter=args.db_jitter,
+        row_cost=args.row_cost,
+        seed=args.seed,
+    )
+    fake.install(supabase_client, admin_client)
+    avatar_ids, accounts = seed_database(
+        fake, args.users, args.history, random.Random(args.seed)
+    )
+
+    servers = []
+    if args.algorithm_url:
+        algorithm_url = args.algorithm_url
+    else:
+        mock_algorithm_service.CHAT_LATENCY = args.algorithm_latency
+        algorithm = ServerThread(mock_algorithm_service.app, "mock-algorithm")
+        algorithm_url = algorithm.start_serving()
+        servers.append(algorithm)
+
+    # The app reads these while it is being built. Logs go to stdout only, so
+    # a run never leaves log files behind in the checkout
+    settings.ALGORITHM_SERVICE_URL = algorithm_url
+    settings.RATE_LIMITING_ENABLED = False
+    settings.LOG_FILE = ""
+    from main import app as backend_app
+
+    app_server = ServerThread(backend_app, "aura-backend")
+    base_url = app_server.start_serving()
+    servers.append(app_server)
+    logging.getLogger().setLevel(args.log_level)
+
+    recorder = Recorder()
+    try:
+        elapsed = asyncio.run(
+            drive(base_url, accounts, avatar_ids, args, recorder, fake.calls.clear)
+        )
+        postgrest_calls = dict(fake.calls)
+    finally:
+        for server in reversed(servers):
+            server.stop()
+
+    summary = summarize(recorder, elapsed)
+    requests = summary["total"].get("count", 0)
+    return {
+        "commit": git_commit(),
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "baseline")
+        },
+        "elapsed_s": round(elapsed, 2),
+        **summary,
+        "postgrest_calls": postgrest_calls,
+        "postgrest_calls_per_request": round(
+            sum(postgrest_calls.values()) / requests, 2
+        )
+        if requests
+        else 0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--mix", choices=sorted(MIXES), default="default")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent users")
+    parser.add_argument(
+        "--journeys", type=int, default=10, help="Measured journeys per user"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=1, help="Unmeasured journeys per user first"
+    )
+    parser.add_argument(
+        "--think-time", type=float, default=0.0, help="Mean seconds between requests"
+    )
+    parser.add_argument(
+        "--history", type=int, default=200, help="Messages in each seeded session"
+    )
+    parser.add_argument(
+        "--db-latency", type=float, default=0.01, help="Median seconds per query"
+    )
+    parser.add_argument(
+        "--db-jitter", type=float, default=0.3, help="Log-normal sigma of latency"
+    )
+    parser.add_argument(
+        "--row-cost", type=float, default=0.00002, help="Extra seconds per row"
+    )
+    parser.add_argument(
+        "--algorithm-latency",
+        type=float,
+        default=mock_algorithm_service.CHAT_LATENCY,
+        help="Mock chat endpoint latency (in-process mock only)",
+    )
+    parser.add_argument(
+        "--algorithm-url", default="", help="Use a running mock algorithm service"
+    )
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    parser.add_argument(
+        "--baseline", type=Path, help="Earlier results JSON to compare against"
+    )
+    args = parser.parse_args()
+
+    results = run(args)
+    print_report(results)
+
+    if args.baseline:
+        print_comparison(results, json.loads(args.baseline.read_text()))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,15 +4,25 @@ Mock Algorithm Service for Development
 This is a simple mock service that simulates the algorithm service
 responses for testing and development purposes.
 """
-import time
+import asyncio
+import os
+from datetime import datetime
 from typing import Any
+from uuid import uuid4
 
 import uvicorn
-from fastapi import FastAPI
-from pydantic import BaseModel
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import AliasChoices, BaseModel, Field, ValidationError
 
 app = FastAPI(title="Mock Algorithm Service", version="1.0.0")
 
+# Simulated model latency for chat endpoints (seconds)
+CHAT_LATENCY = float(os.getenv("MOCK_CHAT_LATENCY", "0.3"))
+
+# Version stamped on every response; change it to simulate a rollout
+ALGORITHM_VERSION = os.getenv("MOCK_ALGORITHM_VERSION", "1")
+
 class BirthInfo(BaseModel):
     year: int
     month: int
@@ -28,16 +38,81 @@ class UserProfileAnalysisRequest(BaseModel):
     user_id: str
     birth_info: BirthInfo
 
+class DailyFortuneRequest(BaseModel):
+    user_id: str
+    date: str
+    user_profile: dict[str, Any] = {}
+
+class CompatibilityCalculateRequest(BaseModel):
+    # The backend sends the main user as user_id_main
+    user_id: str = Field(validation_alias=AliasChoices("user_id_main", "user_id"))
+    other_profile_id: str | None = None
+    analysis_depth: str = "all"
+
+    model_config = {"extra": "allow"}
+
+class BatchItem(BaseModel):
+    path: str
+    payload: dict[str, Any]
+
+class BatchRequest(BaseModel):
+    requests: list[BatchItem]
+
+class ChatInitiateRequest(BaseModel):
+    user_id: str
+    initial_message: str
+
+class ChatSendMessageRequest(BaseModel):
+    session_id: str
+    user_id: str
+    message: str
+
+def _mock_ai_message(session_id: str, content: str) -> dict[str, Any]:
+    now = datetime.now().isoformat()
+    return {
+        "id": str(uuid4()),
+        "session_id": session_id,
+        "sender_type": "ai",
+        "content": content,
+        "timestamp": now,
+        "message_type": "text",
+        "created_at": now,
+        "updated_at": now,
+    }
+
+@app.middleware("http")
+async def stamp_algorithm_version(request: Request, call_next: Any) -> Response:
+    response: Response = await call_next(request)
+    response.headers["X-Algorithm-Version"] = ALGORITHM_VERSION
+    return response
+
+@app.middleware("http")
+async def enforce_deadline(request: Request, call_next: Any) -> Response:
+    """Give up on work the BFF has stopped waiting for (X-Deadline-Ms)"""
+    deadline_ms = request.headers.get("X-Deadline-Ms")
+    if not deadline_ms or not deadline_ms.isdigit():
+        return await call_next(request)
+
+    try:
+        async with asyncio.timeout(int(deadline_ms) / 1000):
+            return await call_next(request)
+    except TimeoutError:
+        return JSONResponse(status_code=504, content={"detail": "Deadline exceeded"})
+
 @app.get("/health")
 async def health_check() -> dict[str, str]:
-    return {"status": "healthy", "service": "mock-algorithm"}
+    return {
+        "status": "healthy",
+        "service": "mock-algorithm",
+        "algorithm_version": ALGORITHM_VERSION,
+    }
 
 @app.post("/api/algorithm/user-profile-analysis")
 async def user_profile_analysis(request: UserProfileAnalysisRequest) -> dict[str, Any]:
     """Mock user profile analysis endpoint"""
 
-    # Simulate processing time
-    time.sleep(2)
+    # Simulate processing time without blocking the event loop
+    await asyncio.sleep(2)
 
     # Generate mock analysis result
     analysis_results = {
@@ -97,5 +172,115 @@ async def user_profile_analysis(request: UserProfileAnalysisRequest) -> dict[str
         "analysis_results": analysis_results
     }
 
+@app.post("/api/algorithm/daily-fortune/calculate")
+async def daily_fortune(request: DailyFortuneRequest) -> dict[str, Any]:
+    """Mock daily fortune endpoint"""
+    levels = ["大吉", "吉", "平", "小凶"]
+    seed = sum(map(ord, request.user_id + request.date))
+
+    return {
+        "fortune_details": {
+            "luck_level": levels[seed % len(levels)],
+            "suitability": ["宜出行", "忌争执"],
+            "lucky_color": "红色",
+            "lucky_number": seed % 9 + 1,
+            "general_summary": f"{request.date}运势整体平稳，适合稳步推进计划。",
+        }
+    }
+
+@app.post("/api/algorithm/compatibility/calculate")
+async def compatibility_calculate(
+    request: CompatibilityCalculateRequest,
+) -> dict[str, Any]:
+    """Mock compatibility endpoint"""
+    score = 60 + sum(map(ord, request.user_id)) % 40
+
+    return {
+        "compatibility_result": {
+            "overall_score": score,
+            "aspect_scores": {
+                "emotional_connection": score,
+                "communication_style": score - 5,
+                "values_alignment": score,
+                "conflict_resolution": score - 10,
+            },
+            "relationship_overview": "你们在情感上有不错的共鸣。",
+            "strengths": ["情感连接良好"],
+            "challenges": ["沟通方式需要磨合"],
+            "actionable_advice": ["多进行深度交流"],
+        }
+    }
+
+# Endpoints that can be called through /api/algorithm/batch
+BATCH_ROUTES: dict[str, tuple[type[BaseModel], Any]] = {
+    "/api/algorithm/daily-fortune/calculate": (DailyFortuneRequest, daily_fortune),
+    "/api/algorithm/compatibility/calculate": (
+        CompatibilityCalculateRequest,
+        compatibility_calculate,
+    ),
+}
+
+@app.post("/api/algorithm/batch")
+async def batch(request: BatchRequest) -> dict[str, Any]:
+    """Run several algorithm calls in one request; responses keep their order"""
+
+    async def run(item: BatchItem) -> dict[str, Any]:
+        route = BATCH_ROUTES.get(item.path)
+        if route is None:
+            return {"status_code": 404, "body": {"detail": "Unknown batch path"}}
+
+        model, handler = route
+        try:
+            body = await handler(model(**item.payload))
+        except ValidationError as e:
+            return {
+                "status_code": 422,
+                "body": {"detail": e.errors(include_context=False)},
+            }
+        return {"status_code": 200, "body": body}
+
+    responses = await asyncio.gather(*(run(item) for item in request.requests))
+    return {"responses": list(responses)}
+
+@app.post("/chat/initiate")
+async def chat_initiate(request: ChatInitiateRequest) -> dict[str, Any]:
+    """Mock profile-aware chat greeting endpoint"""
+    await asyncio.sleep(CHAT_LATENCY)
+
+    now = datetime.now().isoformat()
+    return {
+        "initial_message": _mock_ai_message(
+            str(uuid4()), f"{request.initial_message} 我已经读过你的星盘了。"
+        ),
+        "user_profile": {
+            "id": request.user_id,
+            "nickname": "测试用户",
+            "gender": "female",
+            "birth_year": 1995,
+            "birth_month": 8,
+            "birth_day": 15,
+            "birth_hour": 14,
+            "birth_minute": 30,
+            "birth_second": 0,
+            "birth_location": "北京市",
+            "birth_longitude": 116.4074,
+            "birth_latitude": 39.9042,
+            "analysis_completed": True,
+            "created_at": now,
+            "updated_at": now,
+        },
+    }
+
+@app.post("/chat/send_message")
+async def chat_send_message(request: ChatSendMessageRequest) -> dict[str, Any]:
+    """Mock chat reply endpoint"""
+    await asyncio.sleep(CHAT_LATENCY)
+
+    return {
+        "ai_response": _mock_ai_message(
+            request.session_id, f"关于「{request.message}」，星象显示近期宜静心思考。"
+        )
+    }
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8001)
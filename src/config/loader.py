@@ -3,6 +3,7 @@ Configuration Loader
 
 Supports loading configuration from YAML files for different environments.
 """
+import logging
 import os
 from pathlib import Path
 from typing import Any
@@ -15,6 +16,8 @@ except ImportError:
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
+logger = logging.getLogger(__name__)
+
 
 class YamlConfigLoader:
     """YAML configuration loader"""
@@ -23,7 +26,7 @@ class YamlConfigLoader:
     def load_yaml_config(config_path: str) -> dict[str, Any]:
         """Load configuration from YAML file"""
         if yaml is None:
-            print("Warning: PyYAML not installed, skipping YAML config loading")
+            logger.warning("PyYAML not installed, skipping YAML config loading")
             return {}
 
         try:
@@ -31,10 +34,10 @@ class YamlConfigLoader:
                 config = yaml.safe_load(file)
                 return config or {}
         except FileNotFoundError:
-            print(f"Warning: Config file {config_path} not found")
+            logger.warning("Config file %s not found", config_path)
             return {}
         except yaml.YAMLError as e:
-            print(f"Error parsing YAML config file {config_path}: {e}")
+            logger.error("Error parsing YAML config file %s: %s", config_path, e)
             return {}
 
     @staticmethod
@@ -86,6 +89,64 @@ class EnhancedSettings(BaseSettings):
     ALGORITHM_SERVICE_RETRIES: int = Field(
         default=3, description="Algorithm service retries"
     )
+    ALGORITHM_VERSION: str = Field(
+        default="1", description="Algorithm version that cached results must match"
+    )
+    ALGORITHM_BATCH_WINDOW: float = Field(
+        default=0.01,
+        description="Seconds to collect calls into one /batch request (0 disables)",
+    )
+    ALGORITHM_BATCH_MAX_SIZE: int = Field(
+        default=32, description="Calls that flush a batch before the window ends"
+    )
+    ALGORITHM_CONCURRENCY_TOTAL: int = Field(
+        default=16, description="Concurrent algorithm calls across all endpoints"
+    )
+    ALGORITHM_CONCURRENCY_DEFAULT: int = Field(
+        default=8, description="Concurrent algorithm calls per endpoint"
+    )
+    ALGORITHM_CONCURRENCY_LIMITS: dict[str, int] = Field(
+        default={
+            "/api/algorithm/user-profile-analysis": 2,
+            "/api/algorithm/compatibility/calculate": 4,
+        },
+        description="Per-endpoint overrides of ALGORITHM_CONCURRENCY_DEFAULT",
+    )
+    FALLBACK_RETRY_ATTEMPTS: int = Field(
+        default=5, description="Background retries that upgrade a fallback result"
+    )
+    FALLBACK_RETRY_DELAY: float = Field(
+        default=30.0, description="Seconds before the first retry (doubles each time)"
+    )
+    RECOMPUTE_INTERVAL: int = Field(
+        default=600, description="Seconds between stale-result sweeps (0 disables)"
+    )
+    RECOMPUTE_RATE: float = Field(
+        default=2.0, description="Maximum stale results recomputed per second"
+    )
+    RECOMPUTE_BATCH_SIZE: int = Field(
+        default=50, description="Stale rows recomputed per table per sweep"
+    )
+
+    # Request Deadlines
+    REQUEST_DEADLINE_DEFAULT: float = Field(
+        default=30.0, description="Seconds a request may take end to end"
+    )
+    REQUEST_DEADLINES: dict[str, float] = Field(
+        default={
+            "/api/v1/compatibility/analyze": 60.0,
+            "/api/v1/fortune/predict": 45.0,
+        },
+        description="Per-route deadlines keyed by path prefix",
+    )
+
+    # Chat Configuration
+    CHAT_GREETING_TIMEOUT: float = Field(
+        default=1.5,
+        description="Seconds to wait for the profile-aware greeting before "
+        "answering with the avatar's pre-rendered one",
+    )
+    AVATAR_CACHE_TTL: int = Field(default=600, description="Avatar cache TTL")
 
     # External API Configuration
     OPENAI_API_KEY: str = Field(default="", description="OpenAI API key")
@@ -116,7 +177,7 @@ class EnhancedSettings(BaseSettings):
 
     # Logging Configuration
     LOG_LEVEL: str = Field(default="INFO", description="Logging level")
-    LOG_FILE: str = Field(default="logs/aura.log", description="Log file path")
+    LOG_FILE: str = Field(default="", description="Log file path (empty: stdout only)")
     LOG_MAX_SIZE: str = Field(default="10MB", description="Log file max size")
     LOG_BACKUP_COUNT: int = Field(default=5, description="Log backup count")
 
@@ -130,6 +191,20 @@ class EnhancedSettings(BaseSettings):
     RATE_LIMITING_PREMIUM: str = Field(
         default="1000/hour", description="Premium rate limit"
     )
+    RATE_LIMITING_BURST: str | None = Field(
+        default=None, description="Short-window limit applied to every tier"
+    )
+    RATE_LIMITING_COSTS: dict[str, int] = Field(
+        default={
+            "/api/v1/compatibility/analyze": 10,
+            "/api/v1/fortune/predict": 5,
+            "/api/v1/fortune/daily/generate": 5,
+        },
+        description="Request cost per route prefix (default 1)",
+    )
+    RATE_LIMITING_TIER_TTL: float = Field(
+        default=300.0, description="Seconds a user's subscription tier is cached"
+    )
 
     # Security Configuration
     TRUSTED_HOSTS: list[str] = Field(default=["*"], description="Trusted hosts")
@@ -138,6 +213,37 @@ class EnhancedSettings(BaseSettings):
     # Cache Configuration
     REDIS_URL: str = Field(default="", description="Redis URL")
     CACHE_DEFAULT_TTL: int = Field(default=3600, description="Cache default TTL")
+    CACHE_MAX_CONNECTIONS: int = Field(
+        default=100, description="Redis connection pool size"
+    )
+    CACHE_LOCAL_TTL: float = Field(
+        default=30.0, description="Seconds an entry stays in the in-process tier"
+    )
+    CACHE_LOCAL_MAX_ENTRIES: int = Field(
+        default=10000, description="Entries kept in the in-process tier"
+    )
+
+    # Realtime Configuration
+    REALTIME_QUEUE_SIZE: int = Field(
+        default=100, description="Per-socket realtime event queue size"
+    )
+    REALTIME_MAX_DROPPED: int = Field(
+        default=500, description="Dropped events before a slow socket is closed"
+    )
+
+    # Analysis History Retention
+    ANALYSIS_RETENTION_KEEP: int = Field(
+        default=5, description="Profile analyses kept per user regardless of age"
+    )
+    ANALYSIS_RETENTION_MIN_AGE_DAYS: int = Field(
+        default=30, description="Minimum age in days before an analysis is compacted"
+    )
+    ANALYSIS_RETENTION_BATCH_SIZE: int = Field(
+        default=1000, description="Maximum analyses deleted per compaction call"
+    )
+    ANALYSIS_RETENTION_INTERVAL: int = Field(
+        default=3600, description="Seconds between compaction runs (0 disables)"
+    )
 
     # Monitoring Configuration
     MONITORING_ENABLED: bool = Field(default=False, description="Enable monitoring")
@@ -145,6 +251,19 @@ class EnhancedSettings(BaseSettings):
         default=False, description="Enable Prometheus metrics"
     )
     SENTRY_DSN: str = Field(default="", description="Sentry DSN")
+    TRACING_ENABLED: bool = Field(default=False, description="Enable tracing")
+    TRACING_EXPORTER: str = Field(
+        default="console", description="Span exporter: console, memory or none"
+    )
+    TRACING_SAMPLE_RATIO: float = Field(
+        default=1.0, description="Fraction of new traces that are recorded"
+    )
+    BLOCKING_WATCHDOG_ENABLED: bool = Field(
+        default=False, description="Report code that blocks the event loop"
+    )
+    BLOCKING_WATCHDOG_THRESHOLD: float = Field(
+        default=0.1, description="Seconds the event loop may be blocked"
+    )
 
     def __init__(self, **kwargs: Any) -> None:
         # Load YAML configuration first
@@ -177,7 +296,22 @@ class EnhancedSettings(BaseSettings):
             "algorithm_service.url": "ALGORITHM_SERVICE_URL",
             "algorithm_service.timeout": "ALGORITHM_SERVICE_TIMEOUT",
             "algorithm_service.retries": "ALGORITHM_SERVICE_RETRIES",
+            "algorithm_service.version": "ALGORITHM_VERSION",
+            "algorithm_service.batch.window": "ALGORITHM_BATCH_WINDOW",
+            "algorithm_service.batch.max_size": "ALGORITHM_BATCH_MAX_SIZE",
+            "algorithm_service.concurrency.total": "ALGORITHM_CONCURRENCY_TOTAL",
+            "algorithm_service.concurrency.default": "ALGORITHM_CONCURRENCY_DEFAULT",
+            "algorithm_service.concurrency.endpoints": "ALGORITHM_CONCURRENCY_LIMITS",
+            "algorithm_service.fallback_retry.attempts": "FALLBACK_RETRY_ATTEMPTS",
+            "algorithm_service.fallback_retry.delay": "FALLBACK_RETRY_DELAY",
+            "algorithm_service.recompute.interval": "RECOMPUTE_INTERVAL",
+            "algorithm_service.recompute.rate": "RECOMPUTE_RATE",
+            "algorithm_service.recompute.batch_size": "RECOMPUTE_BATCH_SIZE",
             "cors.origins": "CORS_ORIGINS",
+            "deadlines.default": "REQUEST_DEADLINE_DEFAULT",
+            "deadlines.routes": "REQUEST_DEADLINES",
+            "chat.greeting_timeout": "CHAT_GREETING_TIMEOUT",
+            "chat.avatar_cache_ttl": "AVATAR_CACHE_TTL",
             "external_apis.openai.api_key": "OPENAI_API_KEY",
             "external_apis.openai.model": "OPENAI_MODEL",
             "external_apis.claude.api_key": "CLAUDE_API_KEY",
@@ -200,13 +334,30 @@ class EnhancedSettings(BaseSettings):
             "rate_limiting.enabled": "RATE_LIMITING_ENABLED",
             "rate_limiting.default_limit": "RATE_LIMITING_DEFAULT",
             "rate_limiting.premium_limit": "RATE_LIMITING_PREMIUM",
+            "rate_limiting.burst_limit": "RATE_LIMITING_BURST",
+            "rate_limiting.costs": "RATE_LIMITING_COSTS",
+            "rate_limiting.tier_ttl": "RATE_LIMITING_TIER_TTL",
             "security.trusted_hosts": "TRUSTED_HOSTS",
             "security.force_https": "FORCE_HTTPS",
             "cache.redis_url": "REDIS_URL",
             "cache.default_ttl": "CACHE_DEFAULT_TTL",
+            "cache.max_connections": "CACHE_MAX_CONNECTIONS",
+            "cache.local_ttl": "CACHE_LOCAL_TTL",
+            "cache.local_max_entries": "CACHE_LOCAL_MAX_ENTRIES",
+            "realtime.queue_size": "REALTIME_QUEUE_SIZE",
+            "realtime.max_dropped": "REALTIME_MAX_DROPPED",
+            "analysis_retention.keep_latest": "ANALYSIS_RETENTION_KEEP",
+            "analysis_retention.min_age_days": "ANALYSIS_RETENTION_MIN_AGE_DAYS",
+            "analysis_retention.batch_size": "ANALYSIS_RETENTION_BATCH_SIZE",
+            "analysis_retention.interval": "ANALYSIS_RETENTION_INTERVAL",
             "monitoring.enabled": "MONITORING_ENABLED",
             "monitoring.prometheus_metrics": "PROMETHEUS_METRICS",
             "monitoring.sentry_dsn": "SENTRY_DSN",
+            "monitoring.tracing.enabled": "TRACING_ENABLED",
+            "monitoring.tracing.exporter": "TRACING_EXPORTER",
+            "monitoring.tracing.sample_ratio": "TRACING_SAMPLE_RATIO",
+            "monitoring.blocking_watchdog.enabled": "BLOCKING_WATCHDOG_ENABLED",
+            "monitoring.blocking_watchdog.threshold": "BLOCKING_WATCHDOG_THRESHOLD",
         }
 
         for yaml_path, field_name in mapping.items():
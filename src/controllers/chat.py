@@ -4,19 +4,40 @@ Chat Controller
 Handles HTTP requests for chat functionality.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, status
+import asyncio
+import logging
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+    WebSocketException,
+    status,
+)
 
-from ..middleware.auth import get_current_user_id
+from ..db import json_response
+from ..middleware.auth import (
+    authenticate_websocket,
+    enforce_token_expiry,
+    get_current_user_id,
+)
 from ..services.chat import chat_service
+from ..services.realtime import Subscription, realtime_hub
 from ..types.database import (
     ChatHistoryResponse,
     ChatInitiateRequest,
     ChatInitiateResponse,
     ChatMessageRequest,
     ChatMessageResponse,
-    ChatSession,
+    ChatSessionsResponse,
 )
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 
@@ -43,7 +64,7 @@ async def send_message(
 ) -> ChatMessageResponse:
     """Send a message in a chat session"""
     try:
-        response = await chat_service.send_message(user_id, session_id, request)
+        response = await chat_service.send_message(session_id, user_id, request)
         return response
     except Exception as e:
         raise HTTPException(
@@ -55,16 +76,19 @@ async def send_message(
 @router.get("/sessions/{session_id}/history", response_model=ChatHistoryResponse)
 async def get_chat_history(
     session_id: str,
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    with_count: bool = False,
     user_id: str = Depends(get_current_user_id),
-) -> ChatHistoryResponse:
+) -> Response:
     """Get chat history for a session"""
     try:
         response = await chat_service.get_chat_history(
-            user_id, session_id, limit, offset
+            session_id, user_id, limit, offset, with_count
         )
-        return response
+        return json_response(ChatHistoryResponse, response)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -72,14 +96,18 @@ async def get_chat_history(
         )
 
 
-@router.get("/sessions", response_model=list[ChatSession])
+@router.get("/sessions", response_model=ChatSessionsResponse)
 async def get_user_sessions(
-    limit: int = 20, user_id: str = Depends(get_current_user_id)
-) -> list[ChatSession]:
-    """Get user's chat sessions"""
+    limit: int = Query(20, ge=1, le=50),
+    cursor: str | None = None,
+    user_id: str = Depends(get_current_user_id),
+) -> ChatSessionsResponse:
+    """Get user's chat sessions, most recently active first"""
     try:
-        sessions = await chat_service.get_user_sessions(user_id, limit)
+        sessions = await chat_service.get_user_sessions(user_id, limit, cursor)
         return sessions
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -87,21 +115,53 @@ async def get_user_sessions(
         )
 
 
-# WebSocket endpoint for real-time chat (optional - for future implementation)
 @router.websocket("/sessions/{session_id}/ws")
 async def websocket_endpoint(websocket: WebSocket, session_id: str) -> None:
-    """WebSocket endpoint for real-time chat"""
-    await websocket.accept()
+    """WebSocket endpoint that streams new messages of a chat session.
+
+    The access token is verified once at handshake (``?access_token=`` or the
+    ``bearer, <token>`` subprotocol) and the connection is closed with 4401
+    when it expires. Every message stored for the session (by any service, on
+    any device) is pushed as a ``chat_message`` event. Clients may send
+    ``ping`` to keep the connection alive; messages themselves are still sent
+    over REST.
+    """
+    identity = await authenticate_websocket(websocket)
+
+    if not await chat_service.is_session_owner(session_id, identity.user_id):
+        raise WebSocketException(
+            code=status.WS_1008_POLICY_VIOLATION, reason="Chat session not found"
+        )
+
+    await websocket.accept(subprotocol=identity.subprotocol)
+
+    subscription = realtime_hub.subscribe(
+        user_id=identity.user_id, session_id=session_id
+    )
+    sender = asyncio.create_task(_forward_events(websocket, subscription))
+    expiry = asyncio.create_task(enforce_token_expiry(websocket, identity))
 
     try:
         while True:
-            # Wait for message from client
             data = await websocket.receive_text()
-
-            # Echo back for now (implement real chat logic later)
-            await websocket.send_text(f"Echo: {data}")
-
+            if data == "ping":
+                await websocket.send_text("pong")
+    except WebSocketDisconnect:
+        pass
     except Exception as e:
-        print(f"WebSocket error: {e}")
+        logger.error("WebSocket error: %s", e)
     finally:
-        await websocket.close()
+        realtime_hub.unsubscribe(subscription)
+        subscription.close()
+        sender.cancel()
+        expiry.cancel()
+
+
+async def _forward_events(websocket: WebSocket, subscription: Subscription) -> None:
+    """Drain a subscription into the socket until it ends"""
+    async for payload in subscription:
+        await websocket.send_text(payload)
+
+    if subscription.overflowed:
+        # Client fell too far behind; it should reconnect and reload history
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
@@ -4,8 +4,9 @@ Compatibility Controller
 Handles HTTP requests for compatibility analysis functionality.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 
+from ..db import json_response
 from ..middleware.auth import get_current_user_id
 from ..services.compatibility import compatibility_service
 from ..types.database import (
@@ -38,11 +39,11 @@ async def create_other_profile(
 @router.get("/other-profiles", response_model=list[OtherProfileResponse])
 async def get_other_profiles(
     user_id: str = Depends(get_current_user_id)
-) -> list[OtherProfileResponse]:
+) -> Response:
     """Get all other profiles for the authenticated user"""
     try:
         profiles = await compatibility_service.get_other_profiles(user_id)
-        return profiles
+        return json_response(list[OtherProfileResponse], profiles)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,21 @@
+"""
+Data Access Layer
+
+Explicit lookup primitives over the PostgREST query builder, and the
+conversion of their rows into response models.
+"""
+
+from .rows import json_response, trusted, trusted_list, validated
+from .table import Columns, CountMode, Page, TableGateway, select_columns
+
+__all__ = [
+    "Columns",
+    "CountMode",
+    "Page",
+    "TableGateway",
+    "json_response",
+    "select_columns",
+    "trusted",
+    "trusted_list",
+    "validated",
+]
@@ -0,0 +1,82 @@
+"""
+Row Conversion
+
+Two ways to turn decoded JSON into response models:
+
+- ``validated``: full Pydantic validation. For anything we do not control,
+  such as algorithm service payloads.
+- ``trusted``: rows read back from our own database, whose types are
+  already enforced by Postgres. Fields are assigned without validation.
+
+Trusted models keep the values PostgREST returned: UUIDs and timestamps
+stay strings (serialized in PostgREST's format, e.g. ``+00:00`` rather
+than ``Z``), and embedded relations stay dicts. Only use them for data
+that goes straight into a response, and send it with ``json_response``
+rather than returning the model, since FastAPI would validate it again
+for ``response_model``.
+"""
+from functools import cache
+from typing import Any
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from pydantic.fields import FieldInfo
+
+
+@cache
+def _adapter(tp: Any) -> TypeAdapter[Any]:
+    return TypeAdapter(tp)
+
+
+@cache
+def _field_plan(model: type[BaseModel]) -> tuple[tuple[str, str, FieldInfo], ...]:
+    """(attribute, row key, field) for every field of ``model``"""
+    return tuple(
+        (name, field.alias or name, field) for name, field in model.model_fields.items()
+    )
+
+
+def validated(tp: Any, data: Any) -> Any:
+    """Validate untrusted data against a model or type such as ``list[Model]``"""
+    return _adapter(tp).validate_python(data)
+
+
+def trusted[M: BaseModel](model: type[M], row: dict[str, Any]) -> M:
+    """Build ``model`` from a database row without validating it.
+
+    Fields missing from the row get their defaults; a required field
+    missing from the row is left unset, so select the model's columns.
+    """
+    values = {}
+    fields_set = set()
+    for name, key, field in _field_plan(model):
+        if key in row:
+            values[name] = row[key]
+            fields_set.add(name)
+        elif not field.is_required():
+            values[name] = field.get_default(call_default_factory=True)
+
+    instance = model.__new__(model)
+    object.__setattr__(instance, "__dict__", values)
+    object.__setattr__(instance, "__pydantic_fields_set__", fields_set)
+    object.__setattr__(instance, "__pydantic_extra__", None)
+    object.__setattr__(instance, "__pydantic_private__", None)
+    return instance
+
+
+def trusted_list[M: BaseModel](model: type[M], rows: list[dict[str, Any]]) -> list[M]:
+    """``trusted`` for every row"""
+    return [trusted(model, row) for row in rows]
+
+
+def json_response(tp: Any, value: Any, status_code: int = 200) -> Response:
+    """Serialize ``value`` as ``tp`` into a ready-made JSON response.
+
+    Returning a Response bypasses ``response_model`` validation, which
+    would otherwise dump the models and validate them all over again.
+    Keep ``response_model`` on the route for the OpenAPI schema.
+    """
+    # Trusted models hold raw strings where the schema says UUID or
+    # datetime; they serialize as is, so the mismatch warnings are noise
+    content = _adapter(tp).dump_json(value, warnings=False)
+    return Response(content, status_code=status_code, media_type="application/json")
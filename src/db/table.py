@@ -0,0 +1,133 @@
+"""
+Table Gateway
+
+Explicit single-row and paged lookups. None of them ask PostgREST for a
+row count unless the caller passes ``count``, so hot-path reads never pay
+for an extra ``COUNT(*)``.
+
+``columns`` accepts either a raw PostgREST select string (needed for
+embedded relations) or a projection model from ``src.types.database``,
+in which case exactly that model's fields are selected.
+"""
+from functools import cache
+from typing import Any, Literal
+
+from pydantic import BaseModel
+
+from ..utils.deadline import check_deadline
+
+# exact:     COUNT(*) over the filtered rows; cost grows with the table
+# planned:   planner estimate only
+# estimated: exact below PostgREST's max-rows, planner estimate above it;
+#            good enough for UI badges
+CountMode = Literal["exact", "planned", "estimated"]
+
+Columns = str | type[BaseModel]
+
+
+@cache
+def _model_columns(model: type[BaseModel]) -> str:
+    return ",".join(field.alias or name for name, field in model.model_fields.items())
+
+
+def _execute(query: Any) -> Any:
+    """Run a query unless the request deadline has already passed"""
+    check_deadline()
+    return query.execute()
+
+
+def select_columns(columns: Columns) -> str:
+    """Resolve a projection model (or raw select string) to a select list"""
+    if isinstance(columns, str):
+        return columns
+    return _model_columns(columns)
+
+
+class Page:
+    """One page of rows from ``TableGateway.list_page``"""
+
+    def __init__(
+        self, rows: list[dict[str, Any]], has_more: bool, total: int | None = None
+    ) -> None:
+        self.rows = rows
+        self.has_more = has_more
+        self.total = total
+
+
+class TableGateway:
+    """Lookup primitives for a single table"""
+
+    def __init__(self, client: Any, table: str) -> None:
+        self.client = client
+        self.table = table
+
+    def _query(self, columns: Columns, count: CountMode | None = None) -> Any:
+        builder = self.client.table(self.table)
+        if count is None:
+            return builder.select(select_columns(columns))
+        return builder.select(select_columns(columns), count=count)
+
+    @staticmethod
+    def _apply_filters(query: Any, filters: dict[str, Any]) -> Any:
+        for column, value in filters.items():
+            query = query.eq(column, value)
+        return query
+
+    def get_by_id(
+        self, row_id: Any, columns: Columns = "*", **filters: Any
+    ) -> dict[str, Any] | None:
+        """Fetch one row by primary key (plus optional equality filters).
+
+        Returns None instead of raising when the row does not exist.
+        """
+        query = self._apply_filters(
+            self._query(columns), {"id": str(row_id), **filters}
+        )
+        response = _execute(query.limit(1))
+        return response.data[0] if response.data else None
+
+    def get_one(
+        self,
+        columns: Columns = "*",
+        order_by: str | None = None,
+        desc: bool = False,
+        **filters: Any,
+    ) -> dict[str, Any] | None:
+        """Fetch the first row matching the equality filters.
+
+        With ``order_by`` this is the first row in that order (e.g. latest).
+        """
+        query = self._apply_filters(self._query(columns), filters)
+        if order_by is not None:
+            query = query.order(order_by, desc=desc)
+        response = _execute(query.limit(1))
+        return response.data[0] if response.data else None
+
+    def exists(self, **filters: Any) -> bool:
+        """Check whether any row matches the equality filters"""
+        response = _execute(self._apply_filters(self._query("id"), filters).limit(1))
+        return bool(response.data)
+
+    def list_page(
+        self,
+        filters: dict[str, Any],
+        order_by: str,
+        desc: bool = False,
+        limit: int = 50,
+        offset: int = 0,
+        columns: Columns = "*",
+        count: CountMode | None = None,
+    ) -> Page:
+        """Fetch a page of rows.
+
+        One extra row is requested to compute ``has_more`` without counting.
+        ``Page.total`` is only populated when ``count`` is given.
+        """
+        query = self._apply_filters(self._query(columns, count), filters)
+        response = _execute(
+            query.order(order_by, desc=desc).range(offset, offset + limit)
+        )
+
+        rows = response.data or []
+        total = response.count if count is not None else None
+        return Page(rows[:limit], has_more=len(rows) > limit, total=total)
@@ -1,15 +1,34 @@
 """
 Authentication Middleware
 """
+import asyncio
 import re
+import time
 from collections.abc import Awaitable, Callable
-
-from fastapi import HTTPException, Request, Response, status
+from typing import Any
+
+from fastapi import (
+    HTTPException,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketException,
+    status,
+)
 from fastapi.responses import JSONResponse
+from jose import JWTError, jwt
 from starlette.middleware.base import BaseHTTPMiddleware
 
 from ..config.supabase import supabase_client
 
+# WebSocket handshake credentials: ?access_token=... or
+# Sec-WebSocket-Protocol: bearer, <token>
+WS_TOKEN_QUERY_PARAMS = ("access_token", "token")
+WS_BEARER_SUBPROTOCOL = "bearer"
+
+# Application close code sent when the handshake token expires (maps to 401)
+WS_CLOSE_TOKEN_EXPIRED = 4401
+
 
 class AuthMiddleware(BaseHTTPMiddleware):
     """Authentication middleware for Supabase JWT tokens"""
@@ -114,3 +133,109 @@ def get_current_user(request: Request) -> str:
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid user object"
         )
     return str(user.id)
+
+
+class WebSocketIdentity:
+    """Identity verified once at WebSocket handshake and bound to the connection"""
+
+    def __init__(
+        self,
+        user_id: str,
+        user_email: str | None,
+        expires_at: float | None,
+        subprotocol: str | None = None,
+    ) -> None:
+        self.user_id = user_id
+        self.user_email = user_email
+        self.expires_at = expires_at
+        self.subprotocol = subprotocol
+
+    def seconds_until_expiry(self) -> float | None:
+        """Remaining token lifetime, or None if the token does not expire"""
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.time()
+
+
+def _extract_websocket_token(websocket: WebSocket) -> tuple[str | None, str | None]:
+    """Read the handshake token from the query string or the subprotocol list"""
+    for param in WS_TOKEN_QUERY_PARAMS:
+        token = websocket.query_params.get(param)
+        if token:
+            return token, None
+
+    subprotocols: list[str] = websocket.scope.get("subprotocols", [])
+    if len(subprotocols) >= 2 and subprotocols[0].lower() == WS_BEARER_SUBPROTOCOL:
+        return subprotocols[1], subprotocols[0]
+
+    return None, None
+
+
+def _token_expiry(token: str) -> float | None:
+    """Read the exp claim; the signature itself is verified by Supabase"""
+    try:
+        claims: dict[str, Any] = jwt.get_unverified_claims(token)
+    except JWTError:
+        return None
+
+    exp = claims.get("exp")
+    return float(exp) if isinstance(exp, int | float) else None
+
+
+async def authenticate_websocket(websocket: WebSocket) -> WebSocketIdentity:
+    """Verify a WebSocket handshake token with Supabase exactly once.
+
+    ``AuthMiddleware`` is HTTP-only, so WebSocket routes call this before
+    accepting. Frames received afterwards are not re-verified; expiry is
+    enforced by ``enforce_token_expiry`` instead.
+
+    Raises:
+        WebSocketException: With 1008 when the token is missing, invalid or expired.
+    """
+    token, subprotocol = _extract_websocket_token(websocket)
+    if not token:
+        raise WebSocketException(
+            code=status.WS_1008_POLICY_VIOLATION, reason="Missing access token"
+        )
+
+    expires_at = _token_expiry(token)
+    if expires_at is not None and expires_at <= time.time():
+        raise WebSocketException(
+            code=status.WS_1008_POLICY_VIOLATION, reason="Token expired"
+        )
+
+    try:
+        user_response = await asyncio.to_thread(supabase_client.auth.get_user, token)
+    except Exception:
+        user_response = None
+
+    if not user_response or not user_response.user:
+        raise WebSocketException(
+            code=status.WS_1008_POLICY_VIOLATION, reason="Invalid token"
+        )
+
+    user = user_response.user
+    identity = WebSocketIdentity(
+        user_id=str(user.id),
+        user_email=user.email,
+        expires_at=expires_at,
+        subprotocol=subprotocol,
+    )
+    websocket.state.user_id = identity.user_id
+    websocket.state.identity = identity
+    return identity
+
+
+async def enforce_token_expiry(
+    websocket: WebSocket, identity: WebSocketIdentity
+) -> None:
+    """Close the connection when the handshake token expires.
+
+    Run as a task next to the receive loop; cancel it when the socket closes.
+    """
+    remaining = identity.seconds_until_expiry()
+    if remaining is None:
+        return
+
+    await asyncio.sleep(max(remaining, 0))
+    await websocket.close(code=WS_CLOSE_TOKEN_EXPIRED, reason="Token expired")
@@ -0,0 +1,90 @@
+"""
+Request Deadline Middleware
+
+Sets the request-scoped deadline consumed by downstream calls and cancels the
+handler once it passes. The budget comes from the longest matching route
+prefix in ``REQUEST_DEADLINES`` (else ``REQUEST_DEADLINE_DEFAULT``); a client
+may ask for less with the ``X-Deadline-Ms`` header.
+"""
+import asyncio
+import logging
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config.env import settings
+from ..utils.deadline import DEADLINE_HEADER, reset_deadline, set_deadline
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineMiddleware:
+    """ASGI middleware that puts every HTTP request under a deadline"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        default: float = settings.REQUEST_DEADLINE_DEFAULT,
+        routes: dict[str, float] | None = None,
+    ) -> None:
+        self.app = app
+        self.default = default
+        routes = settings.REQUEST_DEADLINES if routes is None else routes
+        # Longest prefix first, so the most specific route wins
+        self.routes = sorted(
+            routes.items(), key=lambda item: len(item[0]), reverse=True
+        )
+        self._header = DEADLINE_HEADER.lower().encode()
+
+    def budget(self, scope: Scope) -> float:
+        """Seconds allowed for this request"""
+        path = scope["path"]
+        budget = next(
+            (seconds for prefix, seconds in self.routes if path.startswith(prefix)),
+            self.default,
+        )
+
+        for name, value in scope.get("headers", []):
+            if name == self._header:
+                try:
+                    requested = int(value) / 1000
+                except ValueError:
+                    break
+                if requested > 0:
+                    budget = min(budget, requested)
+                break
+
+        return budget
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        budget = self.budget(scope)
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        token = set_deadline(budget)
+        try:
+            async with asyncio.timeout(budget):
+                await self.app(scope, receive, send_wrapper)
+        except TimeoutError:
+            if response_started:
+                # Too late to change the status; the connection is dropped
+                logger.info("Deadline exceeded mid-response: %s", scope["path"])
+                return
+
+            response = JSONResponse(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                content={"detail": "Request deadline exceeded"},
+            )
+            await response(scope, receive, send)
+        finally:
+            reset_deadline(token)
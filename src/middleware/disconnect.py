@@ -0,0 +1,67 @@
+"""
+Client Disconnect Middleware
+
+Cancels the request handler as soon as the client goes away (e.g. the app is
+backgrounded during a long analysis), so in-flight algorithm calls are
+aborted and their scheduler slots released. Work that must still finish is
+handed to ``background_tasks.shielded`` by the services.
+"""
+import asyncio
+import logging
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+class DisconnectMiddleware:
+    """ASGI middleware that cancels handlers of disconnected clients"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        handler = asyncio.current_task()
+        messages: asyncio.Queue[Message] = asyncio.Queue()
+        response_complete = False
+        disconnected = False
+
+        async def listen() -> None:
+            # Read ahead of the app so a disconnect is seen while it is busy
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    if not response_complete and handler is not None:
+                        disconnected = True
+                        handler.cancel()
+                    return
+
+        async def receive_buffered() -> Message:
+            return await messages.get()
+
+        async def send_tracked(message: Message) -> None:
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                response_complete = True
+            await send(message)
+
+        listener = asyncio.create_task(listen())
+        try:
+            await self.app(scope, receive_buffered, send_tracked)
+        except asyncio.CancelledError:
+            if not disconnected or handler is None:
+                raise
+            handler.uncancel()
+            logger.info(
+                "Client disconnected, cancelled %s %s", scope["method"], scope["path"]
+            )
+        finally:
+            listener.cancel()
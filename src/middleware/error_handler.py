@@ -2,15 +2,12 @@
 Global Error Handler Middleware
 """
 import logging
-import traceback
 from collections.abc import Awaitable, Callable
 
 from fastapi import HTTPException, Request, Response, status
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -26,9 +23,8 @@ class ErrorHandlerMiddleware(BaseHTTPMiddleware):
             # Re-raise HTTP exceptions as they're already handled properly
             raise
         except Exception as e:
-            # Log the error
-            logger.error(f"Unhandled exception: {str(e)}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            # Log the error; the traceback is formatted off the event loop
+            logger.exception("Unhandled exception: %s", e)
 
             # Return generic error response
             return JSONResponse(
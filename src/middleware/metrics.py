@@ -0,0 +1,68 @@
+"""
+Metrics Middleware
+
+Records request latency per route template and serves ``/metrics`` in the
+Prometheus text format. Added outermost, so the latency covers every other
+middleware as well.
+"""
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..utils.metrics import REGISTRY, UNMATCHED_ROUTE, observe_request
+
+METRICS_PATH = "/metrics"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing HTTP requests and exposing the registry"""
+
+    def __init__(self, app: ASGIApp, path: str = METRICS_PATH) -> None:
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["path"] == self.path:
+            await self._serve(send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router leaves the matched route in the (shared) scope
+            route = scope.get("route")
+            observe_request(
+                scope["method"],
+                getattr(route, "path", UNMATCHED_ROUTE),
+                status_code,
+                time.perf_counter() - started,
+            )
+
+    @staticmethod
+    async def _serve(send: Send) -> None:
+        body = generate_latest(REGISTRY)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", CONTENT_TYPE_LATEST.encode()),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
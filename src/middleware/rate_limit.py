@@ -0,0 +1,69 @@
+"""
+Rate Limit Middleware
+
+Enforces ``rate_limiter`` before a request reaches its handler. Runs inside
+``AuthMiddleware`` so authenticated requests are limited per user (and
+tier); public routes are limited per client address on the default tier.
+"""
+import logging
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..services.rate_limit import RateLimiter, rate_limiter
+
+logger = logging.getLogger(__name__)
+
+REMAINING_HEADER = b"x-ratelimit-remaining"
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering 429 once a caller's budget is spent"""
+
+    def __init__(self, app: ASGIApp, limiter: RateLimiter | None = None) -> None:
+        self.app = app
+        self.limiter = limiter or rate_limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        user_id = scope.get("state", {}).get("user_id")
+        if user_id:
+            identity = f"user:{user_id}"
+            tier = await self.limiter.tier(str(user_id))
+        else:
+            client = scope.get("client")
+            identity = f"ip:{client[0] if client else 'unknown'}"
+            tier = "default"
+
+        try:
+            decision = await self.limiter.check(identity, tier, scope["path"])
+        except Exception as e:
+            # Fail open: losing the limiter must not take the API down
+            logger.error("Rate limiter error: %s", e)
+            await self.app(scope, receive, send)
+            return
+
+        if not decision.allowed:
+            response = JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"detail": "Rate limit exceeded"},
+                headers={"Retry-After": str(max(int(decision.retry_after + 1), 1))},
+            )
+            await response(scope, receive, send)
+            return
+
+        remaining = str(decision.remaining).encode()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (REMAINING_HEADER, remaining),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
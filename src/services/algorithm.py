@@ -0,0 +1,389 @@
+"""
+Algorithm Service Client
+
+Single entry point for calls to the algorithm service. Every response is
+stamped with the algorithm version that produced it (from the
+``X-Algorithm-Version`` header or an ``algorithm_version`` body field), so
+stored results can be compared against the version currently deployed.
+
+Calls made through ``batched`` are collected for a short window and sent as
+one ``/batch`` request (DataLoader-style micro-batching). Every request
+waits for a slot from the algorithm scheduler at the caller's priority; a
+batched call holds a slot of its own endpoint while it waits, so batching
+does not get around per-endpoint limits. Inside a request, calls get
+whatever is left of the request deadline when they are sent
+(``ALGORITHM_SERVICE_TIMEOUT`` outside one), and that budget is forwarded in
+the ``X-Deadline-Ms`` header.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+from opentelemetry import trace
+from opentelemetry.trace import Link, SpanKind, Status, StatusCode
+
+from ..config.env import settings
+from ..utils.deadline import (
+    bounded_timeout,
+    current_deadline,
+    deadline_header,
+    deadline_until,
+)
+from ..utils.log import REQUEST_ID_HEADER, current_request_id, request_id_context
+from ..utils.metrics import (
+    count_algorithm_error,
+    count_algorithm_fallback,
+    observe_algorithm,
+)
+from ..utils.tracing import inject_headers, tracer
+from .background import background_tasks
+from .scheduler import Priority, algorithm_scheduler
+
+logger = logging.getLogger(__name__)
+
+ALGORITHM_VERSION_HEADER = "X-Algorithm-Version"
+
+BATCH_PATH = "/api/algorithm/batch"
+
+
+class AlgorithmResult(dict[str, Any]):
+    """Algorithm payload that remembers which algorithm version produced it.
+
+    ``version`` is None for results that did not come from the service.
+    ``degraded`` marks a local fallback served because the service failed;
+    degraded results must never be written to a persistent cache.
+    """
+
+    def __init__(
+        self,
+        data: dict[str, Any],
+        version: str | None = None,
+        degraded: bool = False,
+    ) -> None:
+        super().__init__(data)
+        self.version = version
+        self.degraded = degraded
+
+    @classmethod
+    def fallback(cls, data: dict[str, Any], endpoint: str) -> "AlgorithmResult":
+        """A degraded placeholder served instead of ``endpoint``'s result"""
+        count_algorithm_fallback(endpoint)
+        return cls(data, degraded=True)
+
+
+class AlgorithmResponse:
+    """Status, decoded body and version of one algorithm service response"""
+
+    def __init__(
+        self, status_code: int, data: dict[str, Any], version: str, text: str = ""
+    ) -> None:
+        self.status_code = status_code
+        self.data = data
+        self.version = version
+        self.text = text
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code == 200
+
+    def result(self, key: str) -> AlgorithmResult:
+        """The payload under ``key``, stamped with this response's version"""
+        return AlgorithmResult(dict(self.data.get(key, {})), version=self.version)
+
+
+@dataclass
+class _PendingCall:
+    """A call waiting for the current batch to be flushed"""
+
+    path: str
+    payload: dict[str, Any]
+    timeout: float | None
+    deadline: float | None
+    priority: Priority
+    future: "asyncio.Future[AlgorithmResponse]"
+    span_context: trace.SpanContext
+    request_id: str | None
+
+
+class AlgorithmClient:
+    """Client for the algorithm service that tracks the deployed version"""
+
+    def __init__(
+        self,
+        version: str = settings.ALGORITHM_VERSION,
+        batch_window: float = settings.ALGORITHM_BATCH_WINDOW,
+        batch_max_size: int = settings.ALGORITHM_BATCH_MAX_SIZE,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.current_version = version
+        self.transport = transport
+        self.batch_window = batch_window
+        self.batch_max_size = batch_max_size
+        self._pending: list[_PendingCall] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+
+    def _observe_version(self, response: httpx.Response, data: dict[str, Any]) -> str:
+        version = response.headers.get(ALGORITHM_VERSION_HEADER) or data.get(
+            "algorithm_version"
+        )
+        if not isinstance(version, str) or not version:
+            return self.current_version
+
+        if version != self.current_version:
+            logger.info(
+                "Algorithm version changed: %s -> %s", self.current_version, version
+            )
+            self.current_version = version
+        return version
+
+    async def post(
+        self,
+        path: str,
+        payload: dict[str, Any],
+        timeout: float | None = None,
+        priority: Priority = Priority.NORMAL,
+    ) -> AlgorithmResponse:
+        """POST to the algorithm service; transport errors propagate.
+
+        Raises DeadlineExceededError when the request has no time left for the call.
+        """
+        return await self._post(path, payload, timeout, priority)
+
+    async def _post(
+        self,
+        path: str,
+        payload: dict[str, Any],
+        timeout: float | None,
+        priority: Priority,
+        reserved: bool = False,
+    ) -> AlgorithmResponse:
+        """``post``; with ``reserved`` the endpoint slot is already held"""
+        with tracer.start_as_current_span(
+            f"algorithm POST {path}",
+            kind=SpanKind.CLIENT,
+            attributes={
+                "algorithm.endpoint": path,
+                "algorithm.priority": priority.name,
+            },
+        ) as span:
+            async with algorithm_scheduler.slot(path, priority, reserved):
+                span.add_event("slot acquired")
+                # Measured after queueing, so time spent waiting counts
+                timeout = bounded_timeout(timeout, settings.ALGORITHM_SERVICE_TIMEOUT)
+                headers = inject_headers(deadline_header(timeout))
+                request_id = current_request_id()
+                if request_id is not None:
+                    headers[REQUEST_ID_HEADER] = request_id
+                started = time.perf_counter()
+                try:
+                    async with httpx.AsyncClient(transport=self.transport) as client:
+                        response = await client.post(
+                            f"{settings.ALGORITHM_SERVICE_URL}{path}",
+                            json=payload,
+                            headers=headers,
+                            timeout=timeout,
+                        )
+                except httpx.TimeoutException:
+                    count_algorithm_error(path, "timeout")
+                    raise
+                except Exception:
+                    count_algorithm_error(path, "transport")
+                    raise
+                finally:
+                    observe_algorithm(path, time.perf_counter() - started)
+
+            span.set_attribute("http.response.status_code", response.status_code)
+            if response.status_code != 200:
+                span.set_status(Status(StatusCode.ERROR))
+                count_algorithm_error(path, _status_reason(response.status_code))
+
+        data = response.json() if response.status_code == 200 else {}
+        if not isinstance(data, dict):
+            data = {}
+
+        return AlgorithmResponse(
+            response.status_code,
+            data,
+            self._observe_version(response, data),
+            text=response.text,
+        )
+
+    async def batched(
+        self,
+        path: str,
+        payload: dict[str, Any],
+        timeout: float | None = None,
+        priority: Priority = Priority.NORMAL,
+    ) -> AlgorithmResponse:
+        """Like ``post``, but sent together with other calls made within the
+        batch window. A call that ends up alone in its window is posted as is;
+        a batch runs at the most urgent priority among its calls.
+        """
+        if self.batch_window <= 0:
+            return await self.post(path, payload, timeout, priority)
+
+        # Fail fast without time left; the budget itself is worked out when
+        # the call is sent, so time spent queueing counts
+        bounded_timeout(timeout, settings.ALGORITHM_SERVICE_TIMEOUT)
+
+        # Held until the call is answered, batched or not
+        async with algorithm_scheduler.reserve(path, priority):
+            loop = asyncio.get_running_loop()
+            call = _PendingCall(
+                path,
+                payload,
+                timeout,
+                current_deadline(),
+                priority,
+                loop.create_future(),
+                trace.get_current_span().get_span_context(),
+                current_request_id(),
+            )
+            self._pending.append(call)
+
+            if len(self._pending) >= self.batch_max_size:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.batch_window, self._flush)
+
+            return await call.future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        calls, self._pending = self._pending, []
+        if calls:
+            background_tasks.spawn(self._send_batch(calls), name="algorithm-batch")
+
+    async def _send_batch(self, calls: list[_PendingCall]) -> None:
+        # The batch task inherits the context of whichever caller flushed it,
+        # so the request id and deadline are set explicitly either way
+        if len(calls) == 1:
+            # Sent as is, as part of its caller's trace and request
+            call = calls[0]
+            with trace.use_span(
+                trace.NonRecordingSpan(call.span_context)
+            ), request_id_context(call.request_id), deadline_until(call.deadline):
+                try:
+                    response = await self._post(
+                        call.path,
+                        call.payload,
+                        call.timeout,
+                        call.priority,
+                        reserved=True,
+                    )
+                except Exception as e:
+                    _settle(call, error=e)
+                else:
+                    _settle(call, response)
+            return
+
+        # A batch serves several traces and requests: it gets its own trace,
+        # linked to each caller, no request id, and the latest deadline
+        deadline = _loosest([call.deadline for call in calls])
+        with request_id_context(None), deadline_until(
+            deadline
+        ), tracer.start_as_current_span(
+            "algorithm batch",
+            context=trace.set_span_in_context(trace.INVALID_SPAN),
+            links=[Link(call.span_context) for call in calls],
+            attributes={"algorithm.batch_size": len(calls)},
+        ):
+            await self._send_batch_request(calls)
+
+    async def _send_batch_request(self, calls: list[_PendingCall]) -> None:
+        payload = {
+            "requests": [{"path": call.path, "payload": call.payload} for call in calls]
+        }
+        try:
+            response = await self.post(
+                BATCH_PATH,
+                payload,
+                _loosest([call.timeout for call in calls]),
+                min(call.priority for call in calls),
+            )
+        except Exception as e:
+            for call in calls:
+                _settle(call, error=e)
+            return
+
+        items = response.data.get("responses")
+        if not response.ok or not isinstance(items, list) or len(items) != len(calls):
+            status_code = response.status_code if not response.ok else 502
+            for call in calls:
+                _settle(
+                    call,
+                    AlgorithmResponse(
+                        status_code, {}, response.version, text=response.text
+                    ),
+                )
+            return
+
+        for call, item in zip(calls, items):
+            item_response = self._batch_item_response(item, response.version)
+            if not item_response.ok:
+                count_algorithm_error(
+                    call.path, _status_reason(item_response.status_code)
+                )
+            _settle(call, item_response)
+
+    @staticmethod
+    def _batch_item_response(item: Any, batch_version: str) -> AlgorithmResponse:
+        """One entry of a /batch response: ``{"status_code": ..., "body": {...}}``"""
+        if not isinstance(item, dict):
+            return AlgorithmResponse(502, {}, batch_version)
+
+        status_code = item.get("status_code", 200)
+        body = item.get("body")
+        data = body if status_code == 200 and isinstance(body, dict) else {}
+
+        version = data.get("algorithm_version")
+        if not isinstance(version, str) or not version:
+            version = batch_version
+
+        text = "" if status_code == 200 else str(body)
+        return AlgorithmResponse(status_code, data, version, text=text)
+
+    async def refresh_version(self) -> str:
+        """Ask the service which version it runs (called at startup)"""
+        async with httpx.AsyncClient(transport=self.transport) as client:
+            response = await client.get(
+                f"{settings.ALGORITHM_SERVICE_URL}/health", timeout=5.0
+            )
+        response.raise_for_status()
+        return self._observe_version(response, response.json())
+
+
+def _status_reason(status_code: int) -> str:
+    """Error reason label for a non-200 response, e.g. "5xx" """
+    return f"{status_code // 100}xx"
+
+
+def _loosest(limits: list[float | None]) -> float | None:
+    """The largest of several limits, where None means no limit"""
+    if None in limits:
+        return None
+    return max(limit for limit in limits if limit is not None)
+
+
+def _settle(
+    call: _PendingCall,
+    response: AlgorithmResponse | None = None,
+    error: Exception | None = None,
+) -> None:
+    """Resolve a pending call unless its caller has already gone away"""
+    if call.future.done():
+        return
+    if error is not None:
+        call.future.set_exception(error)
+    else:
+        call.future.set_result(response)
+
+
+# Global client instance
+algorithm_client = AlgorithmClient()
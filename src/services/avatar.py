@@ -0,0 +1,127 @@
+"""
+Avatar Service
+
+Process-wide avatar cache with pre-parsed initial dialogue templates.
+Avatars change rarely, so they are loaded at startup and refreshed on a TTL
+instead of being fetched on every chat session start.
+"""
+import json
+import time
+from string import Formatter
+from typing import Any
+
+from ..config.env import settings
+from ..config.supabase import supabase_client
+from ..types.database import Avatar
+
+DEFAULT_GREETING_TEMPLATE = "Hello! I am {avatar_name}. How can I assist you today?"
+
+# Unknown IDs trigger a reload at most this often (seconds)
+MIN_RELOAD_INTERVAL = 5.0
+
+
+class AvatarTemplate:
+    """Initial dialogue prompt parsed once into literal and field segments.
+
+    Templates use ``str.format`` placeholders (e.g. ``{nickname}``). Missing
+    context values render as empty strings, and prompts that are not valid
+    format strings are treated as plain text. ``context_fields`` are the
+    placeholders the defaults do not cover, such as profile fields; without
+    any, ``greeting`` is the final text.
+    """
+
+    def __init__(self, source: str, defaults: dict[str, Any] | None = None) -> None:
+        self.source = source
+        self.defaults = defaults or {}
+
+        try:
+            parsed = list(Formatter().parse(source))
+        except ValueError:
+            parsed = [(source, None, None, None)]
+
+        self._segments: list[tuple[str, str | None]] = [
+            (literal, field_name or None) for literal, field_name, _, _ in parsed
+        ]
+        self.fields = frozenset(name for _, name in self._segments if name)
+        self.context_fields = self.fields - self.defaults.keys()
+
+        # Rendered once; this is what the fast path sends without a profile
+        self.greeting = self.render()
+
+    def render(self, **context: Any) -> str:
+        """Render the template with the given context"""
+        values = {**self.defaults, **context}
+        parts: list[str] = []
+        for literal, field_name in self._segments:
+            parts.append(literal)
+            if field_name is not None:
+                value = values.get(field_name)
+                parts.append("" if value is None else str(value))
+        return "".join(parts)
+
+
+def parse_avatar(avatar_data: dict[str, Any]) -> Avatar:
+    """Build an Avatar from a database row, decoding JSON-encoded abilities"""
+    abilities = avatar_data.get("abilities", [])
+    if isinstance(abilities, str):
+        abilities = json.loads(abilities)
+    return Avatar(**{**avatar_data, "abilities": abilities})
+
+
+class AvatarCache:
+    """Cache of avatars and their compiled greeting templates"""
+
+    def __init__(
+        self, db_client: Any = supabase_client, ttl: int = settings.AVATAR_CACHE_TTL
+    ) -> None:
+        self.db_client = db_client
+        self.ttl = ttl
+        self._avatars: dict[str, Avatar] = {}
+        self._templates: dict[str, AvatarTemplate] = {}
+        self._loaded_at: float | None = None
+
+    async def load(self) -> None:
+        """Load every avatar and compile its template (called at startup)"""
+        response = self.db_client.table("avatars").select("*").execute()
+
+        avatars: dict[str, Avatar] = {}
+        templates: dict[str, AvatarTemplate] = {}
+        for avatar_data in response.data or []:
+            avatar = parse_avatar(avatar_data)
+            avatars[str(avatar.id)] = avatar
+            templates[str(avatar.id)] = self._compile(avatar)
+
+        self._avatars = avatars
+        self._templates = templates
+        self._loaded_at = time.monotonic()
+
+    async def get(self, avatar_id: str) -> tuple[Avatar, AvatarTemplate] | None:
+        """Get an avatar and its template, reloading when stale or unknown"""
+        avatar_id = str(avatar_id)
+        if self._loaded_at is None:
+            await self.load()
+        else:
+            age = time.monotonic() - self._loaded_at
+            if age > self.ttl or (
+                avatar_id not in self._avatars and age > MIN_RELOAD_INTERVAL
+            ):
+                await self.load()
+
+        avatar = self._avatars.get(avatar_id)
+        if avatar is None:
+            return None
+        return avatar, self._templates[avatar_id]
+
+    def all(self) -> list[Avatar]:
+        """All cached avatars"""
+        return list(self._avatars.values())
+
+    def _compile(self, avatar: Avatar) -> AvatarTemplate:
+        return AvatarTemplate(
+            avatar.initial_dialogue_prompt or DEFAULT_GREETING_TEMPLATE,
+            defaults={"avatar_name": avatar.name},
+        )
+
+
+# Global cache instance
+avatar_cache = AvatarCache()
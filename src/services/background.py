@@ -0,0 +1,105 @@
+"""
+Background Task Registry
+
+Keeps strong references to fire-and-forget tasks so they are not garbage
+collected mid-flight, logs their failures, and drains them on shutdown.
+"""
+import asyncio
+import contextvars
+import logging
+from collections.abc import Awaitable, Callable, Coroutine
+from typing import Any
+
+from ..utils.deadline import set_deadline
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundTaskRegistry:
+    """Registry of in-flight background tasks"""
+
+    def __init__(self) -> None:
+        self._tasks: set[asyncio.Task[Any]] = set()
+        self._keyed: dict[str, asyncio.Task[Any]] = {}
+
+    def spawn(
+        self, coro: Coroutine[Any, Any, Any], name: str | None = None
+    ) -> asyncio.Task[Any]:
+        """Schedule a coroutine to run in the background.
+
+        The task does not inherit the caller's request deadline.
+        """
+        context = contextvars.copy_context()
+        context.run(set_deadline, None)
+        task = asyncio.create_task(coro, name=name, context=context)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_done)
+        return task
+
+    async def shielded(
+        self, coro: Coroutine[Any, Any, Any], name: str | None = None
+    ) -> Any:
+        """Run work that must finish even if the awaiting request goes away.
+
+        The work runs as a background task; cancelling the caller (client
+        disconnect, deadline) stops the wait, not the work.
+        """
+        return await asyncio.shield(self.spawn(coro, name=name))
+
+    def spawn_once(self, key: str, coro: Coroutine[Any, Any, Any]) -> asyncio.Task[Any]:
+        """Like ``spawn``, but reuse the running task already registered for ``key``"""
+        running = self._keyed.get(key)
+        if running is not None and not running.done():
+            coro.close()
+            return running
+
+        task = self.spawn(coro, name=key)
+        self._keyed[key] = task
+        task.add_done_callback(lambda _: self._keyed.pop(key, None))
+        return task
+
+    def _on_done(self, task: asyncio.Task[Any]) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                "Background task %s failed: %s", task.get_name(), task.exception()
+            )
+
+    @property
+    def pending(self) -> int:
+        """Number of tasks still running"""
+        return len(self._tasks)
+
+    async def shutdown(self, timeout: float = 10.0) -> None:
+        """Wait for running tasks, cancelling whatever is left after the timeout"""
+        if not self._tasks:
+            return
+
+        _, pending = await asyncio.wait(list(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+
+
+async def retry_with_backoff(
+    attempt: Callable[[], Awaitable[bool]],
+    attempts: int,
+    delay: float,
+    max_delay: float = 600.0,
+) -> bool:
+    """Call ``attempt`` until it returns True, doubling the wait each time.
+
+    An exception counts as a failed attempt.
+    """
+    for _ in range(attempts):
+        await asyncio.sleep(delay)
+        try:
+            if await attempt():
+                return True
+        except Exception as e:
+            logger.error("Retry attempt failed: %s", e)
+        delay = min(delay * 2, max_delay)
+    return False
+
+
+# Global registry instance
+background_tasks = BackgroundTaskRegistry()
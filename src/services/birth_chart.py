@@ -0,0 +1,215 @@
+"""
+Birth Chart Service
+
+Content-addressed cache of natal chart results. A chart depends only on the
+birth moment and place, so it is keyed on the normalized birth tuple and
+shared by every profile and other_profile with the same birth data, across
+users. Entries are stored per algorithm version: after a rollout the new
+version misses and the chart is recomputed once.
+"""
+import hashlib
+import logging
+from typing import Any
+
+from ..config.supabase import admin_client
+from ..types.database import BirthInfo
+from .algorithm import AlgorithmResult, algorithm_client
+from .scheduler import Priority
+
+logger = logging.getLogger(__name__)
+
+# Coordinates are rounded to two decimals (~1 km) before keying
+COORDINATE_DECIMALS = 2
+
+# Analysis sections that make up the chart attached to compatibility requests
+CHART_SECTIONS = ("birth_chart_traditional", "birth_chart_astrology")
+
+
+def _coordinate(value: float | None) -> str:
+    if value is None:
+        return "-"
+    # Adding 0.0 folds -0.0 into 0.0
+    return f"{round(value, COORDINATE_DECIMALS) + 0.0:.{COORDINATE_DECIMALS}f}"
+
+
+def birth_chart_key(
+    year: int,
+    month: int,
+    day: int,
+    hour: int | None = None,
+    minute: int | None = None,
+    second: int | None = None,
+    location: str | None = None,
+    longitude: float | None = None,
+    latitude: float | None = None,
+) -> str:
+    """Hash the normalized birth tuple (date, time, rounded lat/long).
+
+    The location name only takes part when coordinates are missing, since
+    the algorithm service then resolves the place from it.
+    """
+    if hour is None:
+        birth_time = "--:--:--"
+    else:
+        birth_time = f"{hour:02d}:{minute or 0:02d}:{second or 0:02d}"
+
+    if latitude is None or longitude is None:
+        place = " ".join((location or "").split()).casefold()
+    else:
+        place = f"{_coordinate(latitude)},{_coordinate(longitude)}"
+
+    normalized = f"{year:04d}-{month:02d}-{day:02d}|{birth_time}|{place}"
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def chart_key_for_birth_info(birth_info: BirthInfo) -> str:
+    """Chart key for a request's birth info"""
+    return birth_chart_key(
+        birth_info.year,
+        birth_info.month,
+        birth_info.day,
+        birth_info.hour,
+        birth_info.minute,
+        birth_info.second,
+        birth_info.location,
+        birth_info.longitude,
+        birth_info.latitude,
+    )
+
+
+def chart_key_for_profile(profile: dict[str, Any]) -> str | None:
+    """Chart key for a profiles/other_profiles row (None without a birth date)"""
+    if not (
+        profile.get("birth_year")
+        and profile.get("birth_month")
+        and profile.get("birth_day")
+    ):
+        return None
+
+    return birth_chart_key(
+        profile["birth_year"],
+        profile["birth_month"],
+        profile["birth_day"],
+        profile.get("birth_hour"),
+        profile.get("birth_minute"),
+        profile.get("birth_second"),
+        profile.get("birth_location"),
+        profile.get("birth_longitude"),
+        profile.get("birth_latitude"),
+    )
+
+
+def chart_sections(chart_data: dict[str, Any]) -> dict[str, Any]:
+    """The chart parts of a cached analysis, as sent to compatibility"""
+    return {key: chart_data[key] for key in CHART_SECTIONS if key in chart_data}
+
+
+def algorithm_birth_info(birth_info: BirthInfo) -> dict[str, Any]:
+    """Birth info payload for the algorithm service, without unset fields"""
+    birth_info_dict: dict[str, Any] = {
+        "year": birth_info.year,
+        "month": birth_info.month,
+        "day": birth_info.day,
+        "location": birth_info.location,
+    }
+
+    # Add optional fields only if they're not None
+    for field in ("hour", "minute", "second", "longitude", "latitude"):
+        value = getattr(birth_info, field)
+        if value is not None:
+            birth_info_dict[field] = value
+
+    return birth_info_dict
+
+
+class BirthChartService:
+    """Shared birth chart cache backed by the birth_charts table"""
+
+    def __init__(
+        self, db_client: Any = admin_client, version: str | None = None
+    ) -> None:
+        self.db_client = db_client
+        self._version = version
+
+    @property
+    def version(self) -> str:
+        """Algorithm version entries must match (defaults to the deployed one)"""
+        return self._version or algorithm_client.current_version
+
+    def get(self, chart_key: str) -> dict[str, Any] | None:
+        """Cached chart for the current algorithm version"""
+        response = (
+            self.db_client.table("birth_charts")
+            .select("chart_data")
+            .eq("chart_key", chart_key)
+            .eq("algorithm_version", self.version)
+            .limit(1)
+            .execute()
+        )
+        return response.data[0]["chart_data"] if response.data else None
+
+    def get_many(self, chart_keys: list[str]) -> dict[str, dict[str, Any]]:
+        """Cached charts for several keys in one query"""
+        if not chart_keys:
+            return {}
+
+        response = (
+            self.db_client.table("birth_charts")
+            .select("chart_key, chart_data")
+            .in_("chart_key", list(set(chart_keys)))
+            .eq("algorithm_version", self.version)
+            .execute()
+        )
+        return {row["chart_key"]: row["chart_data"] for row in response.data or []}
+
+    def put(
+        self, chart_key: str, chart_data: dict[str, Any], version: str | None = None
+    ) -> None:
+        """Store a chart for the given (default: current) algorithm version"""
+        self.db_client.table("birth_charts").upsert(
+            {
+                "chart_key": chart_key,
+                "algorithm_version": version or self.version,
+                "chart_data": chart_data,
+            },
+            on_conflict="chart_key,algorithm_version",
+        ).execute()
+
+    async def get_or_compute(
+        self,
+        user_id: str,
+        birth_info: BirthInfo,
+        priority: Priority = Priority.BACKGROUND,
+    ) -> AlgorithmResult | None:
+        """Return the cached chart, or compute it once and store it.
+
+        Charts are computed off the request path, so the call queues behind
+        interactive work by default. Returns None when the algorithm service
+        fails.
+        """
+        chart_key = chart_key_for_birth_info(birth_info)
+
+        cached = self.get(chart_key)
+        if cached is not None:
+            return AlgorithmResult(cached, version=self.version)
+
+        algorithm_request = {
+            "user_id": user_id,
+            "birth_info": algorithm_birth_info(birth_info),
+        }
+
+        response = await algorithm_client.post(
+            "/api/algorithm/user-profile-analysis",
+            algorithm_request,
+            priority=priority,
+        )
+
+        if not response.ok:
+            logger.warning(
+                "Algorithm service error: %s - %s", response.status_code, response.text
+            )
+            return None
+
+        chart_data = response.result("analysis_results")
+        self.put(chart_key, chart_data, version=chart_data.version)
+        return chart_data
@@ -0,0 +1,394 @@
+"""
+Cache Service
+
+Two-tier read-through cache for service methods: a small per-process LRU in
+front of Redis, which is shared by every instance. Concurrent misses for a
+key are coalesced in-process and, across instances, behind a short Redis
+lock, so a cold key is loaded once. Invalidations are published on a Redis
+channel so every instance drops its local copy.
+
+Without ``REDIS_URL`` (development, tests) only the local tier is used. The
+cache is bypassed entirely until ``start()`` is called at startup.
+"""
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar, get_type_hints
+
+from pydantic import TypeAdapter
+
+from ..config.env import settings
+from ..utils.metrics import register_stats
+
+try:
+    import redis.asyncio as aioredis  # type: ignore[import-untyped]
+except ImportError:
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "aura:cache:"
+INVALIDATION_CHANNEL = "aura:cache:invalidate"
+
+# Another instance loading the same key holds its lock at most this long
+LOCK_TTL = 10.0
+LOCK_POLL_INTERVAL = 0.05
+
+_MISSING = object()
+
+T = TypeVar("T")
+
+
+class LocalLRU:
+    """Bounded in-process LRU with a per-entry TTL"""
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return _MISSING
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TwoTierCache:
+    """Local LRU + Redis cache with stampede protection and invalidation"""
+
+    def __init__(
+        self,
+        redis_url: str = settings.REDIS_URL,
+        default_ttl: int = settings.CACHE_DEFAULT_TTL,
+        local_ttl: float = settings.CACHE_LOCAL_TTL,
+        local_max_entries: int = settings.CACHE_LOCAL_MAX_ENTRIES,
+        max_connections: int = settings.CACHE_MAX_CONNECTIONS,
+        redis: Any = None,
+    ) -> None:
+        self.redis_url = redis_url
+        self.default_ttl = default_ttl
+        self.max_connections = max_connections
+        self.local = LocalLRU(local_max_entries, local_ttl)
+        self.redis: Any = redis
+        self.hits = {"local": 0, "redis": 0}
+        self.misses = 0
+        self._owns_redis = False
+        self._inflight: dict[str, asyncio.Future[Any]] = {}
+        self._generations: dict[str, int] = {}
+        self._listener: asyncio.Task[None] | None = None
+        self._started = False
+
+    @property
+    def enabled(self) -> bool:
+        return self._started
+
+    async def start(self) -> None:
+        """Connect the shared tier (when configured) and follow invalidations"""
+        if self._started:
+            return
+
+        if self.redis is None and self.redis_url.startswith(("redis://", "rediss://")):
+            if aioredis is None:
+                logger.warning(
+                    "REDIS_URL is set but the redis package is not installed; "
+                    "the shared cache tier, cross-instance invalidation and the "
+                    "Redis rate limiter are disabled"
+                )
+            else:
+                pool = aioredis.BlockingConnectionPool.from_url(
+                    self.redis_url, max_connections=self.max_connections
+                )
+                self.redis = aioredis.Redis(connection_pool=pool)
+                self._owns_redis = True
+
+        if self.redis is not None:
+            pubsub = self.redis.pubsub()
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            self._listener = asyncio.create_task(self._listen(pubsub))
+
+        self._started = True
+
+    async def stop(self) -> None:
+        """Stop following invalidations and release the connection pool"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+        if self.redis is not None and self._owns_redis:
+            await self.redis.aclose()
+            self.redis = None
+            self._owns_redis = False
+
+        self.local.clear()
+        self._started = False
+
+    async def _listen(self, pubsub: Any) -> None:
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                for key in json.loads(message["data"]):
+                    self._drop_local(key)
+        finally:
+            await pubsub.aclose()
+
+    def _drop_local(self, key: str) -> None:
+        self.local.delete(key)
+        if key in self._inflight:
+            # A load that started before the invalidation must not store its value
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    async def get_or_load(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[T]],
+        adapter: TypeAdapter[T],
+        ttl: int | None = None,
+        cache_if: Callable[[T], bool] | None = None,
+    ) -> T:
+        """Return the cached value for ``key``, loading it once on a miss"""
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self.hits["local"] += 1
+            return value
+
+        # Single flight: concurrent misses share one load, which keeps running
+        # even if the caller that started it is cancelled
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._load_shared(key, load, adapter, ttl, cache_if)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._load_done, key))
+        return await asyncio.shield(task)
+
+    def _load_done(self, key: str, task: "asyncio.Future[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            self._generations.pop(key, None)
+        if not task.cancelled():
+            # Retrieve the exception so an unawaited failure is not logged
+            task.exception()
+
+    async def _load_shared(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[T]],
+        adapter: TypeAdapter[T],
+        ttl: int | None,
+        cache_if: Callable[[T], bool] | None,
+    ) -> T:
+        generation = self._generations.get(key, 0)
+        redis_key = CACHE_PREFIX + key
+
+        cached = await self._redis_get(redis_key)
+        if cached is not None:
+            self.hits["redis"] += 1
+            value = adapter.validate_json(cached)
+            self._store_local(key, value, generation)
+            return value
+
+        self.misses += 1
+        token = await self._lock(redis_key)
+        if token is None:
+            # Someone else is loading it; wait for their value briefly
+            cached = await self._wait_for(redis_key)
+            if cached is not None:
+                value = adapter.validate_json(cached)
+                self._store_local(key, value, generation)
+                return value
+
+        try:
+            value = await load()
+            if value is not None and (cache_if is None or cache_if(value)):
+                if self._generations.get(key, 0) == generation:
+                    self._store_local(key, value, generation)
+                    await self._redis_set(
+                        redis_key, adapter.dump_json(value), ttl or self.default_ttl
+                    )
+            return value
+        finally:
+            if token is not None:
+                await self._unlock(redis_key, token)
+
+    def _store_local(self, key: str, value: Any, generation: int) -> None:
+        if self._generations.get(key, 0) == generation:
+            self.local.set(key, value)
+
+    async def _redis_get(self, redis_key: str) -> bytes | None:
+        if self.redis is None:
+            return None
+        try:
+            return await self.redis.get(redis_key)
+        except Exception as e:
+            logger.error("Cache read error: %s", e)
+            return None
+
+    async def _redis_set(self, redis_key: str, payload: bytes, ttl: int) -> None:
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(redis_key, payload, ex=ttl)
+        except Exception as e:
+            logger.error("Cache write error: %s", e)
+
+    async def _lock(self, redis_key: str) -> str | None:
+        """Take the load lock; None when another instance holds it"""
+        if self.redis is None:
+            return ""
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self.redis.set(
+                f"{redis_key}:lock", token, nx=True, px=int(LOCK_TTL * 1000)
+            )
+        except Exception as e:
+            logger.error("Cache lock error: %s", e)
+            return ""
+        return token if acquired else None
+
+    async def _unlock(self, redis_key: str, token: str) -> None:
+        if self.redis is None or not token:
+            return
+        try:
+            lock_key = f"{redis_key}:lock"
+            held = await self.redis.get(lock_key)
+            if held is not None and held.decode() == token:
+                await self.redis.delete(lock_key)
+        except Exception as e:
+            logger.error("Cache unlock error: %s", e)
+
+    async def _wait_for(self, redis_key: str) -> bytes | None:
+        deadline = time.monotonic() + LOCK_TTL
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            cached = await self._redis_get(redis_key)
+            if cached is not None:
+                return cached
+            try:
+                if not await self.redis.exists(f"{redis_key}:lock"):
+                    return None
+            except Exception:
+                return None
+        return None
+
+    async def invalidate(self, *keys: str) -> None:
+        """Drop keys from both tiers on every instance"""
+        if not self._started or not keys:
+            return
+
+        for key in keys:
+            self._drop_local(key)
+
+        if self.redis is None:
+            return
+        try:
+            await self.redis.delete(*(CACHE_PREFIX + key for key in keys))
+            await self.redis.publish(INVALIDATION_CHANNEL, json.dumps(list(keys)))
+        except Exception as e:
+            logger.error("Cache invalidation error: %s", e)
+
+    def stats(self) -> dict[str, Any]:
+        """Hit and miss counters since startup"""
+        hits = self.hits["local"] + self.hits["redis"]
+        lookups = hits + self.misses
+        return {
+            "local_hits": self.hits["local"],
+            "redis_hits": self.hits["redis"],
+            "misses": self.misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "local_entries": len(self.local),
+        }
+
+
+# Global cache instance
+service_cache = TwoTierCache()
+
+register_stats("aura_cache", "Service cache", service_cache.stats)
+
+
+def cached(
+    namespace: str,
+    key: Callable[..., str] | None = None,
+    ttl: int | None = None,
+    cache_if: Callable[[Any], bool] | None = None,
+) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Cache an async service method's result in ``service_cache``.
+
+    The key is ``namespace`` plus the call's arguments (excluding ``self``),
+    or whatever ``key`` builds from them. Values are serialized with the
+    method's return annotation. None is never cached, nor are results for
+    which ``cache_if`` returns False. The wrapper gets an ``invalidate``
+    coroutine taking the same arguments as the method.
+    """
+
+    def decorator(
+        func: Callable[..., Awaitable[T]],
+    ) -> Callable[..., Awaitable[T]]:
+        signature = inspect.signature(func)
+
+        @functools.cache
+        def adapter() -> TypeAdapter[Any]:
+            return TypeAdapter(get_type_hints(func)["return"])
+
+        def cache_key(*args: Any, **kwargs: Any) -> str:
+            bound = signature.bind(None, *args, **kwargs)
+            bound.apply_defaults()
+            values = list(bound.arguments.values())[1:]
+            suffix = key(*values) if key else ":".join(str(value) for value in values)
+            return f"{namespace}:{suffix}"
+
+        @functools.wraps(func)
+        async def wrapper(self: Any, *args: Any, **kwargs: Any) -> T:
+            if not service_cache.enabled:
+                return await func(self, *args, **kwargs)
+
+            return await service_cache.get_or_load(
+                cache_key(*args, **kwargs),
+                lambda: func(self, *args, **kwargs),
+                adapter(),
+                ttl=ttl,
+                cache_if=cache_if,
+            )
+
+        async def invalidate(*args: Any, **kwargs: Any) -> None:
+            await service_cache.invalidate(cache_key(*args, **kwargs))
+
+        wrapper.invalidate = invalidate  # type: ignore[attr-defined]
+        wrapper.cache_key = cache_key  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
@@ -3,15 +3,25 @@ Chat Service
 
 Handles chat sessions, messaging, and integration with AI service.
 """
+import asyncio
+import logging
 from datetime import datetime
+from typing import Any
 
 import httpx
 from gotrue import SyncGoTrueClient  # type: ignore
+from postgrest import SyncPostgrestClient
+from supabase.client import Client
 
 from src.config.env import settings
 from src.config.supabase import admin_client, supabase_client
+from src.db import TableGateway, select_columns, trusted, trusted_list
+from src.services.algorithm import AlgorithmClient, algorithm_client
+from src.services.avatar import avatar_cache
+from src.services.background import background_tasks
+from src.services.realtime import realtime_hub
+from src.services.scheduler import Priority
 from src.types.database import (
-    Avatar,
     ChatHistoryResponse,
     ChatInitiateRequest,
     ChatInitiateResponse,
@@ -20,11 +30,18 @@ from src.types.database import (
     ChatMessageResponse,
     ChatSession,
     ChatSessionsResponse,
+    ChatSessionSummary,
     MessageType,
+    ProfileBirthInfo,
     ProfileResponse,
     SenderType,
 )
-from supabase.client import Client, SyncPostgrestClient
+from src.utils.helpers import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+# Columns for the session list; message data comes from the denormalized columns
+SESSION_LIST_COLUMNS = f"{select_columns(ChatSession)},avatars(name, image_url)"
 
 
 class ChatService:
@@ -34,11 +51,14 @@ class ChatService:
         self,
         db_client: Client = supabase_client,
         auth_client: SyncGoTrueClient = admin_client.auth,
-        http_client: httpx.AsyncClient = httpx.AsyncClient(),
+        algorithm: AlgorithmClient = algorithm_client,
     ) -> None:
         self.db_client: SyncPostgrestClient = db_client
         self.auth_client: SyncGoTrueClient = auth_client
-        self.http_client = http_client
+        self.algorithm = algorithm
+        self.sessions = TableGateway(db_client, "chat_sessions")
+        self.messages = TableGateway(db_client, "chat_messages")
+        self.profiles = TableGateway(db_client, "profiles")
 
     async def initiate_chat(
         self, user_id: str, request: ChatInitiateRequest
@@ -57,27 +77,95 @@ class ChatService:
             ValueError: If the avatar is not found, session creation fails, or initial AI message storage fails.
             RuntimeError: If there is an error communicating with the algorithm service.
         """
-        # Check if the avatar exists
-        avatar_response = (
-            self.db_client.table("avatars")
-            .select("*", count="exact")
-            .eq("id", str(request.avatar_id))
-            .single()
-            .execute()
-        )
-
-        if not avatar_response.data:
+        # Avatar and its compiled greeting come from the in-process cache
+        cached_avatar = await avatar_cache.get(str(request.avatar_id))
+        if cached_avatar is None:
             raise ValueError(f"Avatar with ID {request.avatar_id} not found.")
 
-        avatar = Avatar(**avatar_response.data)
+        avatar, greeting_template = cached_avatar
+        greeting = greeting_template.greeting
+        if greeting_template.context_fields:
+            # Placeholders such as {nickname} are filled from the user's profile
+            profile = await asyncio.to_thread(
+                self.profiles.get_by_id, user_id, columns=ProfileBirthInfo
+            )
+            greeting = greeting_template.render(**(profile or {}))
 
-        # Create a new chat session
+        # The session insert and the algorithm call only depend on the avatar,
+        # so they run concurrently; the blocking PostgREST insert goes to a thread.
+        session_start_time = datetime.now().isoformat()
         session_data = {
             "user_id": user_id,
             "avatar_id": str(request.avatar_id),
-            "session_start_time": datetime.now().isoformat(),
+            "session_start_time": session_start_time,
+            "last_message_at": session_start_time,
             "is_active": True,
         }
+        greeting_deadline = (
+            asyncio.get_running_loop().time() + settings.CHAT_GREETING_TIMEOUT
+        )
+        initial_message_task = asyncio.create_task(
+            self._get_initial_message(user_id=user_id, initial_message_content=greeting)
+        )
+
+        try:
+            new_session = await asyncio.to_thread(self._insert_session, session_data)
+        except BaseException:
+            # No session to attach the greeting to; abandon the algorithm call
+            initial_message_task.cancel()
+            raise
+
+        session_id = str(new_session.id)
+
+        # Wait for the profile-aware greeting only until CHAT_GREETING_TIMEOUT
+        # after it was requested; after that the pre-rendered greeting is
+        # returned and the real one is delivered over the session WebSocket.
+        try:
+            initial_message_obj, user_profile_obj = await asyncio.wait_for(
+                asyncio.shield(initial_message_task),
+                timeout=max(greeting_deadline - asyncio.get_running_loop().time(), 0),
+            )
+        except TimeoutError:
+            background_tasks.spawn(
+                self._complete_initial_message(
+                    user_id, session_id, initial_message_task
+                ),
+                name=f"initial-message-{session_id}",
+            )
+            stored_greeting = await self._store_ai_message(
+                user_id, session_id, greeting
+            )
+            return ChatInitiateResponse(
+                session_id=new_session.id,
+                initial_message=stored_greeting,
+                user_profile=None,
+                avatar=avatar,
+                profile_message_pending=True,
+            )
+        except BaseException:
+            # Compensate: don't leave an empty session behind, and abandon
+            # the algorithm call (wait_for only cancels the shield)
+            initial_message_task.cancel()
+            await asyncio.to_thread(self._delete_session, session_id)
+            raise
+
+        stored_initial_message = await self._store_ai_message(
+            user_id, session_id, initial_message_obj.content
+        )
+
+        return ChatInitiateResponse(
+            session_id=new_session.id,
+            initial_message=stored_initial_message,
+            user_profile=user_profile_obj,
+            avatar=avatar,
+        )
+
+    def _insert_session(self, session_data: dict[str, Any]) -> ChatSession:
+        """Inserts a chat session row (blocking; run in a worker thread).
+
+        Raises:
+            ValueError: If the session could not be created.
+        """
         session_response = (
             self.db_client.table("chat_sessions").insert(session_data).execute()
         )
@@ -85,22 +173,38 @@ class ChatService:
         if not session_response.data or session_response.count == 0:
             raise ValueError("Failed to create chat session.")
 
-        new_session = ChatSession(**session_response.data[0])
+        return ChatSession(**session_response.data[0])
 
-        # Get initial AI message and user profile from algorithm service
-        initial_message_content = (
-            f"Hello! I am {avatar.name}. How can I assist you today?"
-        )
-        initial_message_obj, user_profile_obj = await self._get_initial_message(
-            user_id=user_id, initial_message_content=initial_message_content
-        )
+    def _delete_session(self, session_id: str) -> None:
+        """Deletes a chat session created by a failed initiate_chat (blocking)."""
+        try:
+            self.db_client.table("chat_sessions").delete().eq(
+                "id", session_id
+            ).execute()
+        except Exception as e:
+            logger.error("Failed to roll back chat session %s: %s", session_id, e)
 
-        # Store the initial AI message
+    async def _store_ai_message(
+        self, user_id: str, session_id: str, content: str
+    ) -> ChatMessage:
+        """Stores an AI text message and publishes it to realtime subscribers.
+
+        Args:
+            user_id (str): The ID of the session owner.
+            session_id (str): The ID of the chat session.
+            content (str): The message content.
+
+        Returns:
+            ChatMessage: The stored message.
+
+        Raises:
+            ValueError: If the message could not be stored.
+        """
         ai_message_data = {
-            "session_id": str(new_session.id),
+            "session_id": session_id,
             "sender_type": SenderType.AI.value,
             "message_type": MessageType.TEXT.value,
-            "content": initial_message_obj.content,
+            "content": content,
             "timestamp": datetime.now().isoformat(),
         }
         ai_message_response = (
@@ -111,14 +215,31 @@ class ChatService:
             raise ValueError("Failed to store initial AI message.")
 
         # Create ChatMessage object from the stored data to ensure consistency
-        stored_initial_message = ChatMessage(**ai_message_response.data[0])
+        stored_message = ChatMessage(**ai_message_response.data[0])
+        await realtime_hub.publish_message(user_id, session_id, stored_message)
+        return stored_message
 
-        return ChatInitiateResponse(
-            session_id=new_session.id,
-            initial_message=stored_initial_message,
-            user_profile=user_profile_obj,
-            avatar=avatar,
-        )
+    async def _complete_initial_message(
+        self,
+        user_id: str,
+        session_id: str,
+        initial_message_task: asyncio.Task[tuple[ChatMessage, ProfileResponse]],
+    ) -> None:
+        """Stores the profile-aware greeting once the slow algorithm call finishes.
+
+        Args:
+            user_id (str): The ID of the session owner.
+            session_id (str): The ID of the chat session.
+            initial_message_task (asyncio.Task): The in-flight algorithm call.
+        """
+        try:
+            initial_message_obj, _ = await initial_message_task
+        except Exception as e:
+            # The pre-rendered greeting already stands in for it
+            logger.error("Deferred initial message failed: %s", e)
+            return
+
+        await self._store_ai_message(user_id, session_id, initial_message_obj.content)
 
     async def send_message(
         self, session_id: str, user_id: str, request: ChatMessageRequest
@@ -137,16 +258,8 @@ class ChatService:
             ValueError: If the chat session is not found or message storage fails.
             RuntimeError: If there is an error communicating with the algorithm service.
         """
-        # Verify chat session exists
-        session_response = (
-            self.db_client.table("chat_sessions")
-            .select("*", count="exact")
-            .eq("id", session_id)
-            .single()
-            .execute()
-        )
-
-        if not session_response.data:
+        # Verify chat session exists and belongs to the user
+        if not self.sessions.exists(id=session_id, user_id=user_id):
             raise ValueError("Chat session not found.")
 
         # Store user message
@@ -165,6 +278,7 @@ class ChatService:
             raise ValueError("Failed to store user message.")
 
         user_message = ChatMessage(**user_message_response.data[0])
+        await realtime_hub.publish_message(user_id, session_id, user_message)
 
         # Get AI response from algorithm service
         ai_response_obj = await self._get_ai_response(
@@ -187,119 +301,150 @@ class ChatService:
 
         if not stored_ai_message_response.data or stored_ai_message_response.count == 0:
             # This is a critical failure, consider more robust error handling/rollback
-            print("Warning: Failed to store AI response message.")
+            logger.warning("Failed to store AI response message.")
             stored_ai_message = None  # type: ignore[assignment]
         else:
             stored_ai_message = ChatMessage(**stored_ai_message_response.data[0])
+            await realtime_hub.publish_message(user_id, session_id, stored_ai_message)
 
         return ChatMessageResponse(message=user_message, ai_response=stored_ai_message)
 
     async def get_chat_history(
-        self, session_id: str, user_id: str
+        self,
+        session_id: str,
+        user_id: str,
+        limit: int = 50,
+        offset: int = 0,
+        with_count: bool = False,
     ) -> ChatHistoryResponse:
-        """Retrieves the chat history for a given session.
+        """Retrieves a page of the chat history for a given session.
 
         Args:
             session_id (str): The ID of the chat session.
             user_id (str): The ID of the user requesting the history.
+            limit (int): Maximum number of messages to return.
+            offset (int): Number of messages to skip.
+            with_count (bool): Include an estimated total message count (for UI badges).
 
         Returns:
-            ChatHistoryResponse: The chat session details and a list of messages.
+            ChatHistoryResponse: The chat session details and a page of messages.
 
         Raises:
             ValueError: If the chat session is not found.
         """
-        session_response = (
-            self.db_client.table("chat_sessions")
-            .select("*", count="exact")
-            .eq("id", session_id)
-            .eq("user_id", user_id)
-            .single()
-            .execute()
+        session_data = self.sessions.get_by_id(
+            session_id, columns=ChatSession, user_id=user_id
         )
 
-        if not session_response.data:
+        if not session_data:
             raise ValueError("Chat session not found.")
 
-        session = ChatSession(**session_response.data)
-
-        messages_response = (
-            self.db_client.table("chat_messages")
-            .select("*", count="exact")
-            .eq("session_id", session_id)
-            .order("timestamp", desc=False)
-            .execute()
+        # Sent straight to the client: see src.db.rows
+        session = trusted(ChatSession, session_data)
+
+        if session.unread_count:
+            # Opening the history marks the session as read
+            self.db_client.table("chat_sessions").update({"unread_count": 0}).eq(
+                "id", session_id
+            ).execute()
+            session.unread_count = 0
+
+        page = self.messages.list_page(
+            {"session_id": session_id},
+            order_by="timestamp",
+            limit=limit,
+            offset=offset,
+            columns=ChatMessage,
+            count="estimated" if with_count else None,
         )
 
-        messages = [
-            ChatMessage(**msg)
-            for msg in messages_response.data
-            if messages_response.data
-        ]
+        return ChatHistoryResponse(
+            session=session,
+            messages=trusted_list(ChatMessage, page.rows),
+            has_more=page.has_more,
+            total_estimate=page.total,
+        )
 
-        return ChatHistoryResponse(session=session, messages=messages)
+    async def get_user_sessions(
+        self, user_id: str, limit: int = 20, cursor: str | None = None
+    ) -> ChatSessionsResponse:
+        """Retrieves a page of chat sessions for a given user, most recent activity first.
 
-    async def get_user_sessions(self, user_id: str) -> ChatSessionsResponse:
-        """Retrieves all chat sessions for a given user, including related avatar and profile info.
+        The list is served from the denormalized ``last_message_*`` and ``message_count``
+        columns on ``chat_sessions`` (maintained by a trigger on ``chat_messages`` insert),
+        so no message rows are read. Pagination uses a keyset cursor on
+        ``(last_message_at, id)`` instead of an offset.
 
         Args:
             user_id (str): The ID of the user.
+            limit (int): Maximum number of sessions to return.
+            cursor (str | None): Opaque cursor returned by the previous page.
 
         Returns:
-            ChatSessionsResponse: A list of chat sessions with associated avatar and user profile.
+            ChatSessionsResponse: A page of sessions with avatar display info and the next cursor.
+
+        Raises:
+            ValueError: If the cursor is malformed.
         """
-        sessions_response = (
+        query = (
             self.db_client.table("chat_sessions")
-            .select(
-                "*,"
-                "avatars(id, name, image_url),"
-                "profiles(id, nickname, gender, birth_year, birth_month, birth_day, birth_location, analysis_completed)"
-            )
+            .select(SESSION_LIST_COLUMNS)
             .eq("user_id", user_id)
-            .order("session_start_time", desc=True)
+        )
+
+        if cursor:
+            last_message_at, last_id = decode_cursor(cursor, 2)
+            query = query.or_(
+                f'last_message_at.lt."{last_message_at}",'
+                f'and(last_message_at.eq."{last_message_at}",id.lt.{last_id})'
+            )
+
+        sessions_response = (
+            query.order("last_message_at", desc=True)
+            .order("id", desc=True)
+            .limit(limit + 1)
             .execute()
         )
 
+        rows = sessions_response.data or []
+        has_more = len(rows) > limit
+
         sessions = []
-        for session_data in sessions_response.data:
-            avatar_data = session_data.pop("avatars")  # Extract avatar data
-            profile_data = session_data.pop("profiles")  # Extract profile data
-
-            # Create Avatar and Profile objects
-            avatar_obj = Avatar(**avatar_data) if avatar_data else None
-
-            # Manually instantiate ProfileResponse, handling potential None values
-            # profile_obj is not directly used for ChatSession appending, it's for type consistency of data from DB
-            # profile_obj = None
-            # Removed profile_obj instantiation as it was unused and caused linting errors
-            # if profile_data:
-            #     profile_obj = ProfileResponse(
-            #         id=UUID(profile_data['id']),
-            #         nickname=profile_data.get('nickname'),
-            #         gender=GenderEnum(profile_data['gender']) if profile_data.get('gender') else None,
-            #         birth_year=profile_data.get('birth_year'),
-            #         birth_month=profile_data.get('birth_month'),
-            #         birth_day=profile_data.get('birth_day'),
-            #         birth_hour=None, # Assuming these are not returned by this specific select
-            #         birth_minute=None,
-            #         birth_second=None,
-            #         birth_location=profile_data.get('birth_location'),
-            #         birth_longitude=None, # Assuming these are not returned by this specific select
-            #         birth_latitude=None,
-            #         selected_avatar=avatar_obj, # Link the avatar object
-            #         analysis_completed=profile_data.get('analysis_completed', False),
-            #         created_at=datetime.fromisoformat(profile_data['created_at']),
-            #         updated_at=datetime.fromisoformat(profile_data['updated_at'])
-            #     )
-
-            # Reconstruct session data with correct avatar and profile objects
-            session_obj = ChatSession(**session_data)
-            # NOTE: ChatSession does not directly contain profile or full avatar objects,
-            # these are part of the outer response structure or retrieved separately.
-            # For now, we will return the basic ChatSession objects.
-            sessions.append(session_obj)
-
-        return ChatSessionsResponse(sessions=sessions)
+        for session_data in rows[:limit]:
+            avatar_data = session_data.pop("avatars", None) or {}
+            sessions.append(
+                ChatSessionSummary(
+                    **session_data,
+                    avatar_name=avatar_data.get("name"),
+                    avatar_image_url=avatar_data.get("image_url"),
+                )
+            )
+
+        next_cursor = None
+        if has_more and sessions:
+            last_session = sessions[-1]
+            next_cursor = encode_cursor(
+                last_session.last_message_at.isoformat()
+                if last_session.last_message_at
+                else last_session.session_start_time.isoformat(),
+                last_session.id,
+            )
+
+        return ChatSessionsResponse(
+            sessions=sessions, next_cursor=next_cursor, has_more=has_more
+        )
+
+    async def is_session_owner(self, session_id: str, user_id: str) -> bool:
+        """Checks whether a chat session belongs to the given user.
+
+        Args:
+            session_id (str): The ID of the chat session.
+            user_id (str): The ID of the user.
+
+        Returns:
+            bool: True if the session exists and is owned by the user.
+        """
+        return self.sessions.exists(id=session_id, user_id=user_id)
 
     async def _get_initial_message(
         self, user_id: str, initial_message_content: str
@@ -318,16 +463,32 @@ class ChatService:
             RuntimeError: If there is a network or unexpected error during communication.
         """
         try:
-            response = await self.http_client.post(
-                f"{settings.ALGORITHM_SERVICE_URL}/chat/initiate",
-                json={
-                    "user_id": user_id,
-                    "initial_message": initial_message_content,
-                },
-                timeout=settings.ALGORITHM_SERVICE_TIMEOUT,
+            response = await self.algorithm.post(
+                "/chat/initiate",
+                {"user_id": user_id, "initial_message": initial_message_content},
+                priority=Priority.INTERACTIVE,
             )
-            response.raise_for_status()  # Raise an exception for HTTP errors (4xx or 5xx)
-            response_data = response.json()
+        except httpx.RequestError as e:
+            logger.error("Network error during initial message retrieval: %s", e)
+            raise RuntimeError(
+                "Failed to get initial message from algorithm service"
+            ) from e
+        except Exception as e:
+            logger.error("Unexpected error during initial message retrieval: %s", e)
+            raise RuntimeError(
+                "Failed to get initial message from algorithm service"
+            ) from e
+
+        if not response.ok:
+            logger.error(
+                "HTTP error during initial message retrieval: %s - %s",
+                response.status_code,
+                response.text,
+            )
+            raise ValueError("Algorithm service error during initial message retrieval")
+
+        try:
+            response_data = response.data
 
             if (
                 "initial_message" not in response_data
@@ -339,18 +500,8 @@ class ChatService:
             user_profile = ProfileResponse(**response_data["user_profile"])
 
             return initial_message, user_profile
-        except httpx.HTTPStatusError as e:
-            print(f"HTTP error during initial message retrieval: {e}")
-            raise ValueError(
-                "Algorithm service error during initial message retrieval"
-            ) from e
-        except httpx.RequestError as e:
-            print(f"Network error during initial message retrieval: {e}")
-            raise RuntimeError(
-                "Failed to get initial message from algorithm service"
-            ) from e
         except Exception as e:
-            print(f"Unexpected error during initial message retrieval: {e}")
+            logger.error("Unexpected error during initial message retrieval: %s", e)
             raise RuntimeError(
                 "Failed to get initial message from algorithm service"
             ) from e
@@ -373,17 +524,36 @@ class ChatService:
             RuntimeError: If there is a network or unexpected error during communication.
         """
         try:
-            response = await self.http_client.post(
-                f"{settings.ALGORITHM_SERVICE_URL}/chat/send_message",
-                json={
+            response = await self.algorithm.post(
+                "/chat/send_message",
+                {
                     "session_id": session_id,
                     "user_id": user_id,
                     "message": message_content,
                 },
-                timeout=settings.ALGORITHM_SERVICE_TIMEOUT,
+                priority=Priority.INTERACTIVE,
+            )
+        except httpx.RequestError as e:
+            logger.error("Network error during AI response retrieval: %s", e)
+            raise RuntimeError(
+                "Failed to get AI response from algorithm service"
+            ) from e
+        except Exception as e:
+            logger.error("Unexpected error during AI response retrieval: %s", e)
+            raise RuntimeError(
+                "Failed to get AI response from algorithm service"
+            ) from e
+
+        if not response.ok:
+            logger.error(
+                "HTTP error during AI response retrieval: %s - %s",
+                response.status_code,
+                response.text,
             )
-            response.raise_for_status()  # Raise an exception for HTTP errors (4xx or 5xx)
-            response_data = response.json()
+            raise ValueError("Algorithm service error during AI response retrieval")
+
+        try:
+            response_data = response.data
 
             if "ai_response" not in response_data:
                 raise ValueError("Algorithm service returned incomplete data.")
@@ -391,18 +561,8 @@ class ChatService:
             ai_response = ChatMessage(**response_data["ai_response"])
 
             return ai_response
-        except httpx.HTTPStatusError as e:
-            print(f"HTTP error during AI response retrieval: {e}")
-            raise ValueError(
-                "Algorithm service error during AI response retrieval"
-            ) from e
-        except httpx.RequestError as e:
-            print(f"Network error during AI response retrieval: {e}")
-            raise RuntimeError(
-                "Failed to get AI response from algorithm service"
-            ) from e
         except Exception as e:
-            print(f"Unexpected error during AI response retrieval: {e}")
+            logger.error("Unexpected error during AI response retrieval: %s", e)
             raise RuntimeError(
                 "Failed to get AI response from algorithm service"
             ) from e
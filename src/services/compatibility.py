@@ -3,32 +3,48 @@ Compatibility Service
 
 Handles other person profiles and compatibility analysis.
 """
+import logging
 from datetime import datetime
 from typing import Any
 
-import httpx
-
 from ..config.env import settings
 from ..config.supabase import admin_client, supabase_client
+from ..db import TableGateway, select_columns, trusted_list
 from ..types.database import (
     ChatMessage,
-    CompatibilityAnalysisResult,
+    CompatibilityAnalysisData,
     CompatibilityRequest,
     CompatibilityResponse,
     CreateOtherProfileRequest,
     MessageType,
-    OtherProfile,
+    OtherProfileBirthInfo,
     OtherProfileResponse,
+    ProfileBirthInfo,
+    RowId,
     SenderType,
 )
+from .algorithm import AlgorithmResult, algorithm_client
+from .background import background_tasks, retry_with_backoff
+from .birth_chart import BirthChartService, chart_key_for_profile, chart_sections
+from .realtime import realtime_hub
+from .scheduler import Priority
+
+logger = logging.getLogger(__name__)
 
 
 class CompatibilityService:
     """Service for handling compatibility analysis"""
 
-    def __init__(self) -> None:
-        self.supabase = supabase_client
-        self.admin_supabase = admin_client
+    def __init__(
+        self, supabase: Any = supabase_client, admin_supabase: Any = admin_client
+    ) -> None:
+        self.supabase = supabase
+        self.admin_supabase = admin_supabase
+        self.profiles = TableGateway(supabase, "profiles")
+        self.other_profiles = TableGateway(supabase, "other_profiles")
+        self.analyses = TableGateway(supabase, "compatibility_analysis_results")
+        self.sessions = TableGateway(supabase, "chat_sessions")
+        self.birth_charts = BirthChartService(admin_supabase)
 
     async def create_other_profile(
         self, user_id: str, request: CreateOtherProfileRequest
@@ -58,87 +74,43 @@ class CompatibilityService:
         if not response.data:
             raise Exception("Failed to create other profile")
 
-        profile = OtherProfile(**response.data[0])
-
-        return OtherProfileResponse(
-            id=profile.id,
-            name=profile.name,
-            gender=profile.gender,
-            birth_year=profile.birth_year,
-            birth_month=profile.birth_month,
-            birth_day=profile.birth_day,
-            birth_hour=profile.birth_hour,
-            birth_minute=profile.birth_minute,
-            birth_second=profile.birth_second,
-            birth_location=profile.birth_location,
-            relation_type=profile.relation_type,
-            created_at=profile.created_at,
+        # Validated once, straight into the response model
+        profile = OtherProfileResponse.model_validate(response.data[0])
+
+        # Warm the shared chart so later analyses send it precomputed
+        background_tasks.spawn(
+            self._warm_birth_chart(user_id, request),
+            name=f"birth-chart-{profile.id}",
         )
 
+        return profile
+
     async def get_other_profiles(self, user_id: str) -> list[OtherProfileResponse]:
         """Get all other profiles for a user"""
 
         response = (
             self.supabase.table("other_profiles")
-            .select("*")
+            .select(select_columns(OtherProfileResponse))
             .eq("user_id", user_id)
             .order("created_at", desc=True)
             .execute()
         )
 
-        profiles = []
-        for profile_data in response.data:
-            profile = OtherProfile(**profile_data)
-            profiles.append(
-                OtherProfileResponse(
-                    id=profile.id,
-                    name=profile.name,
-                    gender=profile.gender,
-                    birth_year=profile.birth_year,
-                    birth_month=profile.birth_month,
-                    birth_day=profile.birth_day,
-                    birth_hour=profile.birth_hour,
-                    birth_minute=profile.birth_minute,
-                    birth_second=profile.birth_second,
-                    birth_location=profile.birth_location,
-                    relation_type=profile.relation_type,
-                    created_at=profile.created_at,
-                )
-            )
-
-        return profiles
+        # Sent straight to the client: see src.db.rows
+        return trusted_list(OtherProfileResponse, response.data)
 
     async def get_other_profile(
         self, user_id: str, profile_id: str
     ) -> OtherProfileResponse | None:
         """Get specific other profile by ID"""
-        response = (
-            self.supabase.table("other_profiles")
-            .select("*")
-            .eq("user_id", user_id)
-            .eq("id", profile_id)
-            .execute()
+        profile_data = self.other_profiles.get_by_id(
+            profile_id, columns=OtherProfileResponse, user_id=user_id
         )
 
-        if not response.data:
+        if not profile_data:
             return None
 
-        profile_data = response.data[0]
-        profile = OtherProfile(**profile_data)
-        return OtherProfileResponse(
-            id=profile.id,
-            name=profile.name,
-            gender=profile.gender,
-            birth_year=profile.birth_year,
-            birth_month=profile.birth_month,
-            birth_day=profile.birth_day,
-            birth_hour=profile.birth_hour,
-            birth_minute=profile.birth_minute,
-            birth_second=profile.birth_second,
-            birth_location=profile.birth_location,
-            relation_type=profile.relation_type,
-            created_at=profile.created_at,
-        )
+        return OtherProfileResponse(**profile_data)
 
     async def analyze_compatibility(
         self, user_id: str, request: CompatibilityRequest
@@ -146,70 +118,60 @@ class CompatibilityService:
         """Perform compatibility analysis"""
 
         # Get other profile
-        other_profile_response = (
-            self.supabase.table("other_profiles")
-            .select("*")
-            .eq("id", str(request.other_profile_id))
-            .eq("user_id", user_id)
-            .execute()
+        other_profile_data = self.other_profiles.get_by_id(
+            request.other_profile_id, columns=OtherProfileBirthInfo, user_id=user_id
         )
 
-        if not other_profile_response.data:
+        if not other_profile_data:
             raise Exception("Other profile not found")
 
-        other_profile_data = other_profile_response.data[0]
-        other_profile = OtherProfile(**other_profile_data)
+        other_profile = OtherProfileBirthInfo(**other_profile_data)
 
         # Get main user profile
-        main_profile_response = (
-            self.supabase.table("profiles").select("*").eq("id", user_id).execute()
-        )
+        main_profile = self.profiles.get_by_id(user_id, columns=ProfileBirthInfo)
 
-        if not main_profile_response.data:
+        if not main_profile:
             raise Exception("User profile not found")
 
-        main_profile = main_profile_response.data[0]
-
         # Check if analysis already exists
         existing_analysis = await self._get_existing_analysis(
             user_id, str(request.other_profile_id)
         )
 
+        degraded = False
         if existing_analysis:
             compatibility_result = existing_analysis.analysis_data
-        else:
-            # Perform new analysis
-            compatibility_result = await self._perform_compatibility_analysis(
-                main_profile, other_profile_data, request.analysis_depth
-            )
 
-            # Store analysis result
-            await self._store_analysis_result(
-                user_id, str(request.other_profile_id), compatibility_result
+            # Create related chat message
+            related_message = await self._create_compatibility_message(
+                user_id, compatibility_result, other_profile.name
             )
-
-        # Create related chat message
-        related_message = await self._create_compatibility_message(
-            user_id, compatibility_result, other_profile.name
-        )
+        else:
+            # Perform new analysis; it runs to completion even if the client
+            # disconnects, so the result is stored rather than thrown away
+            analysis_result, related_message = await background_tasks.shielded(
+                self._analyze_and_store(
+                    user_id,
+                    str(request.other_profile_id),
+                    main_profile,
+                    other_profile_data,
+                    request.analysis_depth,
+                    other_profile.name,
+                ),
+                name=f"compatibility-{user_id}-{request.other_profile_id}",
+            )
+            compatibility_result = analysis_result
+            degraded = analysis_result.degraded
 
         return CompatibilityResponse(
             compatibility_result=compatibility_result,
             other_profile=OtherProfileResponse(
-                id=other_profile.id,
-                name=other_profile.name,
-                gender=other_profile.gender,
-                birth_year=other_profile.birth_year,
-                birth_month=other_profile.birth_month,
-                birth_day=other_profile.birth_day,
-                birth_hour=other_profile.birth_hour,
-                birth_minute=other_profile.birth_minute,
-                birth_second=other_profile.birth_second,
-                birth_location=other_profile.birth_location,
-                relation_type=other_profile.relation_type,
-                created_at=other_profile.created_at,
+                **other_profile.model_dump(
+                    include=set(OtherProfileResponse.model_fields)
+                )
             ),
             related_message=related_message,
+            degraded=degraded,
         )
 
     async def get_compatibility_history(
@@ -219,7 +181,9 @@ class CompatibilityService:
 
         response = (
             self.supabase.table("compatibility_analysis_results")
-            .select("*, other_profiles(*)")
+            .select(
+                f"analysis_data,other_profiles({select_columns(OtherProfileResponse)})"
+            )
             .eq("user_id_main", user_id)
             .order("analysis_date", desc=True)
             .range(offset, offset + limit - 1)
@@ -228,21 +192,7 @@ class CompatibilityService:
 
         results = []
         for analysis_data in response.data:
-            other_profile_data = analysis_data["other_profiles"]
-            other_profile = OtherProfileResponse(
-                id=other_profile_data["id"],
-                name=other_profile_data["name"],
-                gender=other_profile_data.get("gender"),
-                birth_year=other_profile_data["birth_year"],
-                birth_month=other_profile_data["birth_month"],
-                birth_day=other_profile_data["birth_day"],
-                birth_hour=other_profile_data.get("birth_hour"),
-                birth_minute=other_profile_data.get("birth_minute"),
-                birth_second=other_profile_data.get("birth_second"),
-                birth_location=other_profile_data.get("birth_location"),
-                relation_type=other_profile_data.get("relation_type"),
-                created_at=other_profile_data["created_at"],
-            )
+            other_profile = OtherProfileResponse(**analysis_data["other_profiles"])
 
             compatibility_response = CompatibilityResponse(
                 compatibility_result=analysis_data["analysis_data"],
@@ -256,15 +206,7 @@ class CompatibilityService:
     async def delete_other_profile(self, user_id: str, profile_id: str) -> bool:
         """Delete other person profile"""
         # First check if profile exists and belongs to user
-        existing_response = (
-            self.supabase.table("other_profiles")
-            .select("id")
-            .eq("user_id", user_id)
-            .eq("id", profile_id)
-            .execute()
-        )
-
-        if not existing_response.data:
+        if not self.other_profiles.exists(user_id=user_id, id=profile_id):
             return False
 
         # Delete the profile
@@ -280,19 +222,17 @@ class CompatibilityService:
 
     async def _get_existing_analysis(
         self, user_id: str, other_profile_id: str
-    ) -> CompatibilityAnalysisResult | None:
+    ) -> CompatibilityAnalysisData | None:
         """Check if compatibility analysis already exists"""
 
-        response = (
-            self.supabase.table("compatibility_analysis_results")
-            .select("*")
-            .eq("user_id_main", user_id)
-            .eq("other_profile_id", other_profile_id)
-            .execute()
+        analysis = self.analyses.get_one(
+            columns=CompatibilityAnalysisData,
+            user_id_main=user_id,
+            other_profile_id=other_profile_id,
         )
 
-        if response.data:
-            return CompatibilityAnalysisResult(**response.data[0])
+        if analysis:
+            return CompatibilityAnalysisData(**analysis)
 
         return None
 
@@ -301,7 +241,8 @@ class CompatibilityService:
         main_profile: dict[str, Any],
         other_profile: dict[str, Any],
         analysis_depth: str,
-    ) -> dict[str, Any]:
+        priority: Priority = Priority.NORMAL,
+    ) -> AlgorithmResult:
         """Perform compatibility analysis using algorithm service"""
 
         try:
@@ -332,48 +273,161 @@ class CompatibilityService:
                 "birth_latitude": other_profile.get("birth_latitude"),
             }
 
-            async with httpx.AsyncClient() as client:
-                payload = {
-                    "user_id_main": main_profile["id"],
-                    "main_profile_birth_info": main_birth_info,
-                    "other_profile_birth_info": other_birth_info,
-                    "analysis_depth": analysis_depth,
-                }
-
-                response = await client.post(
-                    f"{settings.ALGORITHM_SERVICE_URL}/api/algorithm/compatibility/calculate",
-                    json=payload,
-                    timeout=60.0,  # Longer timeout for complex analysis
-                )
+            payload = {
+                "user_id_main": main_profile["id"],
+                "main_profile_birth_info": main_birth_info,
+                "other_profile_birth_info": other_birth_info,
+                "analysis_depth": analysis_depth,
+            }
+            payload.update(self._cached_birth_charts(main_profile, other_profile))
 
-                if response.status_code == 200:
-                    result = response.json()
-                    return dict(result.get("compatibility_result", {}))
-                else:
-                    print(
-                        f"Algorithm service error: {response.status_code} - {response.text}"
-                    )
+            response = await algorithm_client.batched(
+                "/api/algorithm/compatibility/calculate",
+                payload,
+                priority=priority,
+            )
+
+            if response.ok:
+                return response.result("compatibility_result")
+            else:
+                logger.warning(
+                    "Algorithm service error: %s - %s",
+                    response.status_code,
+                    response.text,
+                )
 
         except Exception as e:
-            print(f"Error calling algorithm service: {str(e)}")
+            logger.error("Error calling algorithm service: %s", e)
 
         # Fallback analysis result
-        return {
-            "overall_score": 75,
-            "aspect_scores": {
-                "emotional_connection": 80,
-                "communication_style": 70,
-                "values_alignment": 75,
-                "conflict_resolution": 75,
+        return AlgorithmResult.fallback(
+            {
+                "overall_score": 75,
+                "aspect_scores": {
+                    "emotional_connection": 80,
+                    "communication_style": 70,
+                    "values_alignment": 75,
+                    "conflict_resolution": 75,
+                },
+                "relationship_overview": "你们之间有着不错的匹配度，在多个方面都展现出良好的兼容性。",
+                "short_term_outlook": "短期内你们的关系会比较和谐。",
+                "medium_term_outlook": "中期需要在沟通方面多下功夫。",
+                "long_term_outlook": "长期来看你们有潜力建立稳定的关系。",
+                "strengths": ["情感连接良好", "价值观相近"],
+                "challenges": ["沟通方式需要磨合"],
+                "actionable_advice": ["多进行深度交流", "学会倾听对方"],
             },
-            "relationship_overview": "你们之间有着不错的匹配度，在多个方面都展现出良好的兼容性。",
-            "short_term_outlook": "短期内你们的关系会比较和谐。",
-            "medium_term_outlook": "中期需要在沟通方面多下功夫。",
-            "long_term_outlook": "长期来看你们有潜力建立稳定的关系。",
-            "strengths": ["情感连接良好", "价值观相近"],
-            "challenges": ["沟通方式需要磨合"],
-            "actionable_advice": ["多进行深度交流", "学会倾听对方"],
-        }
+            endpoint="/api/algorithm/compatibility/calculate",
+        )
+
+    async def _analyze_and_store(
+        self,
+        user_id: str,
+        other_profile_id: str,
+        main_profile: dict[str, Any],
+        other_profile: dict[str, Any],
+        analysis_depth: str,
+        other_name: str,
+    ) -> tuple[AlgorithmResult, ChatMessage | None]:
+        """Compute a new analysis, store it and post its chat card"""
+        analysis_result = await self._perform_compatibility_analysis(
+            main_profile, other_profile, analysis_depth
+        )
+
+        if analysis_result.degraded:
+            # Fallbacks are neither stored nor posted to the chat; the retry
+            # stores the real analysis and posts its card when it succeeds
+            self._schedule_analysis_upgrade(
+                user_id, other_profile_id, analysis_depth, other_name
+            )
+            return analysis_result, None
+
+        # Store analysis result
+        await self._store_analysis_result(user_id, other_profile_id, analysis_result)
+
+        # Create related chat message
+        related_message = await self._create_compatibility_message(
+            user_id, analysis_result, other_name
+        )
+        return analysis_result, related_message
+
+    def _schedule_analysis_upgrade(
+        self,
+        user_id: str,
+        other_profile_id: str,
+        analysis_depth: str,
+        other_name: str,
+    ) -> None:
+        """Retry a degraded compatibility analysis in the background"""
+        background_tasks.spawn_once(
+            f"compatibility-upgrade-{user_id}-{other_profile_id}",
+            retry_with_backoff(
+                lambda: self._upgrade_analysis(
+                    user_id, other_profile_id, analysis_depth, other_name
+                ),
+                attempts=settings.FALLBACK_RETRY_ATTEMPTS,
+                delay=settings.FALLBACK_RETRY_DELAY,
+            ),
+        )
+
+    async def _upgrade_analysis(
+        self,
+        user_id: str,
+        other_profile_id: str,
+        analysis_depth: str,
+        other_name: str,
+    ) -> bool:
+        """Compute and store the real analysis; True once there is one stored"""
+        if await self._get_existing_analysis(user_id, other_profile_id):
+            return True
+
+        main_profile = self.profiles.get_by_id(user_id, columns=ProfileBirthInfo)
+        other_profile = self.other_profiles.get_by_id(
+            other_profile_id, columns=OtherProfileBirthInfo, user_id=user_id
+        )
+        if not main_profile or not other_profile:
+            # Deleted in the meantime; nothing left to upgrade
+            return True
+
+        analysis_result = await self._perform_compatibility_analysis(
+            main_profile, other_profile, analysis_depth, priority=Priority.BACKGROUND
+        )
+        if analysis_result.degraded:
+            return False
+
+        await self._store_analysis_result(user_id, other_profile_id, analysis_result)
+        await self._create_compatibility_message(user_id, analysis_result, other_name)
+        return True
+
+    async def _warm_birth_chart(
+        self, user_id: str, request: CreateOtherProfileRequest
+    ) -> None:
+        """Compute the other person's chart once for every user who adds them"""
+        try:
+            await self.birth_charts.get_or_compute(user_id, request.birth_info)
+        except Exception as e:
+            logger.error("Error warming birth chart: %s", e)
+
+    def _cached_birth_charts(
+        self, main_profile: dict[str, Any], other_profile: dict[str, Any]
+    ) -> dict[str, Any]:
+        """Precomputed charts to attach to a compatibility request"""
+        main_key = chart_key_for_profile(main_profile)
+        other_key = chart_key_for_profile(other_profile)
+        keys = [key for key in (main_key, other_key) if key]
+
+        try:
+            charts = self.birth_charts.get_many(keys)
+        except Exception as e:
+            logger.error("Error reading birth charts: %s", e)
+            return {}
+
+        precomputed: dict[str, Any] = {}
+        if main_key in charts:
+            precomputed["main_profile_birth_chart"] = chart_sections(charts[main_key])
+        if other_key in charts:
+            precomputed["other_profile_birth_chart"] = chart_sections(charts[other_key])
+        return precomputed
 
     async def _store_analysis_result(
         self, user_id: str, other_profile_id: str, analysis_data: dict[str, Any]
@@ -384,6 +438,7 @@ class CompatibilityService:
             "user_id_main": user_id,
             "other_profile_id": other_profile_id,
             "analysis_data": analysis_data,
+            "algorithm_version": getattr(analysis_data, "version", None),
             "analysis_date": datetime.utcnow().date().isoformat(),
         }
 
@@ -403,20 +458,18 @@ class CompatibilityService:
 
         try:
             # Get the most recent active session for the user
-            session_response = (
-                self.supabase.table("chat_sessions")
-                .select("*")
-                .eq("user_id", user_id)
-                .eq("is_active", True)
-                .order("session_start_time", desc=True)
-                .limit(1)
-                .execute()
+            session = self.sessions.get_one(
+                columns=RowId,
+                order_by="session_start_time",
+                desc=True,
+                user_id=user_id,
+                is_active=True,
             )
 
-            if not session_response.data:
+            if not session:
                 return None
 
-            session_id = session_response.data[0]["id"]
+            session_id = session["id"]
 
             # Create message content
             overall_score = compatibility_result.get("overall_score", 0)
@@ -437,10 +490,12 @@ class CompatibilityService:
             )
 
             if message_response.data:
-                return ChatMessage(**message_response.data[0])
+                message = ChatMessage(**message_response.data[0])
+                await realtime_hub.publish_message(user_id, session_id, message)
+                return message
 
         except Exception as e:
-            print(f"Error creating compatibility message: {str(e)}")
+            logger.error("Error creating compatibility message: %s", e)
 
         return None
 
@@ -3,30 +3,54 @@ Fortune Service
 
 Handles daily fortune, tarot, and divination features.
 """
+import logging
 from datetime import date, datetime
 from typing import Any
 
-import httpx
-
 from ..config.env import settings
 from ..config.supabase import admin_client, supabase_client
+from ..db import TableGateway
 from ..types.database import (
     DailyFortune,
     DailyFortuneResponse,
     FortuneRequest,
     FortuneResponse,
     MessageType,
+    ProfileBirthInfo,
+    RowId,
     SenderType,
 )
+from .algorithm import AlgorithmResult, algorithm_client
+from .background import background_tasks, retry_with_backoff
+from .cache import cached
+from .realtime import realtime_hub
+from .scheduler import Priority
+
+logger = logging.getLogger(__name__)
 
 
 class FortuneService:
     """Service for handling fortune and divination features"""
 
-    def __init__(self) -> None:
-        self.supabase = supabase_client
-        self.admin_supabase = admin_client
-
+    def __init__(
+        self, supabase: Any = supabase_client, admin_supabase: Any = admin_client
+    ) -> None:
+        self.supabase = supabase
+        self.admin_supabase = admin_supabase
+        self.profiles = TableGateway(supabase, "profiles")
+        self.fortunes = TableGateway(supabase, "daily_fortunes")
+        self.sessions = TableGateway(supabase, "chat_sessions")
+
+    # Only fortunes read back from the table are cached: a fallback must not
+    # be, and a freshly generated one still reports can_generate_new
+    @cached(
+        "daily_fortune",
+        key=lambda user_id, target_date: (
+            f"{user_id}:{target_date or date.today().isoformat()}"
+        ),
+        cache_if=lambda response: not response.degraded
+        and not response.can_generate_new,
+    )
     async def get_daily_fortune(
         self, user_id: str, target_date: str | None = None
     ) -> DailyFortuneResponse:
@@ -36,38 +60,49 @@ class FortuneService:
             target_date = date.today().isoformat()
 
         # Check if fortune already exists for this date
-        existing_response = (
-            self.supabase.table("daily_fortunes")
-            .select("*")
-            .eq("user_id", user_id)
-            .eq("fortune_date", target_date)
-            .execute()
+        existing_fortune = self.fortunes.get_one(
+            columns=DailyFortune, user_id=user_id, fortune_date=target_date
         )
 
-        if existing_response.data:
-            fortune = DailyFortune(**existing_response.data[0])
+        if existing_fortune:
+            fortune = DailyFortune(**existing_fortune)
             return DailyFortuneResponse(fortune=fortune, can_generate_new=False)
 
-        # Generate new fortune if none exists
-        fortune_data = await self._generate_daily_fortune(user_id, target_date)
+        # Generate new fortune if none exists; generation and storage finish
+        # even if the client disconnects meanwhile
+        return await background_tasks.shielded(
+            self._generate_and_store(user_id, target_date),
+            name=f"daily-fortune-{user_id}-{target_date}",
+        )
 
-        # Store the fortune
-        fortune_record = {
-            "user_id": user_id,
-            "fortune_date": target_date,
-            "fortune_data": fortune_data,
-            "generated_at": datetime.utcnow().isoformat(),
-            "is_pushed": False,
-        }
+    async def _generate_and_store(
+        self, user_id: str, target_date: str
+    ) -> DailyFortuneResponse:
+        """Generate a new daily fortune and store it unless it is a fallback"""
 
-        response = (
-            self.supabase.table("daily_fortunes").insert(fortune_record).execute()
-        )
+        fortune_data = await self._generate_daily_fortune(user_id, target_date)
 
-        if not response.data:
-            raise Exception("Failed to store daily fortune")
+        if fortune_data.degraded:
+            # Serve the fallback without storing it, and keep retrying in the
+            # background so the next read finds the real fortune. It has no
+            # id: there is no row to refer to
+            self._schedule_fortune_upgrade(user_id, target_date)
+            now = datetime.utcnow()
+            fortune = DailyFortune(
+                id=None,
+                user_id=user_id,
+                fortune_date=target_date,
+                fortune_data=fortune_data,
+                generated_at=now,
+                created_at=now,
+                updated_at=now,
+            )
+            return DailyFortuneResponse(
+                fortune=fortune, can_generate_new=True, degraded=True
+            )
 
-        fortune = DailyFortune(**response.data[0])
+        stored = self._store_daily_fortune(user_id, target_date, fortune_data)
+        fortune = DailyFortune(**stored)
         return DailyFortuneResponse(fortune=fortune, can_generate_new=True)
 
     async def predict_fortune(
@@ -76,19 +111,19 @@ class FortuneService:
         """Handle fortune prediction requests (tarot, divination, etc.)"""
 
         # Get user profile for context
-        profile_response = (
-            self.supabase.table("profiles").select("*").eq("id", user_id).execute()
-        )
-        user_profile = profile_response.data[0] if profile_response.data else {}
+        user_profile = self.profiles.get_by_id(user_id, columns=ProfileBirthInfo) or {}
 
         # Call algorithm service
         fortune_result = await self._call_fortune_algorithm(
             user_id, request, user_profile
         )
 
-        # Create related chat message if needed
+        # Create related chat message if needed (fallbacks are not kept in
+        # the chat history)
         related_message = None
-        if request.request_type in ["tarot", "divination"]:
+        if request.request_type in ["tarot", "divination"] and not getattr(
+            fortune_result, "degraded", False
+        ):
             related_message = await self._create_fortune_message(
                 user_id, fortune_result, request.request_type
             )
@@ -96,6 +131,7 @@ class FortuneService:
         return FortuneResponse(
             fortune_result=fortune_result,
             related_message=related_message,  # type: ignore # Will be implemented when ChatMessage integration is ready
+            degraded=getattr(fortune_result, "degraded", False),
         )
 
     async def get_fortune_history(
@@ -103,107 +139,168 @@ class FortuneService:
     ) -> list[DailyFortune]:
         """Get user's fortune history"""
 
-        response = (
-            self.supabase.table("daily_fortunes")
-            .select("*")
-            .eq("user_id", user_id)
-            .order("fortune_date", desc=True)
-            .limit(limit)
-            .execute()
+        page = self.fortunes.list_page(
+            {"user_id": user_id},
+            order_by="fortune_date",
+            desc=True,
+            limit=limit,
+            columns=DailyFortune,
         )
 
-        return [DailyFortune(**fortune) for fortune in response.data]
+        return [DailyFortune(**fortune) for fortune in page.rows]
 
     async def _generate_daily_fortune(
-        self, user_id: str, fortune_date: str
-    ) -> dict[str, Any]:
+        self,
+        user_id: str,
+        fortune_date: str,
+        user_profile: dict[str, Any] | None = None,
+        priority: Priority = Priority.NORMAL,
+    ) -> AlgorithmResult:
         """Generate daily fortune using algorithm service"""
 
         try:
             # Get user profile
-            profile_response = (
-                self.supabase.table("profiles").select("*").eq("id", user_id).execute()
-            )
-            user_profile = profile_response.data[0] if profile_response.data else {}
-
-            async with httpx.AsyncClient() as client:
-                payload = {
-                    "user_id": user_id,
-                    "date": fortune_date,
-                    "user_profile": user_profile,
-                }
-
-                response = await client.post(
-                    f"{settings.ALGORITHM_SERVICE_URL}/api/algorithm/daily-fortune/calculate",
-                    json=payload,
-                    timeout=30.0,
+            if user_profile is None:
+                user_profile = (
+                    self.profiles.get_by_id(user_id, columns=ProfileBirthInfo) or {}
                 )
 
-                if response.status_code == 200:
-                    result = response.json()
-                    return dict(result.get("fortune_details", {}))
-                else:
-                    print(
-                        f"Algorithm service error: {response.status_code} - {response.text}"
-                    )
+            payload = {
+                "user_id": user_id,
+                "date": fortune_date,
+                "user_profile": user_profile,
+            }
+
+            response = await algorithm_client.batched(
+                "/api/algorithm/daily-fortune/calculate",
+                payload,
+                priority=priority,
+            )
+
+            if response.ok:
+                return response.result("fortune_details")
+            else:
+                logger.warning(
+                    "Algorithm service error: %s - %s",
+                    response.status_code,
+                    response.text,
+                )
 
         except Exception as e:
-            print(f"Error calling algorithm service: {str(e)}")
+            logger.error("Error calling algorithm service: %s", e)
 
         # Fallback fortune data
-        return {
-            "luck_level": "平",
-            "suitability": ["宜保持心情愉悦", "忌过度劳累"],
-            "lucky_color": "蓝色",
-            "lucky_number": 7,
-            "general_summary": "今日运势平稳，适合静心思考，关注内心声音。",
-        }
+        return AlgorithmResult.fallback(
+            {
+                "luck_level": "平",
+                "suitability": ["宜保持心情愉悦", "忌过度劳累"],
+                "lucky_color": "蓝色",
+                "lucky_number": 7,
+                "general_summary": "今日运势平稳，适合静心思考，关注内心声音。",
+            },
+            endpoint="/api/algorithm/daily-fortune/calculate",
+        )
 
     async def _call_fortune_algorithm(
         self, user_id: str, request: FortuneRequest, user_profile: dict[str, Any]
-    ) -> dict[str, Any]:
+    ) -> AlgorithmResult:
         """Call algorithm service for fortune prediction"""
 
         try:
-            async with httpx.AsyncClient() as client:
-                payload = {
-                    "user_id": user_id,
-                    "request_type": request.request_type,
-                    "user_profile": user_profile,
-                }
-
-                # Add specific fields based on request type
-                if request.date:
-                    payload["date"] = request.date
-                if request.question:
-                    payload["tarot_question"] = request.question
-                if request.divination_type:
-                    payload["divination_type"] = request.divination_type
-
-                response = await client.post(
-                    f"{settings.ALGORITHM_SERVICE_URL}/api/algorithm/fortune/predict",
-                    json=payload,
-                    timeout=30.0,
-                )
+            payload = {
+                "user_id": user_id,
+                "request_type": request.request_type,
+                "user_profile": user_profile,
+            }
 
-                if response.status_code == 200:
-                    result = response.json()
-                    return dict(result.get("fortune_result", {}))
-                else:
-                    print(
-                        f"Algorithm service error: {response.status_code} - {response.text}"
-                    )
+            # Add specific fields based on request type
+            if request.date:
+                payload["date"] = request.date
+            if request.question:
+                payload["tarot_question"] = request.question
+            if request.divination_type:
+                payload["divination_type"] = request.divination_type
+
+            response = await algorithm_client.post(
+                "/api/algorithm/fortune/predict", payload
+            )
+
+            if response.ok:
+                return response.result("fortune_result")
+            else:
+                logger.warning(
+                    "Algorithm service error: %s - %s",
+                    response.status_code,
+                    response.text,
+                )
 
         except Exception as e:
-            print(f"Error calling algorithm service: {str(e)}")
+            logger.error("Error calling algorithm service: %s", e)
 
         # Fallback result
-        return {
-            "type": request.request_type,
-            "summary": "暂时无法获取结果，请稍后再试。",
-            "details": {},
+        return AlgorithmResult.fallback(
+            {
+                "type": request.request_type,
+                "summary": "暂时无法获取结果，请稍后再试。",
+                "details": {},
+            },
+            endpoint="/api/algorithm/fortune/predict",
+        )
+
+    def _store_daily_fortune(
+        self, user_id: str, fortune_date: str, fortune_data: AlgorithmResult
+    ) -> dict[str, Any]:
+        """Store a generated fortune and return the stored row.
+
+        A read and a background upgrade can both generate the same day's
+        fortune; the upsert keeps one row per user and date.
+        """
+
+        fortune_record = {
+            "user_id": user_id,
+            "fortune_date": fortune_date,
+            "fortune_data": fortune_data,
+            "algorithm_version": fortune_data.version,
+            "generated_at": datetime.utcnow().isoformat(),
+            "is_pushed": False,
         }
 
+        response = (
+            self.supabase.table("daily_fortunes")
+            .upsert(fortune_record, on_conflict="user_id,fortune_date")
+            .execute()
+        )
+
+        if not response.data:
+            raise Exception("Failed to store daily fortune")
+
+        return response.data[0]
+
+    def _schedule_fortune_upgrade(self, user_id: str, fortune_date: str) -> None:
+        """Retry a degraded daily fortune in the background"""
+        background_tasks.spawn_once(
+            f"fortune-upgrade-{user_id}-{fortune_date}",
+            retry_with_backoff(
+                lambda: self._upgrade_daily_fortune(user_id, fortune_date),
+                attempts=settings.FALLBACK_RETRY_ATTEMPTS,
+                delay=settings.FALLBACK_RETRY_DELAY,
+            ),
+        )
+
+    async def _upgrade_daily_fortune(self, user_id: str, fortune_date: str) -> bool:
+        """Generate and store the real fortune; True once there is one stored"""
+        if self.fortunes.exists(user_id=user_id, fortune_date=fortune_date):
+            return True
+
+        fortune_data = await self._generate_daily_fortune(
+            user_id, fortune_date, priority=Priority.BACKGROUND
+        )
+        if fortune_data.degraded:
+            return False
+
+        self._store_daily_fortune(user_id, fortune_date, fortune_data)
+        return True
+
     async def _create_fortune_message(
         self, user_id: str, fortune_result: dict[str, Any], fortune_type: str
     ) -> dict[str, Any] | None:
@@ -211,20 +308,18 @@ class FortuneService:
 
         try:
             # Get the most recent active session for the user
-            session_response = (
-                self.supabase.table("chat_sessions")
-                .select("*")
-                .eq("user_id", user_id)
-                .eq("is_active", True)
-                .order("session_start_time", desc=True)
-                .limit(1)
-                .execute()
+            session = self.sessions.get_one(
+                columns=RowId,
+                order_by="session_start_time",
+                desc=True,
+                user_id=user_id,
+                is_active=True,
             )
 
-            if not session_response.data:
+            if not session:
                 return None
 
-            session_id = session_response.data[0]["id"]
+            session_id = session["id"]
 
             # Determine message type
             message_type = (
@@ -251,10 +346,12 @@ class FortuneService:
             )
 
             if message_response.data:
-                return dict(message_response.data[0])
+                message = dict(message_response.data[0])
+                await realtime_hub.publish_message(user_id, session_id, message)
+                return message
 
         except Exception as e:
-            print(f"Error creating fortune message: {str(e)}")
+            logger.error("Error creating fortune message: %s", e)
 
         return None
 
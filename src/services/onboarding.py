@@ -4,31 +4,40 @@ Onboarding Service
 Handles user onboarding flow including profile creation, avatar selection,
 and integration with algorithm service for user profile analysis.
 """
-import asyncio
+import logging
 from typing import Any
 
-import httpx
-
-from ..config.env import settings
 from ..config.supabase import admin_client, supabase_client
+from ..db import TableGateway, select_columns
 from ..types.database import (
     Avatar,
     BirthInfo,
     CreateProfileRequest,
     OnboardingStatusResponse,
     OnboardingStep,
+    Profile,
     ProfileResponse,
     UpdateProfileRequest,
     UserProfileAnalysis,
 )
+from .avatar import parse_avatar
+from .background import background_tasks
+from .birth_chart import BirthChartService
+from .cache import cached
+
+logger = logging.getLogger(__name__)
 
 
 class OnboardingService:
     """Service for handling user onboarding"""
 
-    def __init__(self) -> None:
-        self.supabase = supabase_client
-        self.admin_supabase = admin_client
+    def __init__(
+        self, supabase: Any = supabase_client, admin_supabase: Any = admin_client
+    ) -> None:
+        self.supabase = supabase
+        self.admin_supabase = admin_supabase
+        self.analyses = TableGateway(supabase, "user_profiles_analysis")
+        self.birth_charts = BirthChartService(admin_supabase)
 
     async def get_onboarding_status(self, user_id: str) -> OnboardingStatusResponse:
         """Get current onboarding status for user"""
@@ -57,8 +66,7 @@ class OnboardingService:
                 current_step = OnboardingStep.ANALYSIS_PROCESSING
 
                 # Check if analysis is completed
-                analysis = await self.get_user_analysis(user_id)
-                if analysis:
+                if profile.analysis_completed:
                     completed_steps.append(OnboardingStep.ANALYSIS_PROCESSING)
                     current_step = OnboardingStep.FIRST_CHAT
 
@@ -73,38 +81,21 @@ class OnboardingService:
             available_avatars=avatars,
         )
 
+    @cached("avatars")
     async def get_avatars(self) -> list[Avatar]:
         """Get all available avatars"""
         response = self.supabase.table("avatars").select("*").execute()
 
-        avatars = []
-        for avatar_data in response.data:
-            # Parse abilities JSON
-            abilities = avatar_data.get("abilities", [])
-            if isinstance(abilities, str):
-                import json
-
-                abilities = json.loads(abilities)
-
-            avatar = Avatar(
-                id=avatar_data["id"],
-                name=avatar_data["name"],
-                description=avatar_data.get("description"),
-                image_url=avatar_data.get("image_url"),
-                abilities=abilities,
-                initial_dialogue_prompt=avatar_data.get("initial_dialogue_prompt"),
-                created_at=avatar_data["created_at"],
-                updated_at=avatar_data["updated_at"],
-            )
-            avatars.append(avatar)
+        avatars = [parse_avatar(avatar_data) for avatar_data in response.data]
 
         return avatars
 
+    @cached("profile")
     async def get_user_profile(self, user_id: str) -> ProfileResponse | None:
         """Get user profile with avatar information"""
         response = (
             self.supabase.table("profiles")
-            .select("*, selected_avatar:avatars(*)")
+            .select(f"{select_columns(Profile)},selected_avatar:avatars(*)")
             .eq("id", user_id)
             .execute()
         )
@@ -117,27 +108,7 @@ class OnboardingService:
         # Parse selected avatar
         selected_avatar = None
         if profile_data.get("selected_avatar"):
-            avatar_data = profile_data["selected_avatar"]
-            abilities = avatar_data.get("abilities", [])
-            if isinstance(abilities, str):
-                import json
-
-                abilities = json.loads(abilities)
-
-            selected_avatar = Avatar(
-                id=avatar_data["id"],
-                name=avatar_data["name"],
-                description=avatar_data.get("description"),
-                image_url=avatar_data.get("image_url"),
-                abilities=abilities,
-                initial_dialogue_prompt=avatar_data.get("initial_dialogue_prompt"),
-                created_at=avatar_data["created_at"],
-                updated_at=avatar_data["updated_at"],
-            )
-
-        # Check if analysis is completed
-        analysis = await self.get_user_analysis(user_id)
-        analysis_completed = analysis is not None
+            selected_avatar = parse_avatar(profile_data["selected_avatar"])
 
         return ProfileResponse(
             id=profile_data["id"],
@@ -153,7 +124,8 @@ class OnboardingService:
             birth_longitude=profile_data.get("birth_longitude"),
             birth_latitude=profile_data.get("birth_latitude"),
             selected_avatar=selected_avatar,
-            analysis_completed=analysis_completed,
+            # Maintained on insert into user_profiles_analysis
+            analysis_completed=profile_data.get("analysis_completed", False),
             created_at=profile_data["created_at"],
             updated_at=profile_data["updated_at"],
         )
@@ -186,9 +158,12 @@ class OnboardingService:
         if not response.data:
             raise Exception("Failed to create/update profile")
 
+        await self.get_user_profile.invalidate(user_id)
+
         # Trigger user profile analysis
-        asyncio.create_task(
-            self._trigger_profile_analysis(user_id, profile_data.birth_info)
+        background_tasks.spawn(
+            self._trigger_profile_analysis(user_id, profile_data.birth_info),
+            name=f"profile-analysis-{user_id}",
         )
 
         # Return updated profile
@@ -227,8 +202,9 @@ class OnboardingService:
             )
 
             # Trigger re-analysis if birth info changed
-            asyncio.create_task(
-                self._trigger_profile_analysis(user_id, update_data.birth_info)
+            background_tasks.spawn(
+                self._trigger_profile_analysis(user_id, update_data.birth_info),
+                name=f"profile-analysis-{user_id}",
             )
 
         if update_data.selected_avatar_id is not None:
@@ -245,31 +221,33 @@ class OnboardingService:
         if not response.data:
             raise Exception("Failed to update profile")
 
+        await self.get_user_profile.invalidate(user_id)
+
         # Return updated profile
         profile = await self.get_user_profile(user_id)
         if profile is None:
             raise Exception("Failed to retrieve updated profile")
         return profile
 
+    @cached("analysis")
     async def get_user_analysis(self, user_id: str) -> UserProfileAnalysis | None:
-        """Get user profile analysis result"""
-        response = (
-            self.supabase.table("user_profiles_analysis")
-            .select("*")
-            .eq("user_id", user_id)
-            .order("created_at", desc=True)
-            .limit(1)
-            .execute()
+        """Get the user's latest profile analysis result"""
+        # Single seek on the (user_id, created_at desc) index
+        analysis_data = self.analyses.get_one(
+            columns=UserProfileAnalysis,
+            order_by="created_at",
+            desc=True,
+            user_id=user_id,
         )
 
-        if not response.data:
+        if not analysis_data:
             return None
 
-        analysis_data = response.data[0]
         return UserProfileAnalysis(
             id=analysis_data["id"],
             user_id=analysis_data["user_id"],
             analysis_data=analysis_data["analysis_data"],
+            algorithm_version=analysis_data.get("algorithm_version"),
             created_at=analysis_data["created_at"],
             updated_at=analysis_data["updated_at"],
         )
@@ -279,58 +257,29 @@ class OnboardingService:
     ) -> None:
         """Trigger user profile analysis with algorithm service"""
         try:
-            # Prepare request data for algorithm service
-            birth_info_dict: dict[str, Any] = {
-                "year": birth_info.year,
-                "month": birth_info.month,
-                "day": birth_info.day,
-                "location": birth_info.location,
-            }
-
-            # Add optional fields only if they're not None
-            if birth_info.hour is not None:
-                birth_info_dict["hour"] = birth_info.hour
-            if birth_info.minute is not None:
-                birth_info_dict["minute"] = birth_info.minute
-            if birth_info.second is not None:
-                birth_info_dict["second"] = birth_info.second
-            if birth_info.longitude is not None:
-                birth_info_dict["longitude"] = birth_info.longitude
-            if birth_info.latitude is not None:
-                birth_info_dict["latitude"] = birth_info.latitude
-
-            algorithm_request = {"user_id": user_id, "birth_info": birth_info_dict}
-
-            # Call algorithm service
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{settings.ALGORITHM_SERVICE_URL}/api/algorithm/user-profile-analysis",
-                    json=algorithm_request,
-                    timeout=60.0,
-                )
-
-                if response.status_code == 200:
-                    analysis_result = response.json()
-
-                    # Store analysis result in database
-                    await self._store_analysis_result(
-                        user_id, analysis_result.get("analysis_results", {})
-                    )
-
-                else:
-                    print(
-                        f"Algorithm service error: {response.status_code} - {response.text}"
-                    )
+            # Reuses the shared chart when anyone with the same birth data
+            # has already been analysed by the current algorithm version
+            analysis_results = await self.birth_charts.get_or_compute(
+                user_id, birth_info
+            )
+
+            if analysis_results is not None:
+                # Store analysis result in database
+                await self._store_analysis_result(user_id, analysis_results)
 
         except Exception as e:
-            print(f"Error calling algorithm service: {str(e)}")
+            logger.error("Error calling algorithm service: %s", e)
             # Don't raise exception as this should not block user onboarding
 
     async def _store_analysis_result(
         self, user_id: str, analysis_data: dict[str, Any]
     ) -> None:
         """Store user profile analysis result"""
-        analysis_record = {"user_id": user_id, "analysis_data": analysis_data}
+        analysis_record = {
+            "user_id": user_id,
+            "analysis_data": analysis_data,
+            "algorithm_version": getattr(analysis_data, "version", None),
+        }
 
         response = (
             self.supabase.table("user_profiles_analysis")
@@ -341,6 +290,10 @@ class OnboardingService:
         if not response.data:
             raise Exception("Failed to store analysis result")
 
+        # The insert also flips profiles.analysis_completed
+        await self.get_user_analysis.invalidate(user_id)
+        await self.get_user_profile.invalidate(user_id)
+
 
 # Global service instance
 onboarding_service = OnboardingService()
@@ -0,0 +1,246 @@
+"""
+Rate Limiting
+
+GCRA (generic cell rate algorithm) limiter, equivalent to a token bucket but
+storing a single timestamp per key: the theoretical arrival time (TAT) of the
+next request. Each request spends ``cost`` cells, so expensive routes drain a
+user's budget faster. A user is held to their tier's sustained limit
+(``RATE_LIMITING_DEFAULT`` or ``RATE_LIMITING_PREMIUM``) and, when configured,
+to ``burst_limit`` over a short window.
+
+State lives in process memory, or in Redis (shared by every instance) once
+the service cache has connected; the Redis check is a single Lua script so
+concurrent requests cannot both spend the last cells.
+"""
+import asyncio
+import logging
+import math
+import time
+from datetime import UTC, datetime
+from typing import Any
+
+from ..config.env import settings
+from ..config.supabase import admin_client
+from ..db import TableGateway
+from .cache import _MISSING, LocalLRU
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+KEY_PREFIX = "aura:ratelimit:"
+
+# Checks every limit for a key and only spends cells when all of them allow
+# the request. KEYS: one per limit. ARGV: now, cost, then interval and
+# tolerance per limit. Floats are returned as strings (Redis truncates
+# numbers returned from Lua).
+GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local allowed = 1
+local retry_after = 0
+local remaining = -1
+local tats = {}
+for i, key in ipairs(KEYS) do
+  local interval = tonumber(ARGV[1 + 2 * i])
+  local tolerance = tonumber(ARGV[2 + 2 * i])
+  local tat = tonumber(redis.call('GET', key)) or now
+  if tat < now then tat = now end
+  local new_tat = tat + cost * interval
+  local over = new_tat - now - tolerance
+  if over > 0 then
+    allowed = 0
+    if over > retry_after then retry_after = over end
+  else
+    local left = math.floor((tolerance - (new_tat - now)) / interval)
+    if remaining < 0 or left < remaining then remaining = left end
+  end
+  tats[i] = new_tat
+end
+if allowed == 0 then
+  return {0, tostring(retry_after), '0'}
+end
+for i, key in ipairs(KEYS) do
+  local ttl = math.ceil((tats[i] - now) * 1000)
+  redis.call('SET', key, string.format('%.6f', tats[i]), 'PX', ttl)
+end
+return {1, '0', tostring(remaining)}
+"""
+
+
+class RateLimit:
+    """``count`` requests per ``period`` seconds, parsed from e.g. "100/hour" """
+
+    def __init__(self, count: int, period: float, name: str = "") -> None:
+        if count <= 0 or period <= 0:
+            raise ValueError(f"Invalid rate limit: {count}/{period}s")
+        self.count = count
+        self.period = period
+        self.name = name or f"{count}/{period:g}s"
+        # GCRA parameters: one cell every ``interval`` seconds, and up to
+        # ``tolerance`` seconds of cells may be spent ahead of schedule
+        self.interval = period / count
+        self.tolerance = float(period)
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimit":
+        count, _, unit = value.strip().partition("/")
+        unit = unit.strip().lower().rstrip("s")
+        if unit not in PERIODS:
+            raise ValueError(f"Invalid rate limit: {value!r}")
+        return cls(int(count), PERIODS[unit], name=value.strip())
+
+
+class Decision:
+    """Outcome of a rate limit check"""
+
+    __slots__ = ("allowed", "remaining", "retry_after")
+
+    def __init__(self, allowed: bool, remaining: int, retry_after: float) -> None:
+        self.allowed = allowed
+        self.remaining = remaining
+        self.retry_after = retry_after
+
+
+def _gcra(
+    tats: list[float | None], limits: list[RateLimit], cost: int, now: float
+) -> tuple[Decision, list[float]]:
+    """Evaluate GCRA for each limit; returns the decision and the new TATs"""
+    allowed = True
+    retry_after = 0.0
+    remaining = -1
+    new_tats = []
+    for tat, limit in zip(tats, limits, strict=True):
+        new_tat = max(tat or now, now) + cost * limit.interval
+        over = new_tat - now - limit.tolerance
+        if over > 0:
+            allowed = False
+            retry_after = max(retry_after, over)
+        else:
+            left = math.floor((limit.tolerance - (new_tat - now)) / limit.interval)
+            remaining = left if remaining < 0 else min(remaining, left)
+        new_tats.append(new_tat)
+
+    if not allowed:
+        return Decision(False, 0, retry_after), new_tats
+    return Decision(True, max(remaining, 0), 0.0), new_tats
+
+
+class MemoryBackend:
+    """Per-process limiter state"""
+
+    def __init__(self, max_keys: int = 100000) -> None:
+        self.max_keys = max_keys
+        self._tats: dict[str, float] = {}
+
+    async def check(
+        self, keys: list[str], limits: list[RateLimit], cost: int
+    ) -> Decision:
+        now = time.monotonic()
+        tats = self._tats
+        decision, new_tats = _gcra([tats.get(key) for key in keys], limits, cost, now)
+        if decision.allowed:
+            for key, tat in zip(keys, new_tats, strict=True):
+                tats[key] = tat
+            if len(tats) > self.max_keys:
+                self._prune(now)
+        return decision
+
+    def _prune(self, now: float) -> None:
+        # A TAT in the past means the bucket is full again; forget the key
+        self._tats = {key: tat for key, tat in self._tats.items() if tat > now}
+
+
+class RedisBackend:
+    """Limiter state shared by every instance through Redis"""
+
+    def __init__(self, redis: Any) -> None:
+        self.redis = redis
+        self._script = redis.register_script(GCRA_SCRIPT)
+
+    async def check(
+        self, keys: list[str], limits: list[RateLimit], cost: int
+    ) -> Decision:
+        args: list[Any] = [time.time(), cost]
+        for limit in limits:
+            args.extend((limit.interval, limit.tolerance))
+        allowed, retry_after, remaining = await self._script(
+            keys=[KEY_PREFIX + key for key in keys], args=args
+        )
+        return Decision(bool(int(allowed)), int(remaining), float(retry_after))
+
+
+class RateLimiter:
+    """Tiered per-user limits with per-route costs"""
+
+    def __init__(
+        self,
+        default_limit: str = settings.RATE_LIMITING_DEFAULT,
+        premium_limit: str = settings.RATE_LIMITING_PREMIUM,
+        burst_limit: str | None = settings.RATE_LIMITING_BURST,
+        costs: dict[str, int] | None = None,
+        tier_ttl: float = settings.RATE_LIMITING_TIER_TTL,
+        backend: Any = None,
+        supabase: Any = admin_client,
+    ) -> None:
+        burst = [RateLimit.parse(burst_limit)] if burst_limit else []
+        self.tiers = {
+            "default": [RateLimit.parse(default_limit), *burst],
+            "premium": [RateLimit.parse(premium_limit), *burst],
+        }
+        costs = settings.RATE_LIMITING_COSTS if costs is None else costs
+        # Longest prefix first, so the most specific route wins
+        self.costs = sorted(costs.items(), key=lambda item: len(item[0]), reverse=True)
+        self.backend = backend or MemoryBackend()
+        self.supabase = supabase
+        self.subscriptions = TableGateway(supabase, "user_subscriptions")
+        self._tier_cache = LocalLRU(max_entries=100000, ttl=tier_ttl)
+
+    def use_redis(self, redis: Any) -> None:
+        """Share limiter state through Redis from now on"""
+        self.backend = RedisBackend(redis)
+
+    def cost(self, path: str) -> int:
+        """Cells spent by one request to ``path``"""
+        for prefix, cost in self.costs:
+            if path.startswith(prefix):
+                return cost
+        return 1
+
+    async def tier(self, user_id: str) -> str:
+        """'premium' while the user has an active subscription, else 'default'"""
+        tier = self._tier_cache.get(user_id)
+        if tier is _MISSING:
+            tier = await asyncio.to_thread(self._load_tier, user_id)
+            self._tier_cache.set(user_id, tier)
+        return tier
+
+    def _load_tier(self, user_id: str) -> str:
+        try:
+            subscription = self.subscriptions.get_one(
+                columns="end_date",
+                order_by="end_date",
+                desc=True,
+                user_id=user_id,
+                status="active",
+            )
+        except Exception as e:
+            logger.error("Error loading subscription tier: %s", e)
+            return "default"
+
+        if not subscription:
+            return "default"
+        end_date = datetime.fromisoformat(str(subscription["end_date"]))
+        if end_date.tzinfo is None:
+            end_date = end_date.replace(tzinfo=UTC)
+        return "premium" if end_date > datetime.now(UTC) else "default"
+
+    async def check(self, identity: str, tier: str, path: str) -> Decision:
+        """Spend this request's cells for ``identity`` (user id or client IP)"""
+        limits = self.tiers[tier]
+        keys = [f"{identity}:{limit.name}" for limit in limits]
+        return await self.backend.check(keys, limits, self.cost(path))
+
+
+# Global limiter instance
+rate_limiter = RateLimiter()
@@ -0,0 +1,266 @@
+"""
+Realtime Service
+
+In-process pub/sub hub that fans new chat messages out to every connected
+WebSocket, keyed by chat session and by user. Cross-worker delivery goes
+through a pluggable backend (in-memory locally, Redis pub/sub in production).
+"""
+import asyncio
+import json
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any, Protocol
+
+from pydantic import BaseModel
+
+from ..config.env import settings
+
+try:
+    import redis.asyncio as aioredis  # type: ignore[import-untyped]
+except ImportError:
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+REALTIME_CHANNEL = "aura:realtime"
+
+Deliver = Callable[[str], Awaitable[None]]
+
+
+class RealtimeBackend(Protocol):
+    """Transport that carries encoded events between hub instances"""
+
+    async def start(self, deliver: Deliver) -> None:
+        """Start receiving events and hand each one to ``deliver``"""
+        ...
+
+    async def publish(self, payload: str) -> None:
+        """Publish an encoded event to every hub instance"""
+        ...
+
+    async def stop(self) -> None:
+        """Stop receiving events and release resources"""
+        ...
+
+
+class LocalBackend:
+    """In-memory backend for a single process (development and tests)"""
+
+    def __init__(self) -> None:
+        self._deliver: Deliver | None = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    async def publish(self, payload: str) -> None:
+        if self._deliver is not None:
+            await self._deliver(payload)
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+
+class RedisBackend:
+    """Redis pub/sub backend so every worker sees every event"""
+
+    def __init__(self, redis_url: str, channel: str = REALTIME_CHANNEL) -> None:
+        if aioredis is None:
+            raise RuntimeError("redis package is required for RedisBackend")
+        self.redis_url = redis_url
+        self.channel = channel
+        self._redis: Any = None
+        self._listener: asyncio.Task[None] | None = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._redis = aioredis.from_url(self.redis_url, decode_responses=True)
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen(pubsub, deliver))
+
+    async def _listen(self, pubsub: Any, deliver: Deliver) -> None:
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    await deliver(message["data"])
+        finally:
+            await pubsub.close()
+
+    async def publish(self, payload: str) -> None:
+        await self._redis.publish(self.channel, payload)
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+
+class Subscription:
+    """A single connected socket's bounded event queue"""
+
+    def __init__(
+        self,
+        user_id: str | None,
+        session_id: str | None,
+        queue_size: int,
+        max_dropped: int,
+    ) -> None:
+        self.user_id = user_id
+        self.session_id = session_id
+        self.max_dropped = max_dropped
+        self.dropped = 0
+        self.overflowed = False
+        self._queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=queue_size)
+
+    def offer(self, payload: str) -> None:
+        """Enqueue without blocking; a slow consumer loses its oldest events"""
+        if self.overflowed:
+            return
+
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+            if self.dropped > self.max_dropped:
+                # Too far behind: ask the socket to close so the client re-syncs
+                self.overflowed = True
+                self._queue.put_nowait(None)
+                return
+
+        self._queue.put_nowait(payload)
+
+    def close(self) -> None:
+        """Wake the consumer and end iteration"""
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> str:
+        payload = await self._queue.get()
+        if payload is None:
+            raise StopAsyncIteration
+        return payload
+
+
+class RealtimeHub:
+    """Fan-out hub for chat events"""
+
+    def __init__(
+        self,
+        backend: RealtimeBackend | None = None,
+        queue_size: int = settings.REALTIME_QUEUE_SIZE,
+        max_dropped: int = settings.REALTIME_MAX_DROPPED,
+    ) -> None:
+        self.backend: RealtimeBackend = backend or LocalBackend()
+        self.queue_size = queue_size
+        self.max_dropped = max_dropped
+        self._by_session: dict[str, set[Subscription]] = {}
+        self._by_user: dict[str, set[Subscription]] = {}
+        self._started = False
+
+    async def start(self) -> None:
+        """Start the backend listener"""
+        if not self._started:
+            await self.backend.start(self._deliver)
+            self._started = True
+
+    async def stop(self) -> None:
+        """Stop the backend and close every open subscription"""
+        if self._started:
+            await self.backend.stop()
+            self._started = False
+
+        for subscriptions in list(self._by_session.values()) + list(
+            self._by_user.values()
+        ):
+            for subscription in list(subscriptions):
+                subscription.close()
+        self._by_session.clear()
+        self._by_user.clear()
+
+    def subscribe(
+        self, user_id: str | None = None, session_id: str | None = None
+    ) -> Subscription:
+        """Register a socket for a session's events, or all of a user's events"""
+        if user_id is None and session_id is None:
+            raise ValueError("A subscription needs a user_id or a session_id")
+
+        subscription = Subscription(
+            user_id, session_id, self.queue_size, self.max_dropped
+        )
+        if session_id is not None:
+            self._by_session.setdefault(session_id, set()).add(subscription)
+        else:
+            self._by_user.setdefault(str(user_id), set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a socket's subscription"""
+        if subscription.session_id is not None:
+            index, key = self._by_session, subscription.session_id
+        else:
+            index, key = self._by_user, str(subscription.user_id)
+
+        subscriptions = index.get(key)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del index[key]
+
+    async def publish_message(
+        self, user_id: str, session_id: str, message: BaseModel | dict[str, Any]
+    ) -> None:
+        """Publish a stored chat message to every subscriber of its session and user.
+
+        Publishing never raises: realtime delivery is best effort and must not
+        fail the request that created the message.
+        """
+        if isinstance(message, BaseModel):
+            message_data = message.model_dump(mode="json")
+        else:
+            message_data = message
+
+        payload = json.dumps(
+            {
+                "type": "chat_message",
+                "user_id": str(user_id),
+                "session_id": str(session_id),
+                "message": message_data,
+            },
+            ensure_ascii=False,
+            default=str,
+        )
+
+        try:
+            if not self._started:
+                await self.start()
+            await self.backend.publish(payload)
+        except Exception as e:
+            logger.error("Realtime publish failed: %s", e)
+
+    async def _deliver(self, payload: str) -> None:
+        """Route an encoded event to local subscribers"""
+        event = json.loads(payload)
+
+        for subscription in self._by_session.get(event.get("session_id", ""), ()):
+            subscription.offer(payload)
+        for subscription in self._by_user.get(event.get("user_id", ""), ()):
+            subscription.offer(payload)
+
+
+def create_realtime_backend() -> RealtimeBackend:
+    """Pick the cross-worker backend from settings"""
+    if (
+        settings.REDIS_URL.startswith(("redis://", "rediss://"))
+        and aioredis is not None
+    ):
+        return RedisBackend(settings.REDIS_URL)
+    return LocalBackend()
+
+
+# Global hub instance
+realtime_hub = RealtimeHub(backend=create_realtime_backend())
@@ -0,0 +1,273 @@
+"""
+Recompute Service
+
+Background sweeper that refreshes stored algorithm results produced by an
+older algorithm version. Reads keep serving the stale rows; the sweeper
+recomputes them at a fixed rate so a rollout does not turn into a burst of
+algorithm calls.
+"""
+import asyncio
+import logging
+from datetime import date, datetime
+from typing import Any
+
+from ..config.env import settings
+from ..config.supabase import admin_client
+from ..db import select_columns
+from ..types.database import BirthInfo, OtherProfileBirthInfo, ProfileBirthInfo
+from .algorithm import algorithm_client
+from .birth_chart import BirthChartService
+from .compatibility import compatibility_service
+from .fortune import fortune_service
+from .onboarding import onboarding_service
+from .scheduler import Priority
+
+logger = logging.getLogger(__name__)
+
+
+def _embedded_row(value: Any) -> dict[str, Any] | None:
+    """PostgREST embeds a to-many relation as a list, a to-one as an object"""
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+class RecomputeSweeper:
+    """Periodically recompute results stamped with an outdated algorithm version"""
+
+    def __init__(
+        self,
+        db_client: Any = admin_client,
+        interval: int = settings.RECOMPUTE_INTERVAL,
+        rate: float = settings.RECOMPUTE_RATE,
+        batch_size: int = settings.RECOMPUTE_BATCH_SIZE,
+    ) -> None:
+        self.db_client = db_client
+        self.interval = interval
+        self.rate = rate
+        self.batch_size = batch_size
+        self._task: asyncio.Task[None] | None = None
+        # Last id swept per table; None starts over from the beginning
+        self._cursors: dict[str, str | None] = {}
+
+    @staticmethod
+    async def _execute(query: Any) -> Any:
+        return await asyncio.to_thread(query.execute)
+
+    @staticmethod
+    def _stale(query: Any, version: str) -> Any:
+        return query.or_(f'algorithm_version.is.null,algorithm_version.neq."{version}"')
+
+    async def _next_batch(
+        self, table: str, query: Any, version: str
+    ) -> list[dict[str, Any]]:
+        """The next ``batch_size`` stale rows after the table's cursor.
+
+        Skipped rows stay stale, so without the cursor a full batch of them
+        would be fetched again on every run. The cursor wraps around once a
+        batch comes back short.
+        """
+        query = self._stale(query, version)
+        cursor = self._cursors.get(table)
+        if cursor is not None:
+            query = query.gt("id", cursor)
+        response = await self._execute(query.order("id").limit(self.batch_size))
+
+        rows: list[dict[str, Any]] = response.data or []
+        self._cursors[table] = rows[-1]["id"] if len(rows) >= self.batch_size else None
+        return rows
+
+    async def _pace(self) -> None:
+        """Space out algorithm calls to at most ``rate`` per second"""
+        if self.rate > 0:
+            await asyncio.sleep(1 / self.rate)
+
+    async def sweep_daily_fortunes(self, version: str) -> int:
+        """Recompute today's and upcoming fortunes; past ones stay as history"""
+        query = (
+            self.db_client.table("daily_fortunes")
+            .select("id, user_id, fortune_date")
+            .gte("fortune_date", date.today().isoformat())
+        )
+        rows = await self._next_batch("daily_fortunes", query, version)
+
+        refreshed = 0
+        for row in rows:
+            await self._pace()
+            profile_response = await self._execute(
+                self.db_client.table("profiles")
+                .select(select_columns(ProfileBirthInfo))
+                .eq("id", row["user_id"])
+                .limit(1)
+            )
+            user_profile = profile_response.data[0] if profile_response.data else {}
+
+            fortune_data = await fortune_service._generate_daily_fortune(
+                row["user_id"],
+                str(row["fortune_date"]),
+                user_profile,
+                priority=Priority.BACKGROUND,
+            )
+            if fortune_data.version != version:
+                continue
+
+            await self._execute(
+                self.db_client.table("daily_fortunes")
+                .update(
+                    {
+                        "fortune_data": fortune_data,
+                        "algorithm_version": fortune_data.version,
+                        "generated_at": datetime.utcnow().isoformat(),
+                    }
+                )
+                .eq("id", row["id"])
+            )
+            await fortune_service.get_daily_fortune.invalidate(
+                row["user_id"], str(row["fortune_date"])[:10]
+            )
+            refreshed += 1
+
+        return refreshed
+
+    async def sweep_compatibility(self, version: str) -> int:
+        """Recompute stored compatibility analyses"""
+        query = self.db_client.table("compatibility_analysis_results").select(
+            "id, user_id_main, "
+            f"other_profiles({select_columns(OtherProfileBirthInfo)})"
+        )
+        rows = await self._next_batch("compatibility_analysis_results", query, version)
+
+        refreshed = 0
+        for row in rows:
+            other_profile = _embedded_row(row.get("other_profiles"))
+            if not other_profile:
+                continue
+
+            await self._pace()
+            main_response = await self._execute(
+                self.db_client.table("profiles")
+                .select(select_columns(ProfileBirthInfo))
+                .eq("id", row["user_id_main"])
+                .limit(1)
+            )
+            if not main_response.data:
+                continue
+
+            analysis_data = await compatibility_service._perform_compatibility_analysis(
+                main_response.data[0],
+                other_profile,
+                "all",
+                priority=Priority.BACKGROUND,
+            )
+            if analysis_data.version != version:
+                continue
+
+            await self._execute(
+                self.db_client.table("compatibility_analysis_results")
+                .update(
+                    {
+                        "analysis_data": analysis_data,
+                        "algorithm_version": analysis_data.version,
+                        "analysis_date": datetime.utcnow().date().isoformat(),
+                    }
+                )
+                .eq("id", row["id"])
+            )
+            refreshed += 1
+
+        return refreshed
+
+    async def sweep_profile_analyses(self, version: str) -> int:
+        """Recompute each user's latest profile analysis (older ones are left
+        for the retention job)"""
+        # !inner keeps only analyses some profile points at as its latest
+        query = self.db_client.table("user_profiles_analysis").select(
+            "id, user_id, "
+            f"profiles!latest_analysis_id!inner({select_columns(ProfileBirthInfo)})"
+        )
+        rows = await self._next_batch("user_profiles_analysis", query, version)
+
+        birth_charts = BirthChartService(self.db_client)
+        refreshed = 0
+        for row in rows:
+            profile = _embedded_row(row.get("profiles"))
+            if not profile or not profile.get("birth_location"):
+                continue
+
+            try:
+                birth_info = BirthInfo(
+                    year=profile["birth_year"],
+                    month=profile["birth_month"],
+                    day=profile["birth_day"],
+                    hour=profile.get("birth_hour"),
+                    minute=profile.get("birth_minute"),
+                    second=profile.get("birth_second"),
+                    location=profile["birth_location"],
+                    longitude=profile.get("birth_longitude"),
+                    latitude=profile.get("birth_latitude"),
+                )
+            except (KeyError, ValueError):
+                continue
+
+            await self._pace()
+            analysis_data = await birth_charts.get_or_compute(
+                row["user_id"], birth_info
+            )
+            if analysis_data is None or analysis_data.version != version:
+                continue
+
+            await self._execute(
+                self.db_client.table("user_profiles_analysis")
+                .update(
+                    {
+                        "analysis_data": analysis_data,
+                        "algorithm_version": analysis_data.version,
+                    }
+                )
+                .eq("id", row["id"])
+            )
+            await onboarding_service.get_user_analysis.invalidate(row["user_id"])
+            refreshed += 1
+
+        return refreshed
+
+    async def run_once(self) -> int:
+        """One sweep over every versioned result table"""
+        version = algorithm_client.current_version
+        refreshed = 0
+        for sweep in (
+            self.sweep_profile_analyses,
+            self.sweep_daily_fortunes,
+            self.sweep_compatibility,
+        ):
+            try:
+                refreshed += await sweep(version)
+            except Exception as e:
+                logger.error("Recompute sweep %s failed: %s", sweep.__name__, e)
+        return refreshed
+
+    async def _run_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            refreshed = await self.run_once()
+            if refreshed:
+                logger.info("Recomputed %s stale algorithm results", refreshed)
+
+    def start(self) -> None:
+        """Schedule periodic sweeps (no-op when the interval is 0)"""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        """Cancel the periodic sweeps"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global sweeper instance
+recompute_sweeper = RecomputeSweeper()
@@ -0,0 +1,88 @@
+"""
+Retention Service
+
+Periodic compaction of user_profiles_analysis history. Every re-analysis
+appends a row; the job keeps the newest few per user (and always the one
+profiles.latest_analysis_id points at) and deletes the rest once they age
+out, via the ``compact_user_profiles_analysis`` database function.
+"""
+import asyncio
+import logging
+from typing import Any
+
+from ..config.env import settings
+from ..config.supabase import admin_client
+
+logger = logging.getLogger(__name__)
+
+# Back-to-back batches per run when a backlog has built up
+MAX_BATCHES_PER_RUN = 20
+
+
+class AnalysisRetentionJob:
+    """Background job that compacts old profile analyses"""
+
+    def __init__(
+        self,
+        db_client: Any = admin_client,
+        keep_latest: int = settings.ANALYSIS_RETENTION_KEEP,
+        min_age_days: int = settings.ANALYSIS_RETENTION_MIN_AGE_DAYS,
+        batch_size: int = settings.ANALYSIS_RETENTION_BATCH_SIZE,
+        interval: int = settings.ANALYSIS_RETENTION_INTERVAL,
+    ) -> None:
+        self.db_client = db_client
+        self.keep_latest = keep_latest
+        self.min_age_days = min_age_days
+        self.batch_size = batch_size
+        self.interval = interval
+        self._task: asyncio.Task[None] | None = None
+
+    def _compact_batch(self) -> int:
+        response = self.db_client.rpc(
+            "compact_user_profiles_analysis",
+            {
+                "keep_latest": self.keep_latest,
+                "min_age": f"{self.min_age_days} days",
+                "batch_size": self.batch_size,
+            },
+        ).execute()
+        return int(response.data or 0)
+
+    async def run_once(self) -> int:
+        """Compact expired analyses; returns the number of rows deleted"""
+        total = 0
+        for _ in range(MAX_BATCHES_PER_RUN):
+            deleted = await asyncio.to_thread(self._compact_batch)
+            total += deleted
+            if deleted < self.batch_size:
+                break
+        return total
+
+    async def _run_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                deleted = await self.run_once()
+                if deleted:
+                    logger.info("Compacted %s profile analyses", deleted)
+            except Exception as e:
+                logger.error("Analysis retention error: %s", e)
+
+    def start(self) -> None:
+        """Schedule periodic runs (no-op when the interval is 0)"""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        """Cancel the periodic runs"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global job instance
+analysis_retention = AnalysisRetentionJob()
@@ -0,0 +1,211 @@
+"""
+Algorithm Call Scheduler
+
+Bounds concurrent calls to the algorithm service, per endpoint and in
+total. When a limit is reached, callers queue in priority lanes: interactive
+chat is admitted before user-facing requests, which are admitted before
+background work (onboarding analyses, retries, recompute sweeps). Queue depth
+and wait times are kept per endpoint and lane for monitoring.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any
+
+from ..config.env import settings
+
+
+class Priority(IntEnum):
+    """Admission order when the algorithm service is saturated"""
+
+    INTERACTIVE = 0
+    NORMAL = 1
+    BACKGROUND = 2
+
+
+class WaitStats:
+    """Running wait-time totals for one lane"""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def snapshot(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "avg_seconds": self.total / self.count if self.count else 0.0,
+            "max_seconds": self.max,
+        }
+
+
+class PriorityLimiter:
+    """Bounded semaphore that admits waiters by priority, FIFO within a lane"""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.active = 0
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+
+    def queued(self, priority: Priority) -> int:
+        """Callers waiting in one lane"""
+        return sum(
+            1
+            for lane, _, future in self._waiters
+            if lane == priority and not future.done()
+        )
+
+    async def acquire(self, priority: Priority) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we were cancelled
+                self.release()
+            else:
+                self._waiters = [w for w in self._waiters if w[2] is not future]
+                heapq.heapify(self._waiters)
+            raise
+
+    def release(self) -> None:
+        # Hand the slot straight to the next waiter so nobody can barge in
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+
+class AlgorithmScheduler:
+    """Per-endpoint and total concurrency limits with priority lanes"""
+
+    def __init__(
+        self,
+        total_limit: int = settings.ALGORITHM_CONCURRENCY_TOTAL,
+        default_limit: int = settings.ALGORITHM_CONCURRENCY_DEFAULT,
+        endpoint_limits: dict[str, int] | None = None,
+    ) -> None:
+        self.default_limit = default_limit
+        self.endpoint_limits = (
+            settings.ALGORITHM_CONCURRENCY_LIMITS
+            if endpoint_limits is None
+            else endpoint_limits
+        )
+        self._total = PriorityLimiter(total_limit)
+        self._endpoints: dict[str, PriorityLimiter] = {}
+        self._waits: dict[tuple[str, Priority], WaitStats] = {}
+
+    def _limiter(self, endpoint: str) -> PriorityLimiter:
+        limiter = self._endpoints.get(endpoint)
+        if limiter is None:
+            limit = self.endpoint_limits.get(endpoint, self.default_limit)
+            limiter = self._endpoints[endpoint] = PriorityLimiter(limit)
+        return limiter
+
+    @asynccontextmanager
+    async def reserve(
+        self, endpoint: str, priority: Priority = Priority.NORMAL
+    ) -> AsyncIterator[None]:
+        """Hold one endpoint slot only, for a call waiting to be batched.
+
+        The call is then sent with ``slot(..., reserved=True)``, or as part of
+        a batch request that takes a slot of its own.
+        """
+        limiter = self._limiter(endpoint)
+        started = time.monotonic()
+        await limiter.acquire(priority)
+        self._observe_wait(endpoint, priority, started)
+        try:
+            yield
+        finally:
+            limiter.release()
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        endpoint: str,
+        priority: Priority = Priority.NORMAL,
+        reserved: bool = False,
+    ) -> AsyncIterator[None]:
+        """Hold one endpoint slot and one overall slot for the duration.
+
+        With ``reserved`` the caller already holds the endpoint slot (see
+        ``reserve``) and only the overall slot is taken.
+        """
+        limiter = None if reserved else self._limiter(endpoint)
+        started = time.monotonic()
+
+        # Always endpoint first, then total, so waiters cannot deadlock
+        if limiter is not None:
+            await limiter.acquire(priority)
+        try:
+            await self._total.acquire(priority)
+        except BaseException:
+            if limiter is not None:
+                limiter.release()
+            raise
+
+        if limiter is not None:
+            self._observe_wait(endpoint, priority, started)
+        try:
+            yield
+        finally:
+            self._total.release()
+            if limiter is not None:
+                limiter.release()
+
+    def _observe_wait(self, endpoint: str, priority: Priority, started: float) -> None:
+        self._waits.setdefault((endpoint, priority), WaitStats()).observe(
+            time.monotonic() - started
+        )
+
+    def metrics(self) -> dict[str, Any]:
+        """Active calls, queue depth and wait times per endpoint and lane"""
+        endpoints: dict[str, Any] = {}
+        for endpoint, limiter in self._endpoints.items():
+            endpoints[endpoint] = {
+                "limit": limiter.limit,
+                "active": limiter.active,
+                "queued": {
+                    priority.name.lower(): limiter.queued(priority)
+                    for priority in Priority
+                },
+                "wait": {
+                    priority.name.lower(): stats.snapshot()
+                    for (name, priority), stats in self._waits.items()
+                    if name == endpoint
+                },
+            }
+
+        return {
+            "total": {
+                "limit": self._total.limit,
+                "active": self._total.active,
+                "queued": {
+                    priority.name.lower(): self._total.queued(priority)
+                    for priority in Priority
+                },
+            },
+            "endpoints": endpoints,
+        }
+
+
+# Global scheduler instance
+algorithm_scheduler = AlgorithmScheduler()
@@ -47,6 +47,8 @@ class Profile(BaseModel):
     birth_longitude: float | None = None
     birth_latitude: float | None = None
     selected_avatar_id: UUID | None = None
+    analysis_completed: bool = False
+    latest_analysis_id: UUID | None = None
     created_at: datetime
     updated_at: datetime
 
@@ -57,6 +59,7 @@ class UserProfileAnalysis(BaseModel):
     id: UUID
     user_id: UUID
     analysis_data: dict[str, Any]
+    algorithm_version: str | None = None
     created_at: datetime
     updated_at: datetime
 
@@ -170,10 +173,21 @@ class ChatSession(BaseModel):
     session_start_time: datetime
     session_end_time: datetime | None = None
     is_active: bool = True
+    last_message_preview: str | None = None
+    last_message_at: datetime | None = None
+    message_count: int = 0
+    unread_count: int = 0
     created_at: datetime
     updated_at: datetime
 
 
+class ChatSessionSummary(ChatSession):
+    """Chat session list item with avatar display info"""
+
+    avatar_name: str | None = None
+    avatar_image_url: str | None = None
+
+
 class MessageType(str, Enum):
     """Message type enumeration"""
 
@@ -209,12 +223,13 @@ class ChatMessage(BaseModel):
 
 
 class DailyFortune(BaseModel):
-    """Daily fortune model"""
+    """Daily fortune model (``id`` is None for an unstored fallback)"""
 
-    id: UUID
+    id: UUID | None
     user_id: UUID
     fortune_date: datetime
     fortune_data: dict[str, Any]
+    algorithm_version: str | None = None
     generated_at: datetime
     is_pushed: bool = False
     created_at: datetime
@@ -231,6 +246,7 @@ class CompatibilityAnalysisResult(BaseModel):
     user_id_main: UUID
     other_profile_id: UUID
     analysis_data: dict[str, Any]
+    algorithm_version: str | None = None
     analysis_date: datetime
     created_at: datetime
     updated_at: datetime
@@ -325,8 +341,11 @@ class ChatInitiateResponse(BaseModel):
 
     session_id: UUID
     initial_message: ChatMessage
-    user_profile: ProfileResponse  # Add user_profile
-    avatar: Avatar  # Add avatar
+    user_profile: ProfileResponse | None = None
+    avatar: Avatar
+    # True when initial_message is the avatar's pre-rendered greeting and the
+    # profile-aware message will follow over the session WebSocket
+    profile_message_pending: bool = False
 
 
 class ChatMessageRequest(BaseModel):
@@ -349,12 +368,15 @@ class ChatHistoryResponse(BaseModel):
     session: ChatSession
     messages: list[ChatMessage]
     has_more: bool = False
+    total_estimate: int | None = None
 
 
 class ChatSessionsResponse(BaseModel):
     """Response model for user chat sessions"""
 
-    sessions: list[ChatSession]
+    sessions: list[ChatSessionSummary]
+    next_cursor: str | None = None
+    has_more: bool = False
 
 
 # Fortune API Models
@@ -372,6 +394,7 @@ class FortuneResponse(BaseModel):
 
     fortune_result: dict[str, Any]
     related_message: ChatMessage | None = None
+    degraded: bool = False
 
 
 # Compatibility API Models
@@ -416,6 +439,7 @@ class CompatibilityResponse(BaseModel):
     compatibility_result: dict[str, Any]
     other_profile: OtherProfileResponse
     related_message: ChatMessage | None = None
+    degraded: bool = False
 
 
 # Payment API Models
@@ -447,3 +471,46 @@ class DailyFortuneResponse(BaseModel):
 
     fortune: DailyFortune
     can_generate_new: bool = False
+    degraded: bool = False
+
+
+# Column Projections
+# Row shapes for specific reads. Pass one as ``columns`` to a TableGateway
+# lookup and only its fields are selected instead of ``*``.
+
+
+class RowId(BaseModel):
+    """Primary key only (existence checks and parent lookups)"""
+
+    id: UUID
+
+
+class ProfileBirthInfo(BaseModel):
+    """Profile fields sent to the algorithm service as user context"""
+
+    id: UUID
+    nickname: str | None = None
+    gender: GenderEnum | None = None
+    birth_year: int | None = None
+    birth_month: int | None = None
+    birth_day: int | None = None
+    birth_hour: int | None = None
+    birth_minute: int | None = None
+    birth_second: int | None = None
+    birth_location: str | None = None
+    birth_longitude: float | None = None
+    birth_latitude: float | None = None
+
+
+class OtherProfileBirthInfo(OtherProfileResponse):
+    """Other profile fields needed to run a compatibility analysis"""
+
+    birth_longitude: float | None = None
+    birth_latitude: float | None = None
+
+
+class CompatibilityAnalysisData(BaseModel):
+    """Stored compatibility result without its bookkeeping columns"""
+
+    id: UUID
+    analysis_data: dict[str, Any]
@@ -0,0 +1,97 @@
+"""
+Request Deadlines
+
+Each HTTP request gets a deadline at the edge (see ``DeadlineMiddleware``).
+Database and algorithm calls made while serving it consume the time that is
+left instead of using fixed timeouts, and the remainder is forwarded to the
+algorithm service so it can give up on abandoned work. Background tasks run
+without a deadline.
+"""
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+
+# Header carrying the remaining budget in milliseconds
+DEADLINE_HEADER = "X-Deadline-Ms"
+
+# Seconds kept back from downstream calls so a fallback response can still be
+# sent after one of them times out
+RESPONSE_RESERVE = 0.25
+
+_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceededError(TimeoutError):
+    """The request ran out of time before a downstream call could start"""
+
+
+def set_deadline(seconds: float | None) -> Token[float | None]:
+    """Start a deadline ``seconds`` from now (None clears it)"""
+    expires_at = None if seconds is None else time.monotonic() + seconds
+    return _deadline.set(expires_at)
+
+
+def reset_deadline(token: Token[float | None]) -> None:
+    _deadline.reset(token)
+
+
+@contextmanager
+def deadline_scope(seconds: float | None) -> Iterator[None]:
+    """Run a block under a deadline (or, with None, without one)"""
+    token = set_deadline(seconds)
+    try:
+        yield
+    finally:
+        reset_deadline(token)
+
+
+def remaining() -> float | None:
+    """Seconds left before the current deadline, or None without one"""
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return None
+    return expires_at - time.monotonic()
+
+
+def current_deadline() -> float | None:
+    """``time.monotonic()`` value the current deadline expires at, or None"""
+    return _deadline.get()
+
+
+@contextmanager
+def deadline_until(expires_at: float | None) -> Iterator[None]:
+    """Run a block under a deadline captured with ``current_deadline``"""
+    token = _deadline.set(expires_at)
+    try:
+        yield
+    finally:
+        reset_deadline(token)
+
+
+def check_deadline() -> None:
+    """Raise DeadlineExceededError when the current deadline has passed"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceededError("Request deadline exceeded")
+
+
+def bounded_timeout(limit: float | None, default: float) -> float:
+    """Timeout for a downstream call.
+
+    Inside a request this is the time left, capped by ``limit`` when given;
+    outside one it is ``limit``, else ``default``.
+    """
+    left = remaining()
+    if left is None:
+        return default if limit is None else limit
+
+    left -= RESPONSE_RESERVE
+    if left <= 0:
+        raise DeadlineExceededError("Request deadline exceeded")
+    return left if limit is None else min(limit, left)
+
+
+def deadline_header(timeout: float) -> dict[str, str]:
+    """Header forwarding a call's budget downstream"""
+    return {DEADLINE_HEADER: str(max(int(timeout * 1000), 1))}
@@ -4,6 +4,8 @@ Utility Helper Functions
 Common helper functions used across the application.
 """
 
+import base64
+import json
 from datetime import datetime
 from typing import Any
 
@@ -50,3 +52,23 @@ def mask_sensitive_data(data: str, mask_char: str = "*", visible_chars: int = 4)
         return mask_char * len(data)
 
     return data[:visible_chars] + mask_char * (len(data) - visible_chars)
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode keyset pagination values into an opaque cursor"""
+    raw = json.dumps([str(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list[str]:
+    """Decode an opaque cursor back into its keyset values"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid pagination cursor")
+
+    return [str(value) for value in values]
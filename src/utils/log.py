@@ -0,0 +1,246 @@
+"""
+Logging
+
+JSON logging that keeps I/O off the event loop. Loggers only put records on
+a queue (``AsyncQueueHandler``); a listener thread formats them, including
+tracebacks, and writes them to stdout and, when set (production config), to
+``LOG_FILE``, rotated at ``LOG_MAX_SIZE`` with ``LOG_BACKUP_COUNT`` backups.
+
+Every record carries the id of the request it was logged for (see
+``RequestIdMiddleware``). Repetitive warnings and errors, such as the same
+algorithm fallback during an outage, are sampled: past a burst per window,
+identical messages are dropped and the next one that gets through reports
+how many were suppressed.
+"""
+import json
+import logging
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Any
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config.env import settings
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+_request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+# LogRecord attributes that are not user-supplied ``extra`` fields
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_SIZE_UNITS = {"": 1, "B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3}
+
+
+def current_request_id() -> str | None:
+    return _request_id.get()
+
+
+@contextmanager
+def request_id_context(request_id: str | None) -> Iterator[None]:
+    """Run a block as part of ``request_id`` (None: of no request)"""
+    token = _request_id.set(request_id)
+    try:
+        yield
+    finally:
+        _request_id.reset(token)
+
+
+class RequestIdMiddleware:
+    """ASGI middleware giving every request an id (the client's, if sent)"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._header = REQUEST_ID_HEADER.lower().encode()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = (
+            next(
+                (
+                    value.decode("latin-1")[:128]
+                    for name, value in scope.get("headers", [])
+                    if name == self._header
+                ),
+                None,
+            )
+            or uuid.uuid4().hex
+        )
+        encoded = request_id.encode("latin-1")
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (self._header, encoded),
+                ]
+            await send(message)
+
+        with request_id_context(request_id):
+            await self.app(scope, receive, send_wrapper)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, UTC).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class ErrorSampler(logging.Filter):
+    """Lets ``burst`` identical warnings/errors through per ``window`` seconds.
+
+    Records are identical when they share logger, level and message template
+    (the unformatted ``msg``), so callers should log with %-style arguments.
+    """
+
+    def __init__(self, burst: int = 10, window: float = 60.0) -> None:
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self._lock = threading.Lock()
+        # key -> [window start, passed in window, suppressed since last pass]
+        self._seen: dict[tuple[str, int, str], list[float]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            state = self._seen.get(key)
+            if state is None or now - state[0] >= self.window:
+                suppressed = int(state[2]) if state else 0
+                self._seen[key] = [now, 1, 0]
+                if len(self._seen) > 10000:
+                    self._prune(now)
+            elif state[1] < self.burst:
+                state[1] += 1
+                suppressed, state[2] = int(state[2]), 0
+            else:
+                state[2] += 1
+                return False
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+    def _prune(self, now: float) -> None:
+        self._seen = {
+            key: state
+            for key, state in self._seen.items()
+            if now - state[0] < self.window
+        }
+
+
+class AsyncQueueHandler(QueueHandler):
+    """Enqueues records without formatting them or ever blocking.
+
+    The message is rendered here (arguments may change later), but
+    tracebacks are left for the listener thread to format.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if not hasattr(record, "request_id"):
+            record.request_id = _request_id.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_size(value: str) -> int:
+    """Bytes in a size such as "10MB" """
+    match = re.fullmatch(r"\s*(\d+)\s*([KMG]?B?)\s*", value.upper())
+    if not match:
+        raise ValueError(f"Invalid size: {value!r}")
+    return int(match.group(1)) * _SIZE_UNITS[match.group(2)]
+
+
+_listener: QueueListener | None = None
+
+
+def configure_logging(
+    level: str = settings.LOG_LEVEL,
+    log_file: str | None = settings.LOG_FILE,
+    max_size: str = settings.LOG_MAX_SIZE,
+    backup_count: int = settings.LOG_BACKUP_COUNT,
+    queue_size: int = 10000,
+) -> AsyncQueueHandler:
+    """Route the root logger through the queue to stdout and the log file"""
+    global _listener
+    shutdown_logging()
+
+    formatter = JsonFormatter()
+    handlers: list[logging.Handler] = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+        handlers.append(
+            RotatingFileHandler(
+                log_file,
+                maxBytes=parse_size(max_size),
+                backupCount=backup_count,
+                encoding="utf-8",
+            )
+        )
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(maxsize=queue_size)
+    queue_handler = AsyncQueueHandler(log_queue)
+    queue_handler.addFilter(ErrorSampler())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level.upper())
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return queue_handler
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
@@ -0,0 +1,213 @@
+"""
+Prometheus Metrics
+
+Metric families for the hot paths: HTTP requests (per route template),
+PostgREST calls (per table and operation), algorithm service calls (per
+endpoint), the service cache and event-loop lag. Hot-path label children
+are bound once and reused, so recording an observation is a dict lookup
+plus a histogram update. Cache and scheduler figures are read at scrape
+time by collectors instead of being counted on every call.
+
+Exposed at ``/metrics`` by ``MetricsMiddleware`` when
+``PROMETHEUS_METRICS`` is enabled.
+"""
+import asyncio
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+import httpx
+from prometheus_client import CollectorRegistry, Counter, Histogram
+from prometheus_client.core import GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+
+# Own registry, so the application's metrics are all that /metrics exposes
+REGISTRY = CollectorRegistry()
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "aura_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+POSTGREST_REQUEST_DURATION = Histogram(
+    "aura_postgrest_request_duration_seconds",
+    "PostgREST call latency by table and operation",
+    ["table", "operation", "status"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+ALGORITHM_REQUEST_DURATION = Histogram(
+    "aura_algorithm_request_duration_seconds",
+    "Algorithm service call latency by endpoint",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+ALGORITHM_ERRORS = Counter(
+    "aura_algorithm_errors_total",
+    "Failed algorithm service calls by endpoint and reason",
+    ["endpoint", "reason"],
+    registry=REGISTRY,
+)
+ALGORITHM_FALLBACKS = Counter(
+    "aura_algorithm_fallbacks_total",
+    "Fallback results served instead of an algorithm service result",
+    ["endpoint"],
+    registry=REGISTRY,
+)
+EVENT_LOOP_LAG = Histogram(
+    "aura_event_loop_lag_seconds",
+    "How late the event loop ran a timer scheduled on it",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    registry=REGISTRY,
+)
+
+# Route used for requests that did not match any route, so scanners hitting
+# random paths cannot blow up label cardinality
+UNMATCHED_ROUTE = "unmatched"
+
+_POSTGREST_OPERATIONS = {
+    "GET": "select",
+    "HEAD": "count",
+    "POST": "insert",
+    "PATCH": "update",
+    "PUT": "upsert",
+    "DELETE": "delete",
+}
+
+_children: dict[tuple[Any, ...], Any] = {}
+
+
+def _child(metric: Any, *labels: str) -> Any:
+    """Bound label child, created once per label combination"""
+    key = (metric, *labels)
+    child = _children.get(key)
+    if child is None:
+        child = _children[key] = metric.labels(*labels)
+    return child
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    _child(HTTP_REQUEST_DURATION, method, route, str(status)).observe(seconds)
+
+
+def observe_postgrest(table: str, operation: str, status: int, seconds: float) -> None:
+    _child(POSTGREST_REQUEST_DURATION, table, operation, str(status)).observe(seconds)
+
+
+def observe_algorithm(endpoint: str, seconds: float) -> None:
+    _child(ALGORITHM_REQUEST_DURATION, endpoint).observe(seconds)
+
+
+def count_algorithm_error(endpoint: str, reason: str) -> None:
+    _child(ALGORITHM_ERRORS, endpoint, reason).inc()
+
+
+def count_algorithm_fallback(endpoint: str) -> None:
+    _child(ALGORITHM_FALLBACKS, endpoint).inc()
+
+
+def postgrest_labels(request: httpx.Request) -> tuple[str, str]:
+    """(table, operation) for a PostgREST request, e.g. /rest/v1/profiles"""
+    path = request.url.path
+    _, _, resource = path.partition("/rest/v1/")
+    if resource.startswith("rpc/"):
+        return resource, "rpc"
+    operation = _POSTGREST_OPERATIONS.get(request.method, request.method.lower())
+    return resource or path, operation
+
+
+def instrument_postgrest(client: Any) -> None:
+    """Time every PostgREST call made through a Supabase client"""
+    session = client.postgrest.session
+
+    def on_request(request: httpx.Request) -> None:
+        request.extensions["aura_started"] = time.perf_counter()
+
+    def on_response(response: httpx.Response) -> None:
+        started = response.request.extensions.get("aura_started")
+        if started is None:
+            return
+        table, operation = postgrest_labels(response.request)
+        observe_postgrest(
+            table, operation, response.status_code, time.perf_counter() - started
+        )
+
+    session.event_hooks = {
+        "request": [*session.event_hooks["request"], on_request],
+        "response": [*session.event_hooks["response"], on_response],
+    }
+
+
+class StatsCollector(Collector):
+    """Gauges read from a ``stats()``-style callable at scrape time"""
+
+    def __init__(
+        self, prefix: str, description: str, stats: Callable[[], dict[str, Any]]
+    ) -> None:
+        self.prefix = prefix
+        self.description = description
+        self.stats = stats
+
+    def collect(self) -> Iterator[Metric]:
+        for name, value in self.stats().items():
+            if isinstance(value, int | float):
+                yield GaugeMetricFamily(
+                    f"{self.prefix}_{name}", f"{self.description}: {name}", value
+                )
+
+
+def register_stats(
+    prefix: str, description: str, stats: Callable[[], dict[str, Any]]
+) -> None:
+    REGISTRY.register(StatsCollector(prefix, description, stats))
+
+
+class LoopLagMonitor:
+    """Measures event-loop lag by how late a periodic sleep wakes up"""
+
+    def __init__(self, interval: float = 0.5) -> None:
+        self.interval = interval
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - started - self.interval
+            EVENT_LOOP_LAG.observe(max(lag, 0.0))
+
+
+# Global monitor instance
+loop_lag_monitor = LoopLagMonitor()
@@ -0,0 +1,175 @@
+"""
+Distributed Tracing
+
+OpenTelemetry spans for each request (``TracingMiddleware``), each
+middleware (``TracedMiddleware``), each PostgREST call (``trace_postgrest``)
+and each algorithm service call (``AlgorithmClient.post``). W3C trace
+context is read from incoming requests and forwarded to the algorithm
+service, so one trace covers the whole call chain.
+
+Code only uses the OpenTelemetry API, which is a no-op until
+``configure_tracing`` installs an SDK tracer provider with the configured
+sampler and exporter ("console", "memory" or "none"); an external collector
+is not required.
+"""
+import logging
+from typing import Any
+
+import httpx
+from opentelemetry import propagate, trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config.env import settings
+from .metrics import postgrest_labels
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "aura-backend"
+
+TRACE_ID_HEADER = b"x-trace-id"
+
+tracer = trace.get_tracer(SERVICE_NAME)
+
+_exporter: Any = None
+
+
+def configure_tracing(
+    exporter: str = settings.TRACING_EXPORTER,
+    sample_ratio: float = settings.TRACING_SAMPLE_RATIO,
+) -> Any:
+    """Install the SDK tracer provider (once); returns the span exporter.
+
+    Traces are sampled at ``sample_ratio`` unless the caller's trace context
+    says otherwise. Returns None when the SDK is not installed.
+    """
+    global _exporter
+    if _exporter is not None:
+        return _exporter
+
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import (
+            BatchSpanProcessor,
+            ConsoleSpanExporter,
+            SimpleSpanProcessor,
+        )
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+            InMemorySpanExporter,
+        )
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    except ImportError:
+        logger.info("opentelemetry-sdk is not installed; tracing disabled")
+        return None
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(sample_ratio)),
+    )
+    if exporter == "console":
+        _exporter = ConsoleSpanExporter()
+        provider.add_span_processor(BatchSpanProcessor(_exporter))
+    elif exporter == "memory":
+        _exporter = InMemorySpanExporter()
+        provider.add_span_processor(SimpleSpanProcessor(_exporter))
+    else:
+        _exporter = False
+
+    trace.set_tracer_provider(provider)
+    return _exporter
+
+
+def inject_headers(headers: dict[str, str]) -> dict[str, str]:
+    """Add the current trace context (``traceparent``) to outgoing headers"""
+    propagate.inject(headers)
+    return headers
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the server span for each HTTP request"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        carrier = {
+            name.decode("latin-1"): value.decode("latin-1")
+            for name, value in scope.get("headers", [])
+        }
+        method = scope["method"]
+
+        with tracer.start_as_current_span(
+            f"{method} {scope['path']}",
+            context=propagate.extract(carrier),
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope["path"]},
+        ) as span:
+            trace_id = format(span.get_span_context().trace_id, "032x").encode()
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (TRACE_ID_HEADER, trace_id),
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # Name the span after the route template once routing is done
+                route = scope.get("route")
+                if route is not None:
+                    span.update_name(f"{method} {route.path}")
+                    span.set_attribute("http.route", route.path)
+
+
+class TracedMiddleware:
+    """Runs another middleware inside its own span"""
+
+    def __init__(self, app: ASGIApp, middleware: type, **options: Any) -> None:
+        self.inner = middleware(app, **options)
+        self.name = f"middleware {middleware.__name__}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.inner(scope, receive, send)
+            return
+
+        with tracer.start_as_current_span(self.name):
+            await self.inner(scope, receive, send)
+
+
+def trace_postgrest(client: Any) -> None:
+    """Open a client span for every PostgREST call made through a client"""
+    session = client.postgrest.session
+    send = session.send
+
+    # Wraps send rather than using event hooks: a transport error raises
+    # before any response hook runs, and the span must still end
+    def traced_send(request: httpx.Request, **kwargs: Any) -> httpx.Response:
+        table, operation = postgrest_labels(request)
+        with tracer.start_as_current_span(
+            f"postgrest {operation} {table}",
+            kind=SpanKind.CLIENT,
+            attributes={
+                "db.system": "postgresql",
+                "db.collection.name": table,
+                "db.operation.name": operation,
+            },
+        ) as span:
+            response = send(request, **kwargs)
+            span.set_attribute("http.response.status_code", response.status_code)
+            if response.is_error:
+                span.set_status(Status(StatusCode.ERROR))
+            return response
+
+    session.send = traced_send
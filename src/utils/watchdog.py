@@ -0,0 +1,184 @@
+"""
+Event-Loop Blocking Watchdog
+
+Opt-in detector for synchronous work run on the event loop (the Supabase
+client is synchronous, for one). The loop bumps a heartbeat on a short
+timer; a watchdog thread checks it and, when the loop has been stuck for
+longer than the threshold, captures the loop thread's stack together with
+the route being served and the PostgREST table being queried by the task
+that is blocking. Each block is reported once, to the log and to the
+``aura_event_loop_blocks_total`` metric.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+import httpx
+from prometheus_client import Counter
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..config.env import settings
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOOP_BLOCKS = Counter(
+    "aura_event_loop_blocks_total",
+    "Times the event loop was blocked beyond the watchdog threshold",
+    ["table"],
+    registry=REGISTRY,
+)
+
+_route: ContextVar[str | None] = ContextVar("watchdog_route", default=None)
+_table: ContextVar[str | None] = ContextVar("watchdog_table", default=None)
+
+
+@contextmanager
+def route_scope(route: str) -> Iterator[None]:
+    """Attribute blocking inside the block to ``route``"""
+    token = _route.set(route)
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+
+class WatchdogRouteMiddleware:
+    """ASGI middleware recording the request being served for the watchdog"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        with route_scope(f"{scope.get('method', 'WS')} {scope['path']}"):
+            await self.app(scope, receive, send)
+
+
+def track_postgrest(client: Any) -> None:
+    """Record which table a Supabase client is querying while it runs"""
+    session = client.postgrest.session
+    send = session.send
+
+    def tracked_send(request: httpx.Request, **kwargs: Any) -> httpx.Response:
+        _, _, resource = request.url.path.partition("/rest/v1/")
+        token = _table.set(resource or request.url.path)
+        try:
+            return send(request, **kwargs)
+        finally:
+            # Also after a transport error, or later blocks blame this table
+            _table.reset(token)
+
+    session.send = tracked_send
+
+
+class BlockReport:
+    """One detected block: how long so far, where, and on whose behalf"""
+
+    def __init__(
+        self, blocked_for: float, stack: str, route: str | None, table: str | None
+    ) -> None:
+        self.blocked_for = blocked_for
+        self.stack = stack
+        self.route = route
+        self.table = table
+
+    def __str__(self) -> str:
+        return (
+            f"Event loop blocked for {self.blocked_for * 1000:.0f}ms "
+            f"(route={self.route or '-'}, table={self.table or '-'})\n{self.stack}"
+        )
+
+
+class BlockingWatchdog:
+    """Heartbeat on the loop, checked from a daemon thread"""
+
+    def __init__(self, threshold: float = settings.BLOCKING_WATCHDOG_THRESHOLD) -> None:
+        self.threshold = threshold
+        self.interval = threshold / 2
+        self.reports: list[BlockReport] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: int | None = None
+        self._heartbeat = 0.0
+        self._beats = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Start watching the running loop"""
+        if self._thread is not None:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._stopped.clear()
+        self._beat()
+        self._thread = threading.Thread(
+            target=self._watch, name="event-loop-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _beat(self) -> None:
+        self._heartbeat = time.monotonic()
+        self._beats += 1
+        assert self._loop is not None
+        self._timer = self._loop.call_later(self.interval, self._beat)
+
+    def _watch(self) -> None:
+        reported_beat = -1
+        while not self._stopped.wait(self.interval):
+            beats = self._beats
+            blocked_for = time.monotonic() - self._heartbeat - self.interval
+            if blocked_for > self.threshold and beats != reported_beat:
+                # One report per block; the next one needs a fresh heartbeat
+                reported_beat = beats
+                self._report(blocked_for)
+
+    def _report(self, blocked_for: float) -> None:
+        assert self._loop_thread is not None
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return
+        stack = "".join(traceback.format_stack(frame))
+
+        route = table = None
+        task = asyncio.current_task(self._loop)
+        if task is not None:
+            context = task.get_context()
+            route = context.get(_route)
+            table = context.get(_table)
+
+        report = BlockReport(blocked_for, stack, route, table)
+        self.reports = [*self.reports[-99:], report]
+        EVENT_LOOP_BLOCKS.labels(table or "none").inc()
+        logger.warning(
+            "Event loop blocked for %.0fms",
+            blocked_for * 1000,
+            extra={"route": route, "table": table, "blocking_stack": stack},
+        )
+
+
+# Global watchdog instance
+blocking_watchdog = BlockingWatchdog()
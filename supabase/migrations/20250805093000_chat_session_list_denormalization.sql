@@ -0,0 +1,126 @@
+-- Denormalized last-message columns for the chat session list
+
+-- 3.4 对话会话表设计 (chat_sessions)
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE,
+    avatar_id UUID REFERENCES avatars(id),
+    session_start_time TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    session_end_time TIMESTAMP WITH TIME ZONE,
+    is_active BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- 3.5 对话消息表设计 (chat_messages)
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    session_id UUID REFERENCES chat_sessions(id) ON DELETE CASCADE,
+    sender_type TEXT CHECK (sender_type IN ('user', 'ai')),
+    content TEXT,
+    timestamp TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    message_type TEXT DEFAULT 'text',
+    related_data JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Enable Row Level Security
+ALTER TABLE chat_sessions ENABLE ROW LEVEL SECURITY;
+ALTER TABLE chat_messages ENABLE ROW LEVEL SECURITY;
+
+-- Create policies for chat_sessions table
+DROP POLICY IF EXISTS "Users can view own chat sessions" ON chat_sessions;
+CREATE POLICY "Users can view own chat sessions" ON chat_sessions
+    FOR SELECT USING (auth.uid() = user_id);
+
+DROP POLICY IF EXISTS "Users can insert own chat sessions" ON chat_sessions;
+CREATE POLICY "Users can insert own chat sessions" ON chat_sessions
+    FOR INSERT WITH CHECK (auth.uid() = user_id);
+
+DROP POLICY IF EXISTS "Users can update own chat sessions" ON chat_sessions;
+CREATE POLICY "Users can update own chat sessions" ON chat_sessions
+    FOR UPDATE USING (auth.uid() = user_id);
+
+DROP POLICY IF EXISTS "Users can delete own chat sessions" ON chat_sessions;
+CREATE POLICY "Users can delete own chat sessions" ON chat_sessions
+    FOR DELETE USING (auth.uid() = user_id);
+
+-- Create policies for chat_messages table (owned through their session)
+DROP POLICY IF EXISTS "Users can view own chat messages" ON chat_messages;
+CREATE POLICY "Users can view own chat messages" ON chat_messages
+    FOR SELECT USING (
+        EXISTS (
+            SELECT 1 FROM chat_sessions s
+            WHERE s.id = session_id AND s.user_id = auth.uid()
+        )
+    );
+
+DROP POLICY IF EXISTS "Users can insert own chat messages" ON chat_messages;
+CREATE POLICY "Users can insert own chat messages" ON chat_messages
+    FOR INSERT WITH CHECK (
+        EXISTS (
+            SELECT 1 FROM chat_sessions s
+            WHERE s.id = session_id AND s.user_id = auth.uid()
+        )
+    );
+
+ALTER TABLE chat_sessions
+    ADD COLUMN IF NOT EXISTS last_message_preview TEXT,
+    ADD COLUMN IF NOT EXISTS last_message_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS unread_count INTEGER NOT NULL DEFAULT 0;
+
+-- Backfill existing sessions from their message history
+UPDATE chat_sessions s
+SET
+    last_message_preview = LEFT(m.content, 120),
+    last_message_at = m.timestamp,
+    message_count = m.message_count
+FROM (
+    SELECT DISTINCT ON (session_id)
+        session_id,
+        content,
+        timestamp,
+        COUNT(*) OVER (PARTITION BY session_id) AS message_count
+    FROM chat_messages
+    ORDER BY session_id, timestamp DESC
+) m
+WHERE s.id = m.session_id;
+
+UPDATE chat_sessions
+SET last_message_at = COALESCE(session_start_time, created_at, NOW())
+WHERE last_message_at IS NULL;
+
+ALTER TABLE chat_sessions ALTER COLUMN last_message_at SET NOT NULL;
+
+-- Keep the denormalized columns in sync on every message insert
+CREATE OR REPLACE FUNCTION update_chat_session_last_message()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE chat_sessions
+    SET
+        last_message_preview = CASE
+            WHEN NEW.timestamp >= last_message_at THEN LEFT(NEW.content, 120)
+            ELSE last_message_preview
+        END,
+        last_message_at = GREATEST(last_message_at, NEW.timestamp),
+        message_count = message_count + 1,
+        unread_count = CASE
+            WHEN NEW.sender_type = 'ai' THEN unread_count + 1
+            ELSE 0
+        END
+    WHERE id = NEW.session_id;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS update_chat_session_last_message ON chat_messages;
+CREATE TRIGGER update_chat_session_last_message AFTER INSERT ON chat_messages
+    FOR EACH ROW EXECUTE FUNCTION update_chat_session_last_message();
+
+-- Keyset pagination index for the session list
+CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_last_message
+    ON chat_sessions(user_id, last_message_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_session_timestamp
+    ON chat_messages(session_id, timestamp);
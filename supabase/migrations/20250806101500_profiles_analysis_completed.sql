@@ -0,0 +1,35 @@
+-- Denormalized analysis status on profiles so profile reads never touch
+-- the user_profiles_analysis JSONB
+
+ALTER TABLE profiles ADD COLUMN IF NOT EXISTS analysis_completed BOOLEAN NOT NULL DEFAULT FALSE;
+ALTER TABLE profiles ADD COLUMN IF NOT EXISTS latest_analysis_id UUID
+    REFERENCES user_profiles_analysis(id) ON DELETE SET NULL;
+
+-- Backfill from existing analysis rows
+UPDATE profiles p
+SET
+    analysis_completed = TRUE,
+    latest_analysis_id = latest.id
+FROM (
+    SELECT DISTINCT ON (user_id) user_id, id
+    FROM user_profiles_analysis
+    ORDER BY user_id, created_at DESC
+) latest
+WHERE p.id = latest.user_id;
+
+-- Every stored analysis becomes the profile's latest one
+CREATE OR REPLACE FUNCTION update_profile_latest_analysis()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE profiles
+    SET
+        analysis_completed = TRUE,
+        latest_analysis_id = NEW.id
+    WHERE id = NEW.user_id;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS update_profile_latest_analysis ON user_profiles_analysis;
+CREATE TRIGGER update_profile_latest_analysis AFTER INSERT ON user_profiles_analysis
+    FOR EACH ROW EXECUTE FUNCTION update_profile_latest_analysis();
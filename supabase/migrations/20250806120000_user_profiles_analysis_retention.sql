@@ -0,0 +1,46 @@
+-- Latest-analysis index and history retention for user_profiles_analysis
+
+-- Serves "latest analysis for user" as a single index seek; supersedes the
+-- user_id-only index
+CREATE INDEX IF NOT EXISTS idx_user_profiles_analysis_user_created
+    ON user_profiles_analysis(user_id, created_at DESC);
+DROP INDEX IF EXISTS idx_user_profiles_analysis_user_id;
+
+-- Delete analyses beyond the newest keep_latest per user once they are older
+-- than min_age. The row referenced by profiles.latest_analysis_id is never
+-- deleted. At most batch_size rows go per call; returns the number deleted.
+CREATE OR REPLACE FUNCTION compact_user_profiles_analysis(
+    keep_latest INTEGER DEFAULT 5,
+    min_age INTERVAL DEFAULT INTERVAL '30 days',
+    batch_size INTEGER DEFAULT 1000
+)
+RETURNS INTEGER AS $$
+DECLARE
+    deleted INTEGER;
+BEGIN
+    WITH ranked AS (
+        SELECT
+            a.id,
+            a.created_at,
+            ROW_NUMBER() OVER (
+                PARTITION BY a.user_id ORDER BY a.created_at DESC
+            ) AS position
+        FROM user_profiles_analysis a
+    ),
+    expired AS (
+        SELECT ranked.id
+        FROM ranked
+        WHERE ranked.position > GREATEST(keep_latest, 1)
+            AND ranked.created_at < NOW() - min_age
+            AND NOT EXISTS (
+                SELECT 1 FROM profiles p WHERE p.latest_analysis_id = ranked.id
+            )
+        LIMIT batch_size
+    )
+    DELETE FROM user_profiles_analysis
+    WHERE id IN (SELECT id FROM expired);
+
+    GET DIAGNOSTICS deleted = ROW_COUNT;
+    RETURN deleted;
+END;
+$$ language 'plpgsql';
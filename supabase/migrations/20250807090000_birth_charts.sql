@@ -0,0 +1,17 @@
+-- Shared birth chart cache, keyed on a hash of the normalized birth tuple
+-- (date, time, rounded coordinates) and the algorithm version that produced it
+
+CREATE TABLE IF NOT EXISTS birth_charts (
+    chart_key TEXT NOT NULL,
+    algorithm_version TEXT NOT NULL,
+    chart_data JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (chart_key, algorithm_version)
+);
+
+-- Shared across users: only the service role reads and writes it
+ALTER TABLE birth_charts ENABLE ROW LEVEL SECURITY;
+
+CREATE TRIGGER update_birth_charts_updated_at BEFORE UPDATE ON birth_charts
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
@@ -0,0 +1,69 @@
+-- Record which algorithm version produced each stored result so stale rows
+-- can be found and recomputed after an algorithm rollout
+
+-- 3.6 每日运势数据表设计 (daily_fortunes)
+CREATE TABLE IF NOT EXISTS daily_fortunes (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE,
+    fortune_date DATE NOT NULL,
+    fortune_data JSONB,
+    generated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    is_pushed BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- 3.8 合盘分析结果表设计 (compatibility_analysis_results)
+CREATE TABLE IF NOT EXISTS compatibility_analysis_results (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id_main UUID REFERENCES auth.users(id) ON DELETE CASCADE,
+    other_profile_id UUID REFERENCES other_profiles(id) ON DELETE CASCADE,
+    analysis_data JSONB,
+    analysis_date DATE DEFAULT NOW(),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Enable Row Level Security
+ALTER TABLE daily_fortunes ENABLE ROW LEVEL SECURITY;
+ALTER TABLE compatibility_analysis_results ENABLE ROW LEVEL SECURITY;
+
+-- Create policies for daily_fortunes table (the service upserts fortunes)
+DROP POLICY IF EXISTS "Users can view own daily fortunes" ON daily_fortunes;
+CREATE POLICY "Users can view own daily fortunes" ON daily_fortunes
+    FOR SELECT USING (auth.uid() = user_id);
+
+DROP POLICY IF EXISTS "Users can insert own daily fortunes" ON daily_fortunes;
+CREATE POLICY "Users can insert own daily fortunes" ON daily_fortunes
+    FOR INSERT WITH CHECK (auth.uid() = user_id);
+
+DROP POLICY IF EXISTS "Users can update own daily fortunes" ON daily_fortunes;
+CREATE POLICY "Users can update own daily fortunes" ON daily_fortunes
+    FOR UPDATE USING (auth.uid() = user_id);
+
+-- Create policies for compatibility_analysis_results table
+DROP POLICY IF EXISTS "Users can view own compatibility results" ON compatibility_analysis_results;
+CREATE POLICY "Users can view own compatibility results" ON compatibility_analysis_results
+    FOR SELECT USING (auth.uid() = user_id_main);
+
+DROP POLICY IF EXISTS "Users can insert own compatibility results" ON compatibility_analysis_results;
+CREATE POLICY "Users can insert own compatibility results" ON compatibility_analysis_results
+    FOR INSERT WITH CHECK (auth.uid() = user_id_main);
+
+DROP POLICY IF EXISTS "Users can update own compatibility results" ON compatibility_analysis_results;
+CREATE POLICY "Users can update own compatibility results" ON compatibility_analysis_results
+    FOR UPDATE USING (auth.uid() = user_id_main);
+
+-- NULL means the row predates versioning (or was never produced by the
+-- algorithm service) and is treated as stale
+ALTER TABLE daily_fortunes ADD COLUMN IF NOT EXISTS algorithm_version TEXT;
+ALTER TABLE compatibility_analysis_results ADD COLUMN IF NOT EXISTS algorithm_version TEXT;
+ALTER TABLE user_profiles_analysis ADD COLUMN IF NOT EXISTS algorithm_version TEXT;
+
+-- Let the re-computation sweeper find stale rows without a full scan
+CREATE INDEX IF NOT EXISTS idx_daily_fortunes_version_date
+    ON daily_fortunes(algorithm_version, fortune_date);
+CREATE INDEX IF NOT EXISTS idx_compatibility_analysis_results_version
+    ON compatibility_analysis_results(algorithm_version);
+CREATE INDEX IF NOT EXISTS idx_user_profiles_analysis_version
+    ON user_profiles_analysis(algorithm_version);
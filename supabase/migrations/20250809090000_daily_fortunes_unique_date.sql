@@ -0,0 +1,13 @@
+-- One daily fortune per user and date. A read and a background upgrade can
+-- both generate the same day's fortune; the service upserts on this key.
+
+-- Keep the most recently generated fortune of any existing duplicates
+DELETE FROM daily_fortunes d
+USING daily_fortunes newer
+WHERE d.user_id = newer.user_id
+  AND d.fortune_date = newer.fortune_date
+  AND (COALESCE(d.generated_at, '-infinity'), d.id)
+    < (COALESCE(newer.generated_at, '-infinity'), newer.id);
+
+ALTER TABLE daily_fortunes
+    ADD CONSTRAINT daily_fortunes_user_date_key UNIQUE (user_id, fortune_date);
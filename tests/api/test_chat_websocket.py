@@ -0,0 +1,97 @@
+"""
+聊天 WebSocket 握手认证测试
+"""
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from jose import jwt
+from starlette.websockets import WebSocketDisconnect
+
+from src.controllers.chat import router
+from src.middleware.auth import WS_CLOSE_TOKEN_EXPIRED
+
+
+def _token(expires_in: float) -> str:
+    """生成带过期时间的测试token"""
+    return jwt.encode({"exp": int(time.time() + expires_in)}, "secret")
+
+
+@pytest.fixture
+def user_id():
+    return str(uuid4())
+
+
+@pytest.fixture
+def client(user_id):
+    """带 mock Supabase 认证的测试客户端"""
+    app = FastAPI()
+    app.include_router(router)
+
+    user_response = MagicMock()
+    user_response.user.id = user_id
+    user_response.user.email = "user@example.com"
+
+    with patch("src.middleware.auth.supabase_client") as mock_supabase, patch(
+        "src.controllers.chat.chat_service.is_session_owner",
+        new=AsyncMock(return_value=True),
+    ):
+        mock_supabase.auth.get_user.return_value = user_response
+        yield TestClient(app), mock_supabase
+
+
+def test_websocket_query_param_token_verified_once(client):
+    """测试握手时只校验一次token"""
+    test_client, mock_supabase = client
+    session_id = str(uuid4())
+
+    with test_client.websocket_connect(
+        f"/chat/sessions/{session_id}/ws?access_token={_token(3600)}"
+    ) as websocket:
+        for _ in range(3):
+            websocket.send_text("ping")
+            assert websocket.receive_text() == "pong"
+
+    mock_supabase.auth.get_user.assert_called_once()
+
+
+def test_websocket_subprotocol_token(client):
+    """测试通过子协议传递token"""
+    test_client, _ = client
+    session_id = str(uuid4())
+
+    with test_client.websocket_connect(
+        f"/chat/sessions/{session_id}/ws",
+        subprotocols=["bearer", _token(3600)],
+    ) as websocket:
+        assert websocket.accepted_subprotocol == "bearer"
+        websocket.send_text("ping")
+        assert websocket.receive_text() == "pong"
+
+
+def test_websocket_missing_token_rejected(client):
+    """测试缺少token时拒绝握手"""
+    test_client, mock_supabase = client
+
+    with pytest.raises(WebSocketDisconnect):
+        with test_client.websocket_connect(f"/chat/sessions/{uuid4()}/ws"):
+            pass
+
+    mock_supabase.auth.get_user.assert_not_called()
+
+
+def test_websocket_closed_when_token_expires(client):
+    """测试token过期时由定时器关闭连接"""
+    test_client, _ = client
+
+    # exp is truncated to whole seconds: 2s leaves at least 1s for the handshake
+    with test_client.websocket_connect(
+        f"/chat/sessions/{uuid4()}/ws?access_token={_token(2)}"
+    ) as websocket:
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            websocket.receive_text()
+
+    assert exc_info.value.code == WS_CLOSE_TOKEN_EXPIRED
@@ -0,0 +1,130 @@
+"""
+请求截止时间测试
+"""
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.db import TableGateway
+from src.middleware.deadline import DeadlineMiddleware
+from src.services.algorithm import AlgorithmClient
+from src.services.background import background_tasks
+from src.utils.deadline import (
+    DEADLINE_HEADER,
+    DeadlineExceededError,
+    bounded_timeout,
+    deadline_scope,
+    remaining,
+)
+
+
+@pytest.fixture
+def app():
+    """带截止时间中间件的测试应用"""
+    app = FastAPI()
+
+    @app.get("/api/v1/fast")
+    async def fast() -> dict[str, float | None]:
+        return {"remaining": remaining()}
+
+    @app.get("/api/v1/slow/task")
+    async def slow() -> dict[str, str]:
+        await asyncio.sleep(5)
+        return {"status": "done"}
+
+    app.add_middleware(
+        DeadlineMiddleware,
+        default=10.0,
+        routes={"/api/v1/slow": 0.05, "/api/v1/slow/other": 20.0},
+    )
+    return app
+
+
+class TestDeadlineMiddleware:
+    """DeadlineMiddleware测试类"""
+
+    def test_default_budget_visible_to_handler(self, app):
+        """测试请求处理中可读取剩余时间"""
+        response = TestClient(app).get("/api/v1/fast")
+
+        assert response.status_code == 200
+        assert 9.0 < response.json()["remaining"] <= 10.0
+
+    def test_client_header_lowers_budget(self, app):
+        """测试客户端可通过请求头缩短截止时间"""
+        response = TestClient(app).get("/api/v1/fast", headers={DEADLINE_HEADER: "500"})
+
+        assert response.json()["remaining"] <= 0.5
+
+    def test_expired_request_cancelled_with_504(self, app):
+        """测试超过路由截止时间的请求被取消并返回504"""
+        response = TestClient(app).get("/api/v1/slow/task")
+
+        assert response.status_code == 504
+        assert response.json()["detail"] == "Request deadline exceeded"
+
+    def test_longest_prefix_wins(self):
+        """测试最长路由前缀优先"""
+        middleware = DeadlineMiddleware(
+            MagicMock(), default=30.0, routes={"/a": 5.0, "/a/b": 7.0}
+        )
+
+        assert middleware.budget({"path": "/a/b/c", "headers": []}) == 7.0
+        assert middleware.budget({"path": "/a/x", "headers": []}) == 5.0
+        assert middleware.budget({"path": "/z", "headers": []}) == 30.0
+
+
+class TestDeadlineConsumers:
+    """下游调用消费截止时间测试类"""
+
+    def test_bounded_timeout_without_deadline(self):
+        """测试请求外使用默认超时"""
+        assert bounded_timeout(None, 30.0) == 30.0
+        assert bounded_timeout(5.0, 30.0) == 5.0
+
+    def test_bounded_timeout_uses_time_left(self):
+        """测试请求内超时不超过剩余时间"""
+        with deadline_scope(2.0):
+            assert bounded_timeout(None, 30.0) < 2.0
+            assert bounded_timeout(1.0, 30.0) == 1.0
+
+        with deadline_scope(0.1):
+            with pytest.raises(DeadlineExceededError):
+                bounded_timeout(None, 30.0)
+
+    def test_gateway_checks_deadline(self, mock_supabase_client):
+        """测试截止时间已过时不再发起数据库查询"""
+        gateway = TableGateway(mock_supabase_client, "profiles")
+
+        with deadline_scope(-1):
+            with pytest.raises(DeadlineExceededError):
+                gateway.get_by_id("1")
+
+        mock_supabase_client.table.return_value.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_algorithm_call_forwards_deadline(self, mock_httpx_client):
+        """测试算法调用转发剩余时间"""
+        client = AlgorithmClient(version="1", batch_window=0)
+
+        with deadline_scope(5.0):
+            await client.post("/api/algorithm/fortune/predict", {})
+
+        kwargs = mock_httpx_client.post.call_args[1]
+        assert kwargs["timeout"] < 5.0
+        assert 0 < int(kwargs["headers"][DEADLINE_HEADER]) < 5000
+
+    @pytest.mark.asyncio
+    async def test_background_tasks_run_without_deadline(self):
+        """测试后台任务不继承请求截止时间"""
+
+        async def read_deadline():
+            return remaining()
+
+        with deadline_scope(5.0):
+            task = background_tasks.spawn(read_deadline())
+
+        assert await task is None
@@ -0,0 +1,102 @@
+"""
+客户端断开连接测试
+"""
+import asyncio
+
+import pytest
+
+from src.middleware.disconnect import DisconnectMiddleware
+from src.services.background import background_tasks
+
+
+def _scope(path="/api/v1/compatibility/analyze"):
+    return {"type": "http", "method": "POST", "path": path, "headers": []}
+
+
+class TestDisconnectMiddleware:
+    """DisconnectMiddleware测试类"""
+
+    @pytest.mark.asyncio
+    async def test_disconnect_cancels_handler(self):
+        """测试客户端断开后取消请求处理"""
+        disconnect = asyncio.Event()
+        handler_cancelled = asyncio.Event()
+
+        async def receive():
+            if not disconnect.is_set():
+                disconnect.set()
+                return {"type": "http.request", "body": b"{}", "more_body": False}
+            await asyncio.sleep(0.01)
+            return {"type": "http.disconnect"}
+
+        async def app(scope, receive, send):
+            message = await receive()
+            assert message["body"] == b"{}"
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                handler_cancelled.set()
+                raise
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await asyncio.wait_for(
+            DisconnectMiddleware(app)(_scope(), receive, send), timeout=1
+        )
+
+        assert handler_cancelled.is_set()
+        assert sent == []
+
+    @pytest.mark.asyncio
+    async def test_completed_response_not_cancelled(self):
+        """测试响应完成后的断开不影响请求"""
+        response_sent = asyncio.Event()
+
+        async def receive():
+            await response_sent.wait()
+            return {"type": "http.disconnect"}
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+            response_sent.set()
+            await asyncio.sleep(0.01)
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await DisconnectMiddleware(app)(_scope(), receive, send)
+
+        assert [message["type"] for message in sent] == [
+            "http.response.start",
+            "http.response.body",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_shielded_work_survives_disconnect(self):
+        """测试交给后台完成的计算在断开后继续执行"""
+        persisted = asyncio.Event()
+
+        async def analyze_and_store():
+            await asyncio.sleep(0.05)
+            persisted.set()
+
+        async def receive():
+            await asyncio.sleep(0.01)
+            return {"type": "http.disconnect"}
+
+        async def app(scope, receive, send):
+            await background_tasks.shielded(analyze_and_store(), name="analysis")
+
+        async def send(message):
+            pass
+
+        await DisconnectMiddleware(app)(_scope(), receive, send)
+        assert not persisted.is_set()
+
+        await asyncio.wait_for(persisted.wait(), timeout=1)
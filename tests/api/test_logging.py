@@ -0,0 +1,129 @@
+"""
+结构化日志测试
+"""
+import json
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.utils import log as log_module
+from src.utils.log import (
+    ErrorSampler,
+    RequestIdMiddleware,
+    configure_logging,
+    parse_size,
+    shutdown_logging,
+)
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    """配置写入临时文件的日志管道，测试后恢复根日志器"""
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    path = tmp_path / "logs" / "aura.log"
+    yield path
+    shutdown_logging()
+    root.handlers, root.level = handlers, level
+
+
+def read_entries(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestErrorSampler:
+    """ErrorSampler测试类"""
+
+    def _record(self, level=logging.ERROR, msg="Algorithm service error: %s"):
+        return logging.LogRecord("svc", level, __file__, 1, msg, ("503",), None)
+
+    def test_repetitive_errors_sampled(self, monkeypatch):
+        """测试重复错误超过突发上限后被丢弃，并在下个窗口报告丢弃数量"""
+        now = [100.0]
+        monkeypatch.setattr(log_module.time, "monotonic", lambda: now[0])
+        sampler = ErrorSampler(burst=3, window=60)
+
+        passed = [sampler.filter(self._record()) for _ in range(5)]
+        now[0] += 61
+        record = self._record()
+
+        assert passed == [True, True, True, False, False]
+        assert sampler.filter(record)
+        assert record.suppressed == 2
+
+    def test_info_and_distinct_messages_not_sampled(self):
+        """测试INFO日志和不同模板的错误不受采样影响"""
+        sampler = ErrorSampler(burst=1, window=60)
+
+        assert all(sampler.filter(self._record(level=logging.INFO)) for _ in range(5))
+        assert sampler.filter(self._record(msg="Cache read error: %s"))
+        assert sampler.filter(self._record(msg="Cache write error: %s"))
+
+
+class TestLoggingPipeline:
+    """日志管道测试类"""
+
+    def test_parse_size(self):
+        """测试解析日志文件大小配置"""
+        assert parse_size("10MB") == 10 * 1024 * 1024
+        assert parse_size("512kb") == 512 * 1024
+        with pytest.raises(ValueError):
+            parse_size("ten megabytes")
+
+    def test_json_lines_with_request_id(self, log_file):
+        """测试日志以JSON写入文件，并带有请求ID和异常堆栈"""
+        configure_logging(level="INFO", log_file=str(log_file))
+        app = FastAPI()
+
+        @app.get("/work")
+        async def work() -> dict[str, str]:
+            try:
+                raise RuntimeError("boom")
+            except RuntimeError:
+                logging.getLogger("src.services.test").exception("Work failed")
+            return {"status": "ok"}
+
+        app.add_middleware(RequestIdMiddleware)
+        response = TestClient(app).get("/work", headers={"X-Request-ID": "req-123"})
+        shutdown_logging()
+
+        entry = next(
+            entry
+            for entry in read_entries(log_file)
+            if entry["message"] == "Work failed"
+        )
+        assert response.headers["X-Request-ID"] == "req-123"
+        assert entry["level"] == "ERROR"
+        assert entry["request_id"] == "req-123"
+        assert "RuntimeError: boom" in entry["exception"]
+
+    def test_request_id_generated(self):
+        """测试未提供请求ID时自动生成"""
+        app = FastAPI()
+
+        @app.get("/ping")
+        async def ping() -> dict[str, str | None]:
+            return {"request_id": log_module.current_request_id()}
+
+        app.add_middleware(RequestIdMiddleware)
+        response = TestClient(app).get("/ping")
+
+        assert len(response.headers["X-Request-ID"]) == 32
+        assert response.json()["request_id"] == response.headers["X-Request-ID"]
+
+    def test_rotation_by_size(self, log_file):
+        """测试日志文件按配置大小轮转"""
+        configure_logging(
+            level="INFO", log_file=str(log_file), max_size="1KB", backup_count=2
+        )
+        logger = logging.getLogger("src.services.test")
+        for i in range(100):
+            logger.info("Processed item %s", i)
+        shutdown_logging()
+
+        assert log_file.stat().st_size <= 1024
+        assert (log_file.parent / "aura.log.1").exists()
+        assert (log_file.parent / "aura.log.2").exists()
+        assert not (log_file.parent / "aura.log.3").exists()
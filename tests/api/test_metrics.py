@@ -0,0 +1,194 @@
+"""
+Prometheus指标测试
+"""
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from src.middleware.metrics import MetricsMiddleware
+from src.services.algorithm import AlgorithmClient, AlgorithmResult
+from src.utils.metrics import REGISTRY, LoopLagMonitor, instrument_postgrest
+
+
+def sample(name, **labels):
+    """读取指标样本值（不存在时为0）"""
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.fixture
+def client():
+    """带指标中间件的测试客户端"""
+    app = FastAPI()
+
+    @app.get("/api/v1/items/{item_id}")
+    async def get_item(item_id: str) -> dict[str, str]:
+        if item_id == "missing":
+            raise HTTPException(status_code=404, detail="Not found")
+        return {"id": item_id}
+
+    app.add_middleware(MetricsMiddleware)
+    return TestClient(app)
+
+
+class TestMetricsMiddleware:
+    """MetricsMiddleware测试类"""
+
+    def test_latency_labelled_by_route_template(self, client):
+        """测试请求延迟按路由模板而非实际路径记录"""
+        labels = {"method": "GET", "route": "/api/v1/items/{item_id}"}
+        ok_before = sample(
+            "aura_http_request_duration_seconds_count", status="200", **labels
+        )
+        missing_before = sample(
+            "aura_http_request_duration_seconds_count", status="404", **labels
+        )
+
+        client.get("/api/v1/items/a")
+        client.get("/api/v1/items/b")
+        client.get("/api/v1/items/missing")
+
+        assert (
+            sample("aura_http_request_duration_seconds_count", status="200", **labels)
+            == ok_before + 2
+        )
+        assert (
+            sample("aura_http_request_duration_seconds_count", status="404", **labels)
+            == missing_before + 1
+        )
+
+    def test_unknown_paths_share_one_label(self, client):
+        """测试未匹配路由的请求归入同一标签"""
+        before = sample(
+            "aura_http_request_duration_seconds_count",
+            method="GET",
+            route="unmatched",
+            status="404",
+        )
+
+        client.get("/random/path/1")
+        client.get("/random/path/2")
+
+        assert (
+            sample(
+                "aura_http_request_duration_seconds_count",
+                method="GET",
+                route="unmatched",
+                status="404",
+            )
+            == before + 2
+        )
+
+    def test_metrics_endpoint(self, client):
+        """测试/metrics输出Prometheus文本格式"""
+        client.get("/api/v1/items/a")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "aura_http_request_duration_seconds_bucket" in response.text
+        assert "aura_cache_hit_ratio" in response.text
+
+
+class TestAlgorithmMetrics:
+    """算法服务指标测试类"""
+
+    @pytest.mark.asyncio
+    async def test_latency_and_errors_per_endpoint(self, mock_httpx_client):
+        """测试算法调用延迟、错误状态与超时按端点记录"""
+        endpoint = "/api/algorithm/metrics-test"
+        response = MagicMock(status_code=503, headers={}, text="down")
+        mock_httpx_client.post.return_value = response
+        client = AlgorithmClient(version="1")
+
+        await client.post(endpoint, {})
+        mock_httpx_client.post.side_effect = httpx.ReadTimeout("slow")
+        with pytest.raises(httpx.ReadTimeout):
+            await client.post(endpoint, {})
+
+        assert (
+            sample("aura_algorithm_request_duration_seconds_count", endpoint=endpoint)
+            == 2
+        )
+        assert (
+            sample("aura_algorithm_errors_total", endpoint=endpoint, reason="5xx") == 1
+        )
+        assert (
+            sample("aura_algorithm_errors_total", endpoint=endpoint, reason="timeout")
+            == 1
+        )
+
+    def test_fallback_counted(self):
+        """测试降级结果计入回退次数"""
+        endpoint = "/api/algorithm/fallback-test"
+
+        AlgorithmResult.fallback({}, endpoint=endpoint)
+
+        assert sample("aura_algorithm_fallbacks_total", endpoint=endpoint) == 1
+
+
+class TestPostgrestMetrics:
+    """PostgREST指标测试类"""
+
+    def test_calls_timed_per_table_and_operation(self):
+        """测试PostgREST调用按表和操作记录延迟"""
+        session = httpx.Client(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, json=[]))
+        )
+        supabase = MagicMock()
+        supabase.postgrest.session = session
+        labels = {"table": "metrics_test", "status": "200"}
+
+        instrument_postgrest(supabase)
+        session.get("https://db.example.com/rest/v1/metrics_test?select=id")
+        session.patch("https://db.example.com/rest/v1/metrics_test?id=eq.1", json={})
+        session.post("https://db.example.com/rest/v1/rpc/metrics_fn", json={})
+
+        assert (
+            sample(
+                "aura_postgrest_request_duration_seconds_count",
+                operation="select",
+                **labels,
+            )
+            == 1
+        )
+        assert (
+            sample(
+                "aura_postgrest_request_duration_seconds_count",
+                operation="update",
+                **labels,
+            )
+            == 1
+        )
+        assert (
+            sample(
+                "aura_postgrest_request_duration_seconds_count",
+                table="rpc/metrics_fn",
+                operation="rpc",
+                status="200",
+            )
+            == 1
+        )
+
+
+class TestLoopLagMonitor:
+    """LoopLagMonitor测试类"""
+
+    @pytest.mark.asyncio
+    async def test_blocked_loop_observed(self):
+        """测试事件循环被阻塞时记录延迟"""
+        before = sample("aura_event_loop_lag_seconds_sum")
+        monitor = LoopLagMonitor(interval=0.01)
+        monitor.start()
+        await asyncio.sleep(0)
+
+        time.sleep(0.1)
+        await asyncio.sleep(0.02)
+        await monitor.stop()
+
+        assert sample("aura_event_loop_lag_seconds_sum") - before >= 0.05
@@ -0,0 +1,106 @@
+"""
+限流中间件测试
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.middleware.rate_limit import RateLimitMiddleware
+from src.services.rate_limit import RateLimiter
+
+
+class FakeAuth:
+    """模拟AuthMiddleware：把请求头中的用户写入请求状态"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        for name, value in scope.get("headers", []):
+            if name == b"x-user":
+                scope.setdefault("state", {})["user_id"] = value.decode()
+        await self.app(scope, receive, send)
+
+
+@pytest.fixture
+def limiter():
+    """每分钟两次的限流器"""
+    limiter = RateLimiter(
+        default_limit="2/minute",
+        premium_limit="4/minute",
+        costs={"/api/v1/fortune/predict": 2},
+    )
+    limiter._tier_cache.set("premium-user", "premium")
+    limiter._tier_cache.set("user-1", "default")
+    return limiter
+
+
+@pytest.fixture
+def client(limiter):
+    """带限流中间件的测试客户端"""
+    app = FastAPI()
+
+    @app.get("/api/v1/fortune/daily")
+    async def daily() -> dict[str, str]:
+        return {"status": "ok"}
+
+    @app.post("/api/v1/fortune/predict")
+    async def predict() -> dict[str, str]:
+        return {"status": "ok"}
+
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+    app.add_middleware(FakeAuth)
+    return TestClient(app)
+
+
+class TestRateLimitMiddleware:
+    """RateLimitMiddleware测试类"""
+
+    def test_rejects_with_retry_after(self, client):
+        """测试超出额度后返回429和Retry-After"""
+        headers = {"X-User": "user-1"}
+        first = client.get("/api/v1/fortune/daily", headers=headers)
+        second = client.get("/api/v1/fortune/daily", headers=headers)
+        third = client.get("/api/v1/fortune/daily", headers=headers)
+
+        assert first.headers["X-RateLimit-Remaining"] == "1"
+        assert second.status_code == 200
+        assert third.status_code == 429
+        assert int(third.headers["Retry-After"]) >= 1
+
+    def test_expensive_route_costs_more(self, client):
+        """测试昂贵路由一次用完默认额度"""
+        headers = {"X-User": "user-1"}
+        predict = client.post("/api/v1/fortune/predict", headers=headers)
+        daily = client.get("/api/v1/fortune/daily", headers=headers)
+
+        assert predict.status_code == 200
+        assert daily.status_code == 429
+
+    def test_premium_tier_has_higher_limit(self, client):
+        """测试高级用户享有更高额度"""
+        headers = {"X-User": "premium-user"}
+        statuses = [
+            client.get("/api/v1/fortune/daily", headers=headers).status_code
+            for _ in range(5)
+        ]
+
+        assert statuses == [200, 200, 200, 200, 429]
+
+    def test_anonymous_limited_by_client_address(self, client):
+        """测试未认证请求按客户端地址限流"""
+        statuses = [client.get("/api/v1/fortune/daily").status_code for _ in range(3)]
+
+        assert statuses == [200, 200, 429]
+
+    def test_limiter_failure_fails_open(self, client, limiter):
+        """测试限流后端异常时放行请求"""
+
+        async def broken(*args):
+            raise ConnectionError("redis down")
+
+        limiter.backend.check = broken
+
+        response = client.get("/api/v1/fortune/daily", headers={"X-User": "user-1"})
+
+        assert response.status_code == 200
@@ -0,0 +1,173 @@
+"""
+分布式追踪测试
+"""
+import asyncio
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opentelemetry import trace
+from opentelemetry.trace import StatusCode
+
+from src.middleware.deadline import DeadlineMiddleware
+from src.services.algorithm import AlgorithmClient
+from src.utils.tracing import (
+    TracedMiddleware,
+    TracingMiddleware,
+    configure_tracing,
+    trace_postgrest,
+    tracer,
+)
+
+pytest.importorskip("opentelemetry.sdk")
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+
+@pytest.fixture
+def spans():
+    """内存导出器，返回本测试结束的span"""
+    exporter = configure_tracing(exporter="memory", sample_ratio=1.0)
+    exporter.clear()
+    yield exporter.get_finished_spans
+    exporter.clear()
+
+
+@pytest.fixture
+def client():
+    """带追踪中间件的测试客户端"""
+    app = FastAPI()
+
+    @app.get("/api/v1/items/{item_id}")
+    async def get_item(item_id: str) -> dict[str, str]:
+        with tracer.start_as_current_span("handler work"):
+            return {"id": item_id}
+
+    app.add_middleware(TracedMiddleware, middleware=DeadlineMiddleware, default=5.0)
+    app.add_middleware(TracingMiddleware)
+    return TestClient(app)
+
+
+def by_name(finished):
+    return {span.name: span for span in finished}
+
+
+class TestTracingMiddleware:
+    """TracingMiddleware测试类"""
+
+    def test_continues_incoming_trace(self, client, spans):
+        """测试服务端span延续调用方的traceparent并按路由模板命名"""
+        response = client.get(
+            "/api/v1/items/1",
+            headers={"traceparent": f"00-{TRACE_ID}-00f067aa0ba902b7-01"},
+        )
+
+        finished = by_name(spans())
+        server = finished["GET /api/v1/items/{item_id}"]
+        middleware = finished["middleware DeadlineMiddleware"]
+        work = finished["handler work"]
+
+        assert response.headers["X-Trace-Id"] == TRACE_ID
+        assert format(server.context.trace_id, "032x") == TRACE_ID
+        assert server.attributes["http.response.status_code"] == 200
+        assert middleware.parent.span_id == server.context.span_id
+        assert work.context.trace_id == server.context.trace_id
+
+    def test_unsampled_parent_not_recorded(self, client, spans):
+        """测试调用方未采样时不记录span"""
+        client.get(
+            "/api/v1/items/1",
+            headers={"traceparent": f"00-{TRACE_ID}-00f067aa0ba902b7-00"},
+        )
+
+        assert spans() == ()
+
+
+class TestAlgorithmTracing:
+    """算法服务调用追踪测试类"""
+
+    def _respond(self, mock_httpx_client, body):
+        response = MagicMock(status_code=200, headers={}, text="")
+        response.json.return_value = body
+        mock_httpx_client.post.return_value = response
+
+    @pytest.mark.asyncio
+    async def test_propagates_trace_context(self, mock_httpx_client, spans):
+        """测试算法调用生成客户端span并转发traceparent"""
+        self._respond(mock_httpx_client, {})
+        client = AlgorithmClient(version="1", batch_window=0)
+
+        with tracer.start_as_current_span("request") as parent:
+            await client.post("/api/algorithm/fortune/predict", {})
+
+        headers = mock_httpx_client.post.call_args.kwargs["headers"]
+        span = by_name(spans())["algorithm POST /api/algorithm/fortune/predict"]
+        trace_id = format(parent.get_span_context().trace_id, "032x")
+        span_id = format(span.context.span_id, "016x")
+
+        assert headers["traceparent"].startswith(f"00-{trace_id}-{span_id}-")
+        assert span.kind == trace.SpanKind.CLIENT
+        assert span.parent.span_id == parent.get_span_context().span_id
+
+    @pytest.mark.asyncio
+    async def test_batch_span_links_callers(self, mock_httpx_client, spans):
+        """测试批量请求的span链接到每个调用方的trace"""
+        self._respond(
+            mock_httpx_client,
+            {"responses": [{"status_code": 200, "body": {}}] * 2},
+        )
+        client = AlgorithmClient(version="1", batch_window=0.01)
+
+        async def call(name):
+            with tracer.start_as_current_span(name) as span:
+                await client.batched("/api/algorithm/daily-fortune/calculate", {})
+                return span.get_span_context()
+
+        callers = await asyncio.gather(call("first"), call("second"))
+
+        batch = by_name(spans())["algorithm batch"]
+        assert {link.context.trace_id for link in batch.links} == {
+            caller.trace_id for caller in callers
+        }
+        assert batch.context.trace_id not in {caller.trace_id for caller in callers}
+
+
+class TestPostgrestTracing:
+    """PostgREST追踪测试类"""
+
+    def test_span_per_call(self, spans):
+        """测试每次PostgREST调用生成带表名和操作的span"""
+        session = httpx.Client(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, json=[]))
+        )
+        supabase = MagicMock()
+        supabase.postgrest.session = session
+        trace_postgrest(supabase)
+
+        with tracer.start_as_current_span("request"):
+            session.get("https://db.example.com/rest/v1/profiles?select=id")
+
+        span = by_name(spans())["postgrest select profiles"]
+        assert span.attributes["db.collection.name"] == "profiles"
+        assert span.attributes["db.operation.name"] == "select"
+        assert span.parent is not None
+
+    def test_span_ends_on_transport_error(self, spans):
+        """测试连接失败时span也会结束并记录错误"""
+
+        def refuse(request):
+            raise httpx.ConnectError("connection refused", request=request)
+
+        session = httpx.Client(transport=httpx.MockTransport(refuse))
+        supabase = MagicMock()
+        supabase.postgrest.session = session
+        trace_postgrest(supabase)
+
+        with pytest.raises(httpx.ConnectError):
+            session.get("https://db.example.com/rest/v1/profiles?select=id")
+
+        span = by_name(spans())["postgrest select profiles"]
+        assert span.status.status_code == StatusCode.ERROR
+        assert span.events[0].name == "exception"
@@ -0,0 +1,23 @@
+"""
+基准测试fixtures
+"""
+import pytest
+
+from .rows import (
+    HISTORY_SIZES,
+    OTHER_PROFILE_SIZES,
+    make_message_rows,
+    make_other_profile_rows,
+)
+
+
+@pytest.fixture(params=HISTORY_SIZES, ids=lambda size: f"{size}msgs")
+def message_rows(request):
+    """典型/大负载的聊天历史"""
+    return make_message_rows(request.param)
+
+
+@pytest.fixture(params=OTHER_PROFILE_SIZES, ids=lambda size: f"{size}profiles")
+def other_profile_rows(request):
+    """典型/大负载的其他人档案列表"""
+    return make_other_profile_rows(request.param)
@@ -0,0 +1,114 @@
+"""
+基准测试数据
+
+模拟PostgREST返回的JSON行（UUID和时间均为字符串）。
+"""
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+# 典型负载和大负载：聊天历史条数 / 其他人档案个数
+HISTORY_SIZES = [50, 1000]
+OTHER_PROFILE_SIZES = [10, 100]
+
+BASE_TIME = datetime(2025, 1, 1, 8, 0, 0)
+
+
+def make_avatar_row():
+    """构造头像行"""
+    return {
+        "id": str(uuid4()),
+        "name": "星语者·小满",
+        "description": "擅长星盘解读的温柔向导",
+        "image_url": "https://example.com/avatar.png",
+        "abilities": ["星盘解读", "每日运势", "合盘分析"],
+        "initial_dialogue_prompt": "你好呀，{nickname}，我是小满~",
+        "created_at": BASE_TIME.isoformat(),
+        "updated_at": BASE_TIME.isoformat(),
+    }
+
+
+def make_profile_row(avatar_row=None):
+    """构造带嵌入头像的用户档案行（get_user_profile的查询结果）"""
+    return {
+        "id": str(uuid4()),
+        "nickname": "测试用户",
+        "gender": "female",
+        "birth_year": 1995,
+        "birth_month": 8,
+        "birth_day": 15,
+        "birth_hour": 14,
+        "birth_minute": 30,
+        "birth_second": 0,
+        "birth_location": "北京市",
+        "birth_longitude": 116.4074,
+        "birth_latitude": 39.9042,
+        "selected_avatar_id": avatar_row["id"] if avatar_row else None,
+        "selected_avatar": avatar_row,
+        "analysis_completed": True,
+        "latest_analysis_id": str(uuid4()),
+        "created_at": BASE_TIME.isoformat(),
+        "updated_at": BASE_TIME.isoformat(),
+    }
+
+
+def make_message_rows(count, session_id=None):
+    """构造一个会话的聊天消息行"""
+    session_id = session_id or str(uuid4())
+    return [
+        {
+            "id": str(uuid4()),
+            "session_id": session_id,
+            "sender_type": "ai" if i % 2 else "user",
+            "content": f"第{i}条消息：最近的星象对我的工作和感情有什么影响？",
+            "timestamp": (BASE_TIME + timedelta(minutes=i)).isoformat(),
+            "message_type": "text",
+            "related_data": None,
+            "created_at": (BASE_TIME + timedelta(minutes=i)).isoformat(),
+            "updated_at": (BASE_TIME + timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+def make_session_row(session_id=None, user_id=None):
+    """构造聊天会话行"""
+    return {
+        "id": session_id or str(uuid4()),
+        "user_id": user_id or str(uuid4()),
+        "avatar_id": str(uuid4()),
+        "session_start_time": BASE_TIME.isoformat(),
+        "session_end_time": None,
+        "is_active": True,
+        "last_message_preview": "谢谢！",
+        "last_message_at": BASE_TIME.isoformat(),
+        "message_count": 0,
+        "unread_count": 0,
+        "created_at": BASE_TIME.isoformat(),
+        "updated_at": BASE_TIME.isoformat(),
+    }
+
+
+def make_other_profile_rows(count, user_id=None):
+    """构造其他人档案行（other_profiles表的完整列）"""
+    user_id = user_id or str(uuid4())
+    return [
+        {
+            "id": str(uuid4()),
+            "user_id": user_id,
+            "name": f"朋友{i}",
+            "gender": "male" if i % 2 else "female",
+            "birth_year": 1980 + i % 25,
+            "birth_month": i % 12 + 1,
+            "birth_day": i % 28 + 1,
+            "birth_hour": i % 24,
+            "birth_minute": i % 60,
+            "birth_second": None,
+            "birth_location": "上海市",
+            "birth_longitude": 121.4737,
+            "birth_latitude": 31.2304,
+            "relation_type": "friend",
+            "created_at": (BASE_TIME + timedelta(days=i)).isoformat(),
+            "updated_at": (BASE_TIME + timedelta(days=i)).isoformat(),
+        }
+        for i in range(count)
+    ]
@@ -0,0 +1,263 @@
+"""
+模型构造与序列化基准测试
+
+对比服务层把PostgREST行转换成响应模型的几种方式：逐字段构造、
+model_validate（含from_attributes）、model_construct和TypeAdapter批量校验，
+以及响应序列化的开销。运行：
+
+    pytest tests/benchmarks --benchmark-only --benchmark-group-by=group,param
+"""
+import json
+import warnings
+from uuid import UUID
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from src.types.database import (  # noqa: E402
+    Avatar,
+    ChatHistoryResponse,
+    ChatMessage,
+    ChatSession,
+    OtherProfile,
+    OtherProfileResponse,
+    ProfileResponse,
+)
+from tests.benchmarks.rows import (  # noqa: E402
+    make_avatar_row,
+    make_profile_row,
+    make_session_row,
+)
+
+MESSAGES = TypeAdapter(list[ChatMessage])
+OTHER_PROFILES = TypeAdapter(list[OtherProfileResponse])
+HISTORY_RESPONSE = TypeAdapter(ChatHistoryResponse)
+
+
+def copy_other_profile(row):
+    """CompatibilityService.create_other_profile原来的写法：构造两次"""
+    profile = OtherProfile(**row)
+    return OtherProfileResponse(
+        id=profile.id,
+        name=profile.name,
+        gender=profile.gender,
+        birth_year=profile.birth_year,
+        birth_month=profile.birth_month,
+        birth_day=profile.birth_day,
+        birth_hour=profile.birth_hour,
+        birth_minute=profile.birth_minute,
+        birth_second=profile.birth_second,
+        birth_location=profile.birth_location,
+        relation_type=profile.relation_type,
+        created_at=profile.created_at,
+    )
+
+
+def build_profile_field_by_field(row):
+    """OnboardingService.get_user_profile的逐字段构造"""
+    avatar_data = row["selected_avatar"]
+    avatar = Avatar(
+        id=avatar_data["id"],
+        name=avatar_data["name"],
+        description=avatar_data.get("description"),
+        image_url=avatar_data.get("image_url"),
+        abilities=avatar_data.get("abilities", []),
+        initial_dialogue_prompt=avatar_data.get("initial_dialogue_prompt"),
+        created_at=avatar_data["created_at"],
+        updated_at=avatar_data["updated_at"],
+    )
+    return ProfileResponse(
+        id=row["id"],
+        nickname=row.get("nickname"),
+        gender=row.get("gender"),
+        birth_year=row.get("birth_year"),
+        birth_month=row.get("birth_month"),
+        birth_day=row.get("birth_day"),
+        birth_hour=row.get("birth_hour"),
+        birth_minute=row.get("birth_minute"),
+        birth_second=row.get("birth_second"),
+        birth_location=row.get("birth_location"),
+        birth_longitude=row.get("birth_longitude"),
+        birth_latitude=row.get("birth_latitude"),
+        selected_avatar=avatar,
+        analysis_completed=row.get("analysis_completed", False),
+        created_at=row["created_at"],
+        updated_at=row["updated_at"],
+    )
+
+
+def construct_quietly(serialize, value):
+    """序列化model_construct构造的模型（字段仍是字符串，会触发序列化警告）"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return serialize(value)
+
+
+def revalidate_response(adapter, response):
+    """FastAPI 0.104对response_model的处理：dump后重新校验，再编码"""
+    content = response.model_dump(by_alias=True)
+    return json.dumps(jsonable_encoder(adapter.validate_python(content))).encode()
+
+
+class TestChatHistoryConstruction:
+    """聊天历史行 -> ChatMessage"""
+
+    @pytest.mark.benchmark(group="chat_messages")
+    def test_kwargs(self, benchmark, message_rows):
+        """测试逐行ChatMessage(**row)（当前写法）"""
+        messages = benchmark(lambda: [ChatMessage(**row) for row in message_rows])
+        assert isinstance(messages[0].id, UUID)
+
+    @pytest.mark.benchmark(group="chat_messages")
+    def test_model_validate(self, benchmark, message_rows):
+        """测试逐行model_validate"""
+        messages = benchmark(
+            lambda: [ChatMessage.model_validate(row) for row in message_rows]
+        )
+        assert isinstance(messages[0].id, UUID)
+
+    @pytest.mark.benchmark(group="chat_messages")
+    def test_type_adapter(self, benchmark, message_rows):
+        """测试TypeAdapter批量校验整个列表"""
+        messages = benchmark(MESSAGES.validate_python, message_rows)
+        assert len(messages) == len(message_rows)
+        assert isinstance(messages[0].id, UUID)
+
+    @pytest.mark.benchmark(group="chat_messages")
+    def test_model_construct(self, benchmark, message_rows):
+        """测试model_construct跳过校验（字段保持原始字符串）"""
+        messages = benchmark(
+            lambda: [ChatMessage.model_construct(**row) for row in message_rows]
+        )
+        assert isinstance(messages[0].id, str)
+
+
+class TestOtherProfileConstruction:
+    """其他人档案行 -> OtherProfileResponse"""
+
+    @pytest.mark.benchmark(group="other_profiles")
+    def test_kwargs(self, benchmark, other_profile_rows):
+        """测试逐行OtherProfileResponse(**row)（get_other_profiles当前写法）"""
+        profiles = benchmark(
+            lambda: [OtherProfileResponse(**row) for row in other_profile_rows]
+        )
+        assert isinstance(profiles[0].id, UUID)
+
+    @pytest.mark.benchmark(group="other_profiles")
+    def test_double_construction(self, benchmark, other_profile_rows):
+        """测试先构造OtherProfile再逐字段复制成响应模型"""
+        profiles = benchmark(
+            lambda: [copy_other_profile(row) for row in other_profile_rows]
+        )
+        assert profiles[0].name == other_profile_rows[0]["name"]
+
+    @pytest.mark.benchmark(group="other_profiles")
+    def test_from_attributes(self, benchmark, other_profile_rows):
+        """测试用from_attributes把OtherProfile直接转换成响应模型"""
+
+        def convert():
+            return [
+                OtherProfileResponse.model_validate(
+                    OtherProfile(**row), from_attributes=True
+                )
+                for row in other_profile_rows
+            ]
+
+        profiles = benchmark(convert)
+        assert profiles[0] == copy_other_profile(other_profile_rows[0])
+
+    @pytest.mark.benchmark(group="other_profiles")
+    def test_type_adapter(self, benchmark, other_profile_rows):
+        """测试TypeAdapter批量校验整个列表"""
+        profiles = benchmark(OTHER_PROFILES.validate_python, other_profile_rows)
+        assert len(profiles) == len(other_profile_rows)
+
+    @pytest.mark.benchmark(group="other_profiles")
+    def test_model_construct(self, benchmark, other_profile_rows):
+        """测试model_construct跳过校验"""
+        profiles = benchmark(
+            lambda: [
+                OtherProfileResponse.model_construct(**row)
+                for row in other_profile_rows
+            ]
+        )
+        assert profiles[0].name == other_profile_rows[0]["name"]
+
+
+class TestProfileConstruction:
+    """带头像的用户档案行 -> ProfileResponse"""
+
+    @pytest.fixture
+    def profile_row(self):
+        return make_profile_row(make_avatar_row())
+
+    @pytest.mark.benchmark(group="profile")
+    def test_field_by_field(self, benchmark, profile_row):
+        """测试逐字段构造Avatar和ProfileResponse（当前写法）"""
+        profile = benchmark(build_profile_field_by_field, profile_row)
+        assert profile.selected_avatar.name == "星语者·小满"
+
+    @pytest.mark.benchmark(group="profile")
+    def test_model_validate(self, benchmark, profile_row):
+        """测试一次model_validate校验嵌套的档案和头像"""
+        profile = benchmark(ProfileResponse.model_validate, profile_row)
+        assert profile == build_profile_field_by_field(profile_row)
+
+
+class TestChatHistorySerialization:
+    """ChatHistoryResponse -> JSON响应体"""
+
+    @pytest.fixture
+    def history(self, message_rows):
+        session_row = make_session_row(message_rows[0]["session_id"])
+        return ChatHistoryResponse(
+            session=ChatSession(**session_row),
+            messages=MESSAGES.validate_python(message_rows),
+        )
+
+    @pytest.mark.benchmark(group="history_serialization")
+    def test_response_model_revalidation(self, benchmark, history):
+        """测试response_model重新校验后再编码"""
+        body = benchmark(revalidate_response, HISTORY_RESPONSE, history)
+        assert json.loads(body)["session"]["id"] == str(history.session.id)
+
+    @pytest.mark.benchmark(group="history_serialization")
+    def test_model_dump_json(self, benchmark, history):
+        """测试model_dump_json直接生成JSON"""
+        body = benchmark(history.model_dump_json)
+        assert json.loads(body) == json.loads(
+            revalidate_response(HISTORY_RESPONSE, history)
+        )
+
+    @pytest.mark.benchmark(group="history_serialization")
+    def test_type_adapter_dump_json(self, benchmark, history):
+        """测试TypeAdapter.dump_json直接生成JSON"""
+        body = benchmark(HISTORY_RESPONSE.dump_json, history)
+        assert len(json.loads(body)["messages"]) == len(history.messages)
+
+
+class TestRowsToJson:
+    """聊天历史行 -> JSON（构造加序列化的总开销）"""
+
+    @pytest.mark.benchmark(group="rows_to_json")
+    def test_validated(self, benchmark, message_rows):
+        """测试校验后序列化"""
+        body = benchmark(
+            lambda: MESSAGES.dump_json(MESSAGES.validate_python(message_rows))
+        )
+        assert len(json.loads(body)) == len(message_rows)
+
+    @pytest.mark.benchmark(group="rows_to_json")
+    def test_model_construct(self, benchmark, message_rows):
+        """测试model_construct后序列化（类型不匹配走慢路径）"""
+
+        def convert():
+            messages = [ChatMessage.model_construct(**row) for row in message_rows]
+            return construct_quietly(MESSAGES.dump_json, messages)
+
+        body = benchmark(convert)
+        assert json.loads(body)[0]["id"] == message_rows[0]["id"]
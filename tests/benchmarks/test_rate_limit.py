@@ -0,0 +1,41 @@
+"""
+限流检查基准测试
+
+每个请求都要经过一次限流检查，这里测量内存后端的单次开销。运行：
+
+    pytest tests/benchmarks/test_rate_limit.py --benchmark-only
+"""
+import asyncio
+from itertools import count
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from src.services.rate_limit import MemoryBackend, RateLimiter  # noqa: E402
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.mark.benchmark(group="rate_limit")
+def test_memory_backend_check(benchmark, loop):
+    """测试内存后端的单次检查开销（50个用户轮流请求）"""
+    limiter = RateLimiter(
+        default_limit="1000000/hour", burst_limit="100000/minute", costs={}
+    )
+    limiter.backend = MemoryBackend()
+    requests = count()
+
+    def check():
+        identity = f"user:{next(requests) % 50}"
+        return loop.run_until_complete(
+            limiter.check(identity, "default", "/api/v1/chat/sessions")
+        )
+
+    decision = benchmark(check)
+    assert decision.allowed
@@ -0,0 +1,137 @@
+"""
+响应路径基准测试
+
+从PostgREST行到响应体的完整开销：get_other_profiles和get_chat_history
+原来的写法（逐行校验构造，再经response_model重新校验）对比信任行快速路径
+（trusted构造 + json_response）。运行：
+
+    pytest tests/benchmarks/test_response_path.py --benchmark-only \\
+        --benchmark-group-by=group,param
+"""
+import asyncio
+import json
+from itertools import cycle
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from src.db import json_response  # noqa: E402
+from src.services.chat import ChatService  # noqa: E402
+from src.services.compatibility import CompatibilityService  # noqa: E402
+from src.types.database import (  # noqa: E402
+    ChatHistoryResponse,
+    ChatMessage,
+    ChatSession,
+    OtherProfileResponse,
+)
+from tests.benchmarks.rows import make_session_row  # noqa: E402
+
+OTHER_PROFILES = TypeAdapter(list[OtherProfileResponse])
+HISTORY_RESPONSE = TypeAdapter(ChatHistoryResponse)
+
+
+def revalidate_response(adapter, value):
+    """FastAPI 0.104对response_model的处理：dump后重新校验，再编码"""
+    content = adapter.dump_python(value, by_alias=True)
+    return json.dumps(jsonable_encoder(adapter.validate_python(content))).encode()
+
+
+def respond(data):
+    response = MagicMock()
+    response.data = data
+    response.count = None
+    return response
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+class TestGetOtherProfiles:
+    """GET /compatibility/other-profiles"""
+
+    @pytest.fixture
+    def service(self, mock_supabase_client, other_profile_rows):
+        mock_supabase_client.table.return_value.execute.return_value = respond(
+            other_profile_rows
+        )
+        return CompatibilityService(mock_supabase_client, mock_supabase_client)
+
+    @pytest.mark.benchmark(group="get_other_profiles")
+    def test_validated(self, benchmark, other_profile_rows):
+        """测试原来的写法：逐行构造后response_model重新校验"""
+
+        def handle():
+            profiles = [OtherProfileResponse(**row) for row in other_profile_rows]
+            return revalidate_response(OTHER_PROFILES, profiles)
+
+        body = benchmark(handle)
+        assert len(json.loads(body)) == len(other_profile_rows)
+
+    @pytest.mark.benchmark(group="get_other_profiles")
+    def test_trusted(self, benchmark, loop, service, other_profile_rows):
+        """测试信任行快速路径（服务层 + json_response）"""
+        user_id = other_profile_rows[0]["user_id"]
+
+        def handle():
+            profiles = loop.run_until_complete(service.get_other_profiles(user_id))
+            return json_response(list[OtherProfileResponse], profiles).body
+
+        body = benchmark(handle)
+        assert json.loads(body)[0]["id"] == other_profile_rows[0]["id"]
+
+
+class TestGetChatHistory:
+    """GET /chat/sessions/{session_id}/history"""
+
+    @pytest.fixture
+    def session_row(self, message_rows):
+        return make_session_row(message_rows[0]["session_id"])
+
+    @pytest.fixture
+    def service(self, mock_supabase_client, session_row, message_rows):
+        mock_supabase_client.table.return_value.execute.side_effect = cycle(
+            [respond([session_row]), respond(message_rows)]
+        )
+        return ChatService(
+            db_client=mock_supabase_client,
+            auth_client=MagicMock(),
+            algorithm=AsyncMock(),
+        )
+
+    @pytest.mark.benchmark(group="get_chat_history")
+    def test_validated(self, benchmark, session_row, message_rows):
+        """测试原来的写法：逐行构造后response_model重新校验"""
+
+        def handle():
+            history = ChatHistoryResponse(
+                session=ChatSession(**session_row),
+                messages=[ChatMessage(**row) for row in message_rows],
+            )
+            return revalidate_response(HISTORY_RESPONSE, history)
+
+        body = benchmark(handle)
+        assert len(json.loads(body)["messages"]) == len(message_rows)
+
+    @pytest.mark.benchmark(group="get_chat_history")
+    def test_trusted(self, benchmark, loop, service, session_row, message_rows):
+        """测试信任行快速路径（服务层 + json_response）"""
+
+        def handle():
+            history = loop.run_until_complete(
+                service.get_chat_history(
+                    session_row["id"], session_row["user_id"], len(message_rows)
+                )
+            )
+            return json_response(ChatHistoryResponse, history).body
+
+        body = benchmark(handle)
+        assert len(json.loads(body)["messages"]) == len(message_rows)
@@ -35,6 +35,8 @@ def mock_supabase_client():
         mock_table.order.return_value = mock_table
         mock_table.limit.return_value = mock_table
         mock_table.range.return_value = mock_table
+        mock_table.or_.return_value = mock_table
+        mock_table.in_.return_value = mock_table
 
         # 默认execute返回空结果
         mock_response = MagicMock()
@@ -0,0 +1,94 @@
+"""
+行转换单元测试
+"""
+import json
+import warnings
+from uuid import UUID
+
+import pytest
+from pydantic import ValidationError
+
+from src.db import json_response, trusted, trusted_list, validated
+from src.types.database import (
+    ChatHistoryResponse,
+    ChatMessage,
+    ChatSession,
+    MessageType,
+    OtherProfileResponse,
+)
+from tests.benchmarks.rows import (
+    make_message_rows,
+    make_other_profile_rows,
+    make_session_row,
+)
+
+
+class TestRowConversion:
+    """validated / trusted / json_response测试类"""
+
+    def test_validated_converts_types(self):
+        """测试校验模式转换UUID等类型"""
+        rows = make_other_profile_rows(2)
+
+        profiles = validated(list[OtherProfileResponse], rows)
+
+        assert isinstance(profiles[0].id, UUID)
+
+    def test_validated_rejects_bad_payload(self):
+        """测试校验模式拒绝不合法的数据"""
+        row = {**make_other_profile_rows(1)[0], "birth_year": "not-a-year"}
+
+        with pytest.raises(ValidationError):
+            validated(OtherProfileResponse, row)
+
+    def test_trusted_keeps_row_values(self):
+        """测试信任模式不做校验，保留原始值"""
+        row = make_other_profile_rows(1)[0]
+
+        profile = trusted(OtherProfileResponse, row)
+
+        assert isinstance(profile, OtherProfileResponse)
+        assert profile.id == row["id"]
+        assert profile.model_fields_set == set(row) & set(
+            OtherProfileResponse.model_fields
+        )
+
+    def test_trusted_fills_defaults(self):
+        """测试行中缺失的字段使用默认值"""
+        row = make_message_rows(1)[0]
+        del row["message_type"], row["related_data"]
+
+        message = trusted(ChatMessage, row)
+
+        assert message.message_type == MessageType.TEXT
+        assert message.related_data is None
+        assert "message_type" not in message.model_fields_set
+
+    def test_trusted_model_is_mutable(self):
+        """测试信任模式构造的模型可以正常赋值"""
+        session = trusted(ChatSession, {**make_session_row(), "unread_count": 3})
+
+        session.unread_count = 0
+
+        assert session.unread_count == 0
+
+    def test_json_response_matches_validated_output(self):
+        """测试信任模式的响应体与校验后序列化的内容一致"""
+        message_rows = make_message_rows(3)
+        session_row = make_session_row(message_rows[0]["session_id"])
+        history = ChatHistoryResponse(
+            session=trusted(ChatSession, session_row),
+            messages=trusted_list(ChatMessage, message_rows),
+        )
+        expected = ChatHistoryResponse(
+            session=ChatSession(**session_row),
+            messages=[ChatMessage(**row) for row in message_rows],
+        )
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            response = json_response(ChatHistoryResponse, history)
+
+        assert response.status_code == 200
+        assert response.media_type == "application/json"
+        assert json.loads(response.body) == json.loads(expected.model_dump_json())
@@ -0,0 +1,103 @@
+"""
+TableGateway单元测试
+"""
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pytest
+
+from src.db import TableGateway
+
+
+class TestTableGateway:
+    """TableGateway测试类"""
+
+    @pytest.fixture
+    def gateway(self, mock_supabase_client):
+        return TableGateway(mock_supabase_client, "chat_messages")
+
+    @pytest.fixture
+    def mock_table(self, mock_supabase_client):
+        return mock_supabase_client.table.return_value
+
+    def _respond(self, mock_table, rows, count=None):
+        response = MagicMock()
+        response.data = rows
+        response.count = count
+        mock_table.execute.return_value = response
+
+    def test_get_by_id_never_counts(self, gateway, mock_table):
+        """测试单行查询不请求count"""
+        row_id = uuid4()
+        self._respond(mock_table, [{"id": str(row_id)}])
+
+        row = gateway.get_by_id(row_id, columns="id, content", session_id="s1")
+
+        assert row == {"id": str(row_id)}
+        mock_table.select.assert_called_once_with("id, content")
+        mock_table.eq.assert_any_call("id", str(row_id))
+        mock_table.eq.assert_any_call("session_id", "s1")
+        mock_table.limit.assert_called_once_with(1)
+
+    def test_get_by_id_missing_returns_none(self, gateway, mock_table):
+        """测试行不存在时返回None而不是抛出异常"""
+        self._respond(mock_table, [])
+        assert gateway.get_by_id(uuid4()) is None
+
+    def test_exists_selects_only_id(self, gateway, mock_table):
+        """测试存在性检查只查询id"""
+        self._respond(mock_table, [{"id": "x"}])
+
+        assert gateway.exists(id="x", user_id="u") is True
+        mock_table.select.assert_called_once_with("id")
+
+    def test_list_page_has_more_without_count(self, gateway, mock_table):
+        """测试分页多取一行判断has_more"""
+        self._respond(mock_table, [{"id": i} for i in range(3)])
+
+        page = gateway.list_page(
+            {"session_id": "s1"}, order_by="timestamp", limit=2, offset=4
+        )
+
+        assert [row["id"] for row in page.rows] == [0, 1]
+        assert page.has_more is True
+        assert page.total is None
+        mock_table.select.assert_called_once_with("*")
+        mock_table.range.assert_called_once_with(4, 6)
+
+    def test_list_page_estimated_count(self, gateway, mock_table):
+        """测试按需请求估算count"""
+        self._respond(mock_table, [{"id": 1}], count=1234)
+
+        page = gateway.list_page(
+            {"session_id": "s1"}, order_by="timestamp", count="estimated"
+        )
+
+        assert page.total == 1234
+        assert page.has_more is False
+        mock_table.select.assert_called_once_with("*", count="estimated")
+
+    def test_projection_model_selects_its_fields(self, gateway, mock_table):
+        """测试投影模型只查询其声明的字段"""
+        from src.types.database import RowId
+
+        self._respond(mock_table, [{"id": "x"}])
+
+        gateway.get_one(
+            columns=RowId, order_by="session_start_time", desc=True, user_id="u"
+        )
+
+        mock_table.select.assert_called_once_with("id")
+        mock_table.order.assert_called_once_with("session_start_time", desc=True)
+
+    def test_select_columns_from_model(self):
+        """测试从模型生成select列表"""
+        from src.db import select_columns
+        from src.types.database import ProfileBirthInfo
+
+        columns = select_columns(ProfileBirthInfo).split(",")
+
+        assert columns[0] == "id"
+        assert "birth_latitude" in columns
+        assert "created_at" not in columns
+        assert select_columns("id, name") == "id, name"
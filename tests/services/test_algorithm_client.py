@@ -0,0 +1,261 @@
+"""
+AlgorithmClient单元测试
+"""
+import asyncio
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from src.services.algorithm import BATCH_PATH, AlgorithmClient, AlgorithmResult
+from src.services.scheduler import AlgorithmScheduler
+from src.utils.deadline import DEADLINE_HEADER, deadline_scope
+from src.utils.log import REQUEST_ID_HEADER, request_id_context
+
+
+class TestAlgorithmClient:
+    """AlgorithmClient测试类"""
+
+    @pytest.fixture
+    def client(self):
+        return AlgorithmClient(version="1")
+
+    def _respond(self, mock_httpx_client, body, headers=None, status_code=200):
+        response = MagicMock()
+        response.status_code = status_code
+        response.json.return_value = body
+        response.headers = headers or {}
+        response.text = ""
+        mock_httpx_client.post.return_value = response
+
+    @pytest.mark.asyncio
+    async def test_version_from_header(self, client, mock_httpx_client):
+        """测试从响应头读取算法版本并标记结果"""
+        self._respond(
+            mock_httpx_client,
+            {"fortune_details": {"luck_level": "吉"}},
+            headers={"X-Algorithm-Version": "2"},
+        )
+
+        response = await client.post("/api/algorithm/daily-fortune/calculate", {}, 30.0)
+        result = response.result("fortune_details")
+
+        assert isinstance(result, AlgorithmResult)
+        assert result == {"luck_level": "吉"}
+        assert result.version == "2"
+        assert client.current_version == "2"
+
+    @pytest.mark.asyncio
+    async def test_version_from_body(self, client, mock_httpx_client):
+        """测试响应体中的algorithm_version"""
+        self._respond(
+            mock_httpx_client, {"algorithm_version": "3", "compatibility_result": {}}
+        )
+
+        response = await client.post("/api/algorithm/compatibility/calculate", {}, 60.0)
+
+        assert response.version == "3"
+        assert client.current_version == "3"
+
+    @pytest.mark.asyncio
+    async def test_unversioned_response_uses_current(self, client, mock_httpx_client):
+        """测试未带版本的响应使用当前版本"""
+        self._respond(mock_httpx_client, {"fortune_result": {"summary": "好"}})
+
+        response = await client.post("/api/algorithm/fortune/predict", {}, 30.0)
+
+        assert response.result("fortune_result").version == "1"
+        assert client.current_version == "1"
+
+    @pytest.mark.asyncio
+    async def test_error_response_not_decoded(self, client, mock_httpx_client):
+        """测试错误响应不解析响应体"""
+        self._respond(mock_httpx_client, None, status_code=500)
+
+        response = await client.post("/api/algorithm/fortune/predict", {}, 30.0)
+
+        assert response.ok is False
+        assert response.data == {}
+        mock_httpx_client.post.return_value.json.assert_not_called()
+
+
+class TestAlgorithmClientBatching:
+    """AlgorithmClient微批处理测试类"""
+
+    @pytest.fixture
+    def client(self):
+        return AlgorithmClient(version="1", batch_window=0.01, batch_max_size=10)
+
+    def _respond(self, mock_httpx_client, body, headers=None, status_code=200):
+        response = MagicMock()
+        response.status_code = status_code
+        response.json.return_value = body
+        response.headers = headers or {}
+        response.text = ""
+        mock_httpx_client.post.return_value = response
+
+    @pytest.mark.asyncio
+    async def test_calls_in_window_share_one_batch(self, client, mock_httpx_client):
+        """测试窗口内的调用合并为一次/batch请求，结果按顺序分发"""
+        self._respond(
+            mock_httpx_client,
+            {
+                "responses": [
+                    {"status_code": 200, "body": {"fortune_details": {"n": 1}}},
+                    {"status_code": 500, "body": {"detail": "boom"}},
+                    {"status_code": 200, "body": {"fortune_details": {"n": 3}}},
+                ]
+            },
+            headers={"X-Algorithm-Version": "2"},
+        )
+
+        responses = await asyncio.gather(
+            *(
+                client.batched(
+                    "/api/algorithm/daily-fortune/calculate", {"user_id": str(i)}, 30.0
+                )
+                for i in range(3)
+            )
+        )
+
+        mock_httpx_client.post.assert_called_once()
+        url = mock_httpx_client.post.call_args[0][0]
+        payload = mock_httpx_client.post.call_args[1]["json"]
+        assert url.endswith(BATCH_PATH)
+        assert [item["payload"]["user_id"] for item in payload["requests"]] == [
+            "0",
+            "1",
+            "2",
+        ]
+
+        assert responses[0].result("fortune_details") == {"n": 1}
+        assert responses[0].version == "2"
+        assert responses[1].ok is False
+        assert responses[2].result("fortune_details") == {"n": 3}
+
+    @pytest.mark.asyncio
+    async def test_single_call_posted_directly(self, client, mock_httpx_client):
+        """测试窗口内只有一个调用时直接请求原接口"""
+        self._respond(mock_httpx_client, {"fortune_details": {"luck_level": "吉"}})
+
+        response = await client.batched(
+            "/api/algorithm/daily-fortune/calculate", {"user_id": "u"}, 30.0
+        )
+
+        url = mock_httpx_client.post.call_args[0][0]
+        assert url.endswith("/api/algorithm/daily-fortune/calculate")
+        assert response.result("fortune_details") == {"luck_level": "吉"}
+
+    @pytest.mark.asyncio
+    async def test_max_size_flushes_early(self, mock_httpx_client):
+        """测试达到批大小上限时立即发送"""
+        client = AlgorithmClient(version="1", batch_window=60.0, batch_max_size=2)
+        self._respond(
+            mock_httpx_client,
+            {"responses": [{"status_code": 200, "body": {}}] * 2},
+        )
+
+        responses = await asyncio.wait_for(
+            asyncio.gather(
+                client.batched("/a", {}, 30.0), client.batched("/b", {}, 30.0)
+            ),
+            timeout=1.0,
+        )
+
+        assert all(response.ok for response in responses)
+
+    @pytest.mark.asyncio
+    async def test_batch_not_sent_as_one_callers_request(self, mock_httpx_client):
+        """测试填满批次的调用方的请求id不会随整批请求发送"""
+        client = AlgorithmClient(version="1", batch_window=60.0, batch_max_size=2)
+        self._respond(
+            mock_httpx_client,
+            {"responses": [{"status_code": 200, "body": {}}] * 2},
+        )
+
+        async def call(request_id, path):
+            with request_id_context(request_id):
+                return await client.batched(path, {}, 30.0)
+
+        await asyncio.wait_for(
+            asyncio.gather(call("req-a", "/a"), call("req-b", "/b")), timeout=1.0
+        )
+
+        headers = mock_httpx_client.post.call_args[1]["headers"]
+        assert REQUEST_ID_HEADER not in headers
+
+    @pytest.mark.asyncio
+    async def test_single_call_keeps_its_request_id(self, client, mock_httpx_client):
+        """测试单独发送的调用带上自己的请求id"""
+        self._respond(mock_httpx_client, {})
+
+        with request_id_context("req-a"):
+            await client.batched("/a", {}, 30.0)
+
+        headers = mock_httpx_client.post.call_args[1]["headers"]
+        assert headers[REQUEST_ID_HEADER] == "req-a"
+
+    @pytest.mark.asyncio
+    async def test_transport_error_reaches_every_caller(
+        self, client, mock_httpx_client
+    ):
+        """测试批请求失败时每个调用方都收到异常"""
+        mock_httpx_client.post.side_effect = httpx.ConnectError("down")
+
+        results = await asyncio.gather(
+            client.batched("/a", {}, 30.0),
+            client.batched("/b", {}, 30.0),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(result, httpx.ConnectError) for result in results)
+
+    @pytest.mark.asyncio
+    async def test_mismatched_batch_response(self, client, mock_httpx_client):
+        """测试批响应条数不符时按失败处理"""
+        self._respond(mock_httpx_client, {"responses": []})
+
+        responses = await asyncio.gather(
+            client.batched("/a", {}, 30.0), client.batched("/b", {}, 30.0)
+        )
+
+        assert [response.status_code for response in responses] == [502, 502]
+
+    @pytest.mark.asyncio
+    async def test_batched_calls_respect_endpoint_limit(
+        self, client, mock_httpx_client, monkeypatch
+    ):
+        """测试批处理的调用同样受各接口并发上限约束"""
+        monkeypatch.setattr(
+            "src.services.algorithm.algorithm_scheduler",
+            AlgorithmScheduler(total_limit=10, endpoint_limits={"/a": 1}),
+        )
+        self._respond(mock_httpx_client, {})
+
+        await asyncio.gather(client.batched("/a", {}), client.batched("/a", {}))
+
+        urls = [call.args[0] for call in mock_httpx_client.post.call_args_list]
+        assert len(urls) == 2
+        assert all(url.endswith("/a") for url in urls)
+
+    @pytest.mark.asyncio
+    async def test_batched_budget_excludes_queueing(
+        self, client, mock_httpx_client, monkeypatch
+    ):
+        """测试排队等待的时间从调用的剩余时间中扣除"""
+        scheduler = AlgorithmScheduler(total_limit=1)
+        monkeypatch.setattr("src.services.algorithm.algorithm_scheduler", scheduler)
+        self._respond(mock_httpx_client, {})
+
+        async def hold_total_slot():
+            async with scheduler.slot("/other"):
+                await asyncio.sleep(0.3)
+
+        holder = asyncio.create_task(hold_total_slot())
+        await asyncio.sleep(0)
+        with deadline_scope(2.0):
+            await client.batched("/a", {})
+        await holder
+
+        headers = mock_httpx_client.post.call_args[1]["headers"]
+        assert int(headers[DEADLINE_HEADER]) < 1500
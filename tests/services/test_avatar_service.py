@@ -0,0 +1,64 @@
+"""
+AvatarCache单元测试
+"""
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.services.avatar import AvatarCache, AvatarTemplate
+
+
+class TestAvatarTemplate:
+    """AvatarTemplate测试类"""
+
+    def test_plain_prompt_is_its_own_greeting(self):
+        """测试无占位符的提示词直接作为问候语"""
+        template = AvatarTemplate("你好呀，我是小满~✨ 你想聊聊什么呢？")
+        assert template.fields == frozenset()
+        assert template.greeting == "你好呀，我是小满~✨ 你想聊聊什么呢？"
+
+    def test_placeholders_rendered_with_context(self):
+        """测试占位符渲染"""
+        template = AvatarTemplate(
+            "{nickname}你好，我是{avatar_name}。", defaults={"avatar_name": "月影"}
+        )
+        assert template.fields == frozenset({"nickname", "avatar_name"})
+        assert template.context_fields == frozenset({"nickname"})
+        assert template.greeting == "你好，我是月影。"
+        assert template.render(nickname="小明") == "小明你好，我是月影。"
+
+    def test_invalid_format_string_treated_as_literal(self):
+        """测试非法格式字符串按纯文本处理"""
+        template = AvatarTemplate("道法自然 {未闭合")
+        assert template.greeting == "道法自然 {未闭合"
+
+
+class TestAvatarCache:
+    """AvatarCache测试类"""
+
+    @pytest.fixture
+    def cache(self, mock_supabase_client, sample_avatar_data):
+        """创建测试用的AvatarCache实例"""
+        mock_response = MagicMock()
+        mock_response.data = [{**sample_avatar_data, "abilities": json.dumps(["星座分析"])}]
+        mock_supabase_client.table.return_value.execute.return_value = mock_response
+        return AvatarCache(db_client=mock_supabase_client, ttl=600)
+
+    @pytest.mark.asyncio
+    async def test_get_loads_once(
+        self, cache, mock_supabase_client, sample_avatar_data
+    ):
+        """测试头像只加载一次并缓存模板"""
+        for _ in range(3):
+            avatar, template = await cache.get(sample_avatar_data["id"])
+
+        assert avatar.name == sample_avatar_data["name"]
+        assert avatar.abilities == ["星座分析"]
+        assert template.greeting == sample_avatar_data["initial_dialogue_prompt"]
+        mock_supabase_client.table.return_value.execute.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_get_unknown_avatar(self, cache):
+        """测试获取不存在的头像"""
+        assert await cache.get("00000000-0000-0000-0000-000000000000") is None
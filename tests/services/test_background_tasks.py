@@ -0,0 +1,66 @@
+"""
+后台任务注册表与重试单元测试
+"""
+import asyncio
+
+import pytest
+
+from src.services.background import BackgroundTaskRegistry, retry_with_backoff
+
+
+class TestBackgroundTaskRegistry:
+    """BackgroundTaskRegistry测试类"""
+
+    @pytest.mark.asyncio
+    async def test_spawn_once_reuses_running_task(self):
+        """测试相同key只运行一个任务"""
+        registry = BackgroundTaskRegistry()
+        release = asyncio.Event()
+        runs = []
+
+        async def job():
+            runs.append(1)
+            await release.wait()
+
+        first = registry.spawn_once("upgrade", job())
+        second = registry.spawn_once("upgrade", job())
+        assert first is second
+
+        release.set()
+        await first
+        assert runs == [1]
+
+        # 完成后可以重新调度
+        third = registry.spawn_once("upgrade", job())
+        assert third is not first
+        await third
+
+
+class TestRetryWithBackoff:
+    """retry_with_backoff测试类"""
+
+    @pytest.mark.asyncio
+    async def test_retries_until_success(self):
+        """测试失败和异常都会重试，直到成功"""
+        outcomes = [False, RuntimeError("down"), True]
+
+        async def attempt():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        assert await retry_with_backoff(attempt, attempts=5, delay=0)
+        assert outcomes == []
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_attempts(self):
+        """测试达到次数上限后放弃"""
+        calls = []
+
+        async def attempt():
+            calls.append(1)
+            return False
+
+        assert not await retry_with_backoff(attempt, attempts=3, delay=0)
+        assert len(calls) == 3
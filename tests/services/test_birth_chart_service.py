@@ -0,0 +1,130 @@
+"""
+BirthChartService单元测试
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.services.algorithm import algorithm_client
+from src.services.birth_chart import (
+    BirthChartService,
+    birth_chart_key,
+    chart_key_for_birth_info,
+    chart_key_for_profile,
+)
+from src.types.database import BirthInfo
+
+
+class TestBirthChartKey:
+    """出生信息归一化键测试类"""
+
+    def test_coordinates_rounded(self):
+        """测试经纬度四舍五入后相同的出生信息共享键"""
+        a = birth_chart_key(1995, 8, 15, 14, 30, 0, "北京", 116.40741, 39.90421)
+        b = birth_chart_key(1995, 8, 15, 14, 30, None, "Beijing", 116.4051, 39.9038)
+        assert a == b
+
+    def test_negative_zero_coordinate(self):
+        """测试-0.00与0.00视为相同坐标"""
+        assert birth_chart_key(2000, 1, 1, 0, 0, 0, None, -0.001, 0.0) == (
+            birth_chart_key(2000, 1, 1, 0, 0, 0, None, 0.001, 0.0)
+        )
+
+    def test_unknown_time_differs_from_midnight(self):
+        """测试未知出生时间与零点不同"""
+        assert birth_chart_key(2000, 1, 1, None, None, None, "上海") != (
+            birth_chart_key(2000, 1, 1, 0, 0, 0, "上海")
+        )
+
+    def test_location_used_without_coordinates(self):
+        """测试无坐标时按地点名归一化"""
+        assert birth_chart_key(2000, 1, 1, location=" Shang  Hai ") == (
+            birth_chart_key(2000, 1, 1, location="shang hai")
+        )
+        assert birth_chart_key(2000, 1, 1, location="上海") != (
+            birth_chart_key(2000, 1, 1, location="北京")
+        )
+
+    def test_profile_and_birth_info_keys_match(self, sample_profile_data):
+        """测试profile行与BirthInfo生成相同的键"""
+        birth_info = BirthInfo(
+            year=sample_profile_data["birth_year"],
+            month=sample_profile_data["birth_month"],
+            day=sample_profile_data["birth_day"],
+            hour=sample_profile_data["birth_hour"],
+            minute=sample_profile_data["birth_minute"],
+            second=sample_profile_data["birth_second"],
+            location=sample_profile_data["birth_location"],
+            longitude=sample_profile_data["birth_longitude"],
+            latitude=sample_profile_data["birth_latitude"],
+        )
+        assert chart_key_for_profile(sample_profile_data) == (
+            chart_key_for_birth_info(birth_info)
+        )
+        assert chart_key_for_profile({"birth_year": 1995}) is None
+
+
+class TestBirthChartService:
+    """BirthChartService测试类"""
+
+    @pytest.fixture(autouse=True)
+    def algorithm_version(self, monkeypatch):
+        """固定当前算法版本，测试结束后恢复"""
+        monkeypatch.setattr(algorithm_client, "current_version", "7")
+
+    @pytest.fixture
+    def service(self, mock_supabase_client):
+        return BirthChartService(mock_supabase_client)
+
+    @pytest.fixture
+    def birth_info(self, sample_birth_info):
+        return BirthInfo(**sample_birth_info)
+
+    @pytest.mark.asyncio
+    async def test_cache_hit_skips_algorithm(
+        self, service, mock_supabase_client, mock_httpx_client, birth_info
+    ):
+        """测试命中缓存时不调用算法服务"""
+        chart = {"birth_chart_astrology": {"sun_sign": "Leo"}}
+        response = MagicMock()
+        response.data = [{"chart_data": chart}]
+        mock_supabase_client.table.return_value.execute.return_value = response
+
+        assert await service.get_or_compute("user-1", birth_info) == chart
+
+        mock_httpx_client.post.assert_not_called()
+        mock_supabase_client.table.return_value.eq.assert_any_call(
+            "algorithm_version", "7"
+        )
+
+    @pytest.mark.asyncio
+    async def test_cache_miss_computes_and_stores(
+        self, service, mock_supabase_client, mock_httpx_client, birth_info
+    ):
+        """测试未命中时计算并按算法版本存储"""
+        chart = {"birth_chart_astrology": {"sun_sign": "Leo"}}
+        algorithm_response = MagicMock()
+        algorithm_response.status_code = 200
+        algorithm_response.json.return_value = {"analysis_results": chart}
+        algorithm_response.headers = {"X-Algorithm-Version": "7"}
+        mock_httpx_client.post.return_value = algorithm_response
+
+        assert await service.get_or_compute("user-1", birth_info) == chart
+
+        mock_httpx_client.post.assert_called_once()
+        record = mock_supabase_client.table.return_value.upsert.call_args[0][0]
+        assert record == {
+            "chart_key": chart_key_for_birth_info(birth_info),
+            "algorithm_version": "7",
+            "chart_data": chart,
+        }
+
+    @pytest.mark.asyncio
+    async def test_algorithm_error_not_cached(
+        self, service, mock_supabase_client, mock_httpx_client, birth_info
+    ):
+        """测试算法服务错误时不写入缓存"""
+        mock_httpx_client.post.return_value.status_code = 500
+
+        assert await service.get_or_compute("user-1", birth_info) is None
+        mock_supabase_client.table.return_value.upsert.assert_not_called()
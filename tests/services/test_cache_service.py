@@ -0,0 +1,234 @@
+"""
+TwoTierCache单元测试
+"""
+import asyncio
+
+import pytest
+from pydantic import BaseModel, TypeAdapter
+
+from src.services import cache as cache_module
+from src.services.cache import LocalLRU, TwoTierCache, cached
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class Item(BaseModel):
+    name: str
+    count: int = 0
+
+
+def item_adapter():
+    return TypeAdapter(Item)
+
+
+@pytest.fixture
+def fake_server():
+    """共享的fakeredis服务器，模拟多实例连接同一Redis"""
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+async def redis_cache(fake_server):
+    """连接fakeredis的缓存实例"""
+    cache = TwoTierCache(redis=fakeredis.FakeAsyncRedis(server=fake_server))
+    await cache.start()
+    yield cache
+    await cache.stop()
+
+
+class TestLocalLRU:
+    """LocalLRU测试类"""
+
+    def test_evicts_least_recently_used(self):
+        """测试超出容量时淘汰最久未使用的条目"""
+        lru = LocalLRU(max_entries=2, ttl=60)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        assert lru.get("a") == 1
+        lru.set("c", 3)
+
+        assert lru.get("b") is cache_module._MISSING
+        assert lru.get("a") == 1
+        assert lru.get("c") == 3
+
+    def test_expired_entry_is_missing(self, monkeypatch):
+        """测试过期条目视为未命中"""
+        lru = LocalLRU(max_entries=10, ttl=5)
+        now = [100.0]
+        monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+        lru.set("a", 1)
+
+        now[0] += 6
+        assert lru.get("a") is cache_module._MISSING
+        assert len(lru) == 0
+
+
+class TestTwoTierCache:
+    """TwoTierCache测试类"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_load_once(self, redis_cache):
+        """测试并发未命中只加载一次"""
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return Item(name="x")
+
+        results = await asyncio.gather(
+            *(redis_cache.get_or_load("k", load, item_adapter()) for _ in range(10))
+        )
+
+        assert calls == 1
+        assert all(result == Item(name="x") for result in results)
+
+    @pytest.mark.asyncio
+    async def test_redis_tier_shared_between_instances(self, fake_server, redis_cache):
+        """测试一个实例加载的值可被另一实例从Redis读取"""
+        other = TwoTierCache(redis=fakeredis.FakeAsyncRedis(server=fake_server))
+        await other.start()
+        try:
+            await redis_cache.get_or_load(
+                "k", lambda: _value(Item(name="shared")), item_adapter()
+            )
+
+            async def fail():
+                raise AssertionError("should be served from redis")
+
+            value = await other.get_or_load("k", fail, item_adapter())
+
+            assert value == Item(name="shared")
+            assert other.stats()["redis_hits"] == 1
+        finally:
+            await other.stop()
+
+    @pytest.mark.asyncio
+    async def test_none_and_rejected_values_not_cached(self, redis_cache):
+        """测试None和cache_if拒绝的结果不会被缓存"""
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            return Item(name="x", count=calls)
+
+        for _ in range(2):
+            await redis_cache.get_or_load(
+                "rejected", load, item_adapter(), cache_if=lambda item: False
+            )
+            await redis_cache.get_or_load("none", lambda: _value(None), item_adapter())
+
+        assert calls == 2
+        assert redis_cache.local.get("none") is cache_module._MISSING
+
+    @pytest.mark.asyncio
+    async def test_invalidation_reaches_other_instances(self, fake_server, redis_cache):
+        """测试失效消息通过pub/sub清除其他实例的本地缓存"""
+        other = TwoTierCache(redis=fakeredis.FakeAsyncRedis(server=fake_server))
+        await other.start()
+        try:
+            await other.get_or_load(
+                "k", lambda: _value(Item(name="old")), item_adapter()
+            )
+            assert other.local.get("k") == Item(name="old")
+
+            await redis_cache.invalidate("k")
+            for _ in range(50):
+                if other.local.get("k") is cache_module._MISSING:
+                    break
+                await asyncio.sleep(0.01)
+
+            assert other.local.get("k") is cache_module._MISSING
+            assert await other.redis.get(cache_module.CACHE_PREFIX + "k") is None
+        finally:
+            await other.stop()
+
+    @pytest.mark.asyncio
+    async def test_invalidation_during_load_skips_store(self, redis_cache):
+        """测试加载期间发生的失效会阻止写入过期值"""
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def load():
+            started.set()
+            await release.wait()
+            return Item(name="stale")
+
+        task = asyncio.create_task(redis_cache.get_or_load("k", load, item_adapter()))
+        await started.wait()
+        await redis_cache.invalidate("k")
+        release.set()
+
+        assert await task == Item(name="stale")
+        assert redis_cache.local.get("k") is cache_module._MISSING
+        assert await redis_cache.redis.get(cache_module.CACHE_PREFIX + "k") is None
+
+    @pytest.mark.asyncio
+    async def test_missing_redis_package_warns(self, monkeypatch, caplog):
+        """测试配置了REDIS_URL但未安装redis时记录警告并只用本地缓存"""
+        monkeypatch.setattr(cache_module, "aioredis", None)
+        cache = TwoTierCache(redis_url="redis://localhost:6379/0")
+
+        with caplog.at_level("WARNING", logger=cache_module.__name__):
+            await cache.start()
+
+        assert cache.enabled
+        assert cache.redis is None
+        assert "redis package is not installed" in caplog.text
+
+
+class TestCachedDecorator:
+    """cached装饰器测试类"""
+
+    @pytest.mark.asyncio
+    async def test_decorated_method_cached_and_invalidated(self, monkeypatch):
+        """测试装饰的服务方法按参数缓存并可失效"""
+        local_cache = TwoTierCache(redis_url="")
+        monkeypatch.setattr(cache_module, "service_cache", local_cache)
+        await local_cache.start()
+
+        class Service:
+            def __init__(self):
+                self.calls = 0
+
+            @cached("item")
+            async def get_item(self, name: str) -> Item:
+                self.calls += 1
+                return Item(name=name, count=self.calls)
+
+        service = Service()
+        try:
+            assert (await service.get_item("a")).count == 1
+            assert (await service.get_item("a")).count == 1
+            assert (await service.get_item("b")).count == 2
+            assert Service.get_item.cache_key("a") == "item:a"
+
+            await Service.get_item.invalidate("a")
+            assert (await service.get_item("a")).count == 3
+        finally:
+            await local_cache.stop()
+
+    @pytest.mark.asyncio
+    async def test_bypassed_until_started(self):
+        """测试缓存未启动时直接调用原方法"""
+
+        class Service:
+            def __init__(self):
+                self.calls = 0
+
+            @cached("bypass")
+            async def get_item(self, name: str) -> Item:
+                self.calls += 1
+                return Item(name=name)
+
+        service = Service()
+        await service.get_item("a")
+        await service.get_item("a")
+
+        assert service.calls == 2
+
+
+async def _value(value):
+    return value
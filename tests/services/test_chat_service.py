@@ -0,0 +1,462 @@
+"""
+ChatService单元测试
+"""
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+
+from src.services.algorithm import AlgorithmResponse
+from src.services.background import background_tasks
+from src.services.chat import ChatService
+from src.services.scheduler import Priority
+from src.types.database import ChatInitiateRequest, ProfileResponse
+from src.utils.helpers import decode_cursor
+
+
+class TestChatService:
+    """ChatService测试类"""
+
+    @pytest.fixture
+    def service(self, mock_supabase_client):
+        """创建测试用的ChatService实例"""
+        return ChatService(
+            db_client=mock_supabase_client,
+            auth_client=MagicMock(),
+            algorithm=AsyncMock(),
+        )
+
+    def _session_row(self, user_id, minutes_ago):
+        """构造带反范式字段的会话行"""
+        now = datetime.now()
+        return {
+            "id": str(uuid4()),
+            "user_id": user_id,
+            "avatar_id": str(uuid4()),
+            "session_start_time": (now - timedelta(days=1)).isoformat(),
+            "session_end_time": None,
+            "is_active": True,
+            "last_message_preview": "今天运势如何？",
+            "last_message_at": (now - timedelta(minutes=minutes_ago)).isoformat(),
+            "message_count": 4,
+            "unread_count": 1,
+            "created_at": now.isoformat(),
+            "updated_at": now.isoformat(),
+            "avatars": {"name": "星语者·小满", "image_url": "/avatars/xiaoman.png"},
+        }
+
+    @pytest.mark.asyncio
+    async def test_get_user_sessions_first_page(
+        self, service, mock_supabase_client, sample_user_id
+    ):
+        """测试会话列表首页返回下一页游标"""
+        rows = [self._session_row(sample_user_id, i) for i in range(3)]
+        mock_response = MagicMock()
+        mock_response.data = rows
+
+        mock_table = mock_supabase_client.table.return_value
+        mock_table.execute.return_value = mock_response
+
+        response = await service.get_user_sessions(sample_user_id, limit=2)
+
+        assert len(response.sessions) == 2
+        assert response.has_more is True
+        assert response.sessions[0].avatar_name == "星语者·小满"
+        assert response.sessions[0].last_message_preview == "今天运势如何？"
+        assert response.sessions[0].message_count == 4
+
+        # 只查询 avatars，不再 join profiles
+        select_columns = mock_table.select.call_args[0][0]
+        assert "profiles" not in select_columns
+        assert "avatars(name, image_url)" in select_columns
+        mock_table.limit.assert_called_with(3)
+        mock_table.or_.assert_not_called()
+
+        last_message_at, last_id = decode_cursor(response.next_cursor, 2)
+        assert last_id == str(response.sessions[1].id)
+        assert last_message_at == response.sessions[1].last_message_at.isoformat()
+
+    @pytest.mark.asyncio
+    async def test_get_user_sessions_with_cursor(
+        self, service, mock_supabase_client, sample_user_id
+    ):
+        """测试使用游标获取最后一页"""
+        first_page = MagicMock()
+        first_page.data = [self._session_row(sample_user_id, i) for i in range(2)]
+        last_page = MagicMock()
+        last_page.data = [self._session_row(sample_user_id, 10)]
+
+        mock_table = mock_supabase_client.table.return_value
+        mock_table.execute.side_effect = [first_page, last_page]
+
+        page = await service.get_user_sessions(sample_user_id, limit=1)
+        response = await service.get_user_sessions(
+            sample_user_id, limit=1, cursor=page.next_cursor
+        )
+
+        assert len(response.sessions) == 1
+        assert response.has_more is False
+        assert response.next_cursor is None
+        keyset_filter = mock_table.or_.call_args[0][0]
+        assert str(page.sessions[0].id) in keyset_filter
+
+    @pytest.mark.asyncio
+    async def test_get_user_sessions_invalid_cursor(self, service, sample_user_id):
+        """测试无效游标"""
+        with pytest.raises(ValueError, match="Invalid pagination cursor"):
+            await service.get_user_sessions(sample_user_id, cursor="not-a-cursor")
+
+    @pytest.mark.asyncio
+    async def test_get_chat_history_page(
+        self,
+        service,
+        mock_supabase_client,
+        sample_user_id,
+        sample_chat_session_data,
+        sample_chat_message_data,
+    ):
+        """测试聊天记录分页且不请求count"""
+        session_response = MagicMock()
+        session_response.data = [{**sample_chat_session_data, "unread_count": 0}]
+        messages_response = MagicMock()
+        messages_response.data = [sample_chat_message_data] * 3
+
+        mock_table = mock_supabase_client.table.return_value
+        mock_table.execute.side_effect = [session_response, messages_response]
+
+        response = await service.get_chat_history(
+            sample_chat_session_data["id"], sample_user_id, limit=2
+        )
+
+        assert len(response.messages) == 2
+        assert response.has_more is True
+        assert response.total_estimate is None
+        for call in mock_table.select.call_args_list:
+            assert "count" not in call.kwargs
+
+    @pytest.mark.asyncio
+    async def test_send_message_rejects_foreign_session(
+        self, service, mock_supabase_client, sample_user_id
+    ):
+        """测试向不属于自己的会话发送消息"""
+        from src.types.database import ChatMessageRequest
+
+        with pytest.raises(ValueError, match="Chat session not found"):
+            await service.send_message(
+                str(uuid4()), sample_user_id, ChatMessageRequest(content="你好")
+            )
+
+        mock_supabase_client.table.return_value.select.assert_called_once_with("id")
+
+    @pytest.mark.asyncio
+    async def test_get_ai_response_goes_through_algorithm_client(
+        self, service, sample_user_id
+    ):
+        """测试AI回复通过算法客户端以交互优先级请求"""
+        session_id = str(uuid4())
+        service.algorithm.post.return_value = AlgorithmResponse(
+            200, {"ai_response": {**sample_chat_message_row(), "content": "你好呀"}}, "1"
+        )
+
+        ai_response = await service._get_ai_response(session_id, sample_user_id, "你好")
+
+        assert ai_response.content == "你好呀"
+        service.algorithm.post.assert_awaited_once_with(
+            "/chat/send_message",
+            {"session_id": session_id, "user_id": sample_user_id, "message": "你好"},
+            priority=Priority.INTERACTIVE,
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_ai_response_error_status(self, service, sample_user_id):
+        """测试算法服务返回错误状态码"""
+        service.algorithm.post.return_value = AlgorithmResponse(503, {}, "1")
+
+        with pytest.raises(ValueError, match="Algorithm service error"):
+            await service._get_ai_response(str(uuid4()), sample_user_id, "你好")
+
+
+class TestChatInitiate:
+    """ChatService.initiate_chat测试类"""
+
+    @pytest.fixture
+    def service(self, mock_supabase_client):
+        return ChatService(
+            db_client=mock_supabase_client,
+            auth_client=MagicMock(),
+            algorithm=AsyncMock(),
+        )
+
+    @pytest.fixture
+    def avatar(self, sample_avatar_data):
+        from src.services.avatar import AvatarTemplate, parse_avatar
+
+        avatar = parse_avatar(sample_avatar_data)
+        return avatar, AvatarTemplate(avatar.initial_dialogue_prompt)
+
+    def _stub_inserts(self, mock_supabase_client, sample_chat_session_data):
+        """会话插入和消息插入都回显插入的数据"""
+        mock_table = mock_supabase_client.table.return_value
+
+        def insert(data):
+            row = {**sample_chat_message_row(), **data}
+            if "user_id" in data:
+                row = {**sample_chat_session_data, **data}
+            response = MagicMock()
+            response.data = [row]
+            query = MagicMock()
+            query.execute.return_value = response
+            return query
+
+        mock_table.insert.side_effect = insert
+
+    @pytest.mark.asyncio
+    async def test_initiate_chat_profile_aware_message(
+        self,
+        service,
+        mock_supabase_client,
+        avatar,
+        sample_chat_session_data,
+        sample_profile_data,
+        sample_user_id,
+    ):
+        """测试算法服务及时返回时使用个性化开场白"""
+        self._stub_inserts(mock_supabase_client, sample_chat_session_data)
+        profile = {**sample_profile_data, "analysis_completed": True}
+        service._get_initial_message = AsyncMock(
+            return_value=(
+                MagicMock(content="测试用户你好，今天想聊什么？"),
+                ProfileResponse(**profile),
+            )
+        )
+
+        with patch(
+            "src.services.chat.avatar_cache.get", new=AsyncMock(return_value=avatar)
+        ):
+            response = await service.initiate_chat(
+                sample_user_id, ChatInitiateRequest(avatar_id=avatar[0].id)
+            )
+
+        assert response.initial_message.content == "测试用户你好，今天想聊什么？"
+        assert response.user_profile is not None
+        assert response.profile_message_pending is False
+        service._get_initial_message.assert_awaited_once_with(
+            user_id=sample_user_id,
+            initial_message_content=avatar[0].initial_dialogue_prompt,
+        )
+
+    @pytest.mark.asyncio
+    async def test_initiate_chat_renders_greeting_with_profile(
+        self,
+        service,
+        mock_supabase_client,
+        avatar,
+        sample_chat_session_data,
+        sample_profile_data,
+        sample_user_id,
+    ):
+        """测试问候语中的用户占位符用资料渲染"""
+        from src.services.avatar import AvatarTemplate
+
+        self._stub_inserts(mock_supabase_client, sample_chat_session_data)
+        mock_supabase_client.table.return_value.execute.return_value.data = [
+            sample_profile_data
+        ]
+        template = AvatarTemplate(
+            "{nickname}你好，我是{avatar_name}。",
+            defaults={"avatar_name": avatar[0].name},
+        )
+        service._get_initial_message = AsyncMock(
+            return_value=(
+                MagicMock(content="个性化开场白"),
+                ProfileResponse(**sample_profile_data),
+            )
+        )
+
+        with patch(
+            "src.services.chat.avatar_cache.get",
+            new=AsyncMock(return_value=(avatar[0], template)),
+        ):
+            await service.initiate_chat(
+                sample_user_id, ChatInitiateRequest(avatar_id=avatar[0].id)
+            )
+
+        service._get_initial_message.assert_awaited_once_with(
+            user_id=sample_user_id,
+            initial_message_content=(
+                f"{sample_profile_data['nickname']}你好，我是{avatar[0].name}。"
+            ),
+        )
+
+    @pytest.mark.asyncio
+    async def test_initiate_chat_slow_algorithm_returns_pre_rendered_greeting(
+        self,
+        service,
+        mock_supabase_client,
+        avatar,
+        sample_chat_session_data,
+        sample_profile_data,
+        sample_user_id,
+    ):
+        """测试算法服务慢时立即返回预渲染问候语，并异步补发个性化消息"""
+        self._stub_inserts(mock_supabase_client, sample_chat_session_data)
+        release = asyncio.Event()
+
+        async def slow_initial_message(**kwargs):
+            await release.wait()
+            return MagicMock(content="个性化开场白"), ProfileResponse(**sample_profile_data)
+
+        service._get_initial_message = slow_initial_message
+
+        with patch(
+            "src.services.chat.avatar_cache.get", new=AsyncMock(return_value=avatar)
+        ), patch("src.services.chat.settings.CHAT_GREETING_TIMEOUT", 0.01):
+            response = await service.initiate_chat(
+                sample_user_id, ChatInitiateRequest(avatar_id=avatar[0].id)
+            )
+
+            assert response.initial_message.content == avatar[1].greeting
+            assert response.user_profile is None
+            assert response.profile_message_pending is True
+
+            release.set()
+            await background_tasks.shutdown()
+
+        contents = [
+            call.args[0]["content"]
+            for call in mock_supabase_client.table.return_value.insert.call_args_list
+            if "content" in call.args[0]
+        ]
+        assert contents == [avatar[1].greeting, "个性化开场白"]
+
+    @pytest.mark.asyncio
+    async def test_initiate_chat_algorithm_failure_rolls_back_session(
+        self,
+        service,
+        mock_supabase_client,
+        avatar,
+        sample_chat_session_data,
+        sample_user_id,
+    ):
+        """测试算法服务失败时删除已创建的会话"""
+        self._stub_inserts(mock_supabase_client, sample_chat_session_data)
+        service._get_initial_message = AsyncMock(
+            side_effect=RuntimeError("Failed to get initial message")
+        )
+
+        with patch(
+            "src.services.chat.avatar_cache.get", new=AsyncMock(return_value=avatar)
+        ):
+            with pytest.raises(RuntimeError):
+                await service.initiate_chat(
+                    sample_user_id, ChatInitiateRequest(avatar_id=avatar[0].id)
+                )
+
+        mock_table = mock_supabase_client.table.return_value
+        mock_table.delete.assert_called_once()
+        mock_table.eq.assert_called_with("id", sample_chat_session_data["id"])
+
+    @pytest.mark.asyncio
+    async def test_initiate_chat_session_failure_cancels_algorithm_call(
+        self, service, mock_supabase_client, avatar, sample_user_id
+    ):
+        """测试会话创建失败时取消并行的算法调用"""
+        cancelled = asyncio.Event()
+
+        async def pending_initial_message(**kwargs):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        service._get_initial_message = pending_initial_message
+        empty_response = MagicMock()
+        empty_response.data = []
+        mock_supabase_client.table.return_value.execute.return_value = empty_response
+
+        with patch(
+            "src.services.chat.avatar_cache.get", new=AsyncMock(return_value=avatar)
+        ):
+            with pytest.raises(ValueError, match="Failed to create chat session"):
+                await service.initiate_chat(
+                    sample_user_id, ChatInitiateRequest(avatar_id=avatar[0].id)
+                )
+
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+    @pytest.mark.asyncio
+    async def test_initiate_chat_cancelled_while_waiting_cancels_algorithm_call(
+        self,
+        service,
+        mock_supabase_client,
+        avatar,
+        sample_chat_session_data,
+        sample_user_id,
+    ):
+        """测试等待问候语时请求被取消，算法调用随之取消并删除会话"""
+        self._stub_inserts(mock_supabase_client, sample_chat_session_data)
+        waiting = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def pending_initial_message(**kwargs):
+            try:
+                waiting.set()
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        service._get_initial_message = pending_initial_message
+        mock_table = mock_supabase_client.table.return_value
+
+        with patch(
+            "src.services.chat.avatar_cache.get", new=AsyncMock(return_value=avatar)
+        ):
+            initiate = asyncio.create_task(
+                service.initiate_chat(
+                    sample_user_id, ChatInitiateRequest(avatar_id=avatar[0].id)
+                )
+            )
+            await waiting.wait()
+            while not mock_table.insert.called:
+                await asyncio.sleep(0.001)
+            # Let initiate_chat resume from the insert and start waiting
+            await asyncio.sleep(0.05)
+            initiate.cancel()
+
+            with pytest.raises(asyncio.CancelledError):
+                await initiate
+
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        mock_table.delete.assert_called_once()
+        mock_table.eq.assert_called_with("id", sample_chat_session_data["id"])
+
+    @pytest.mark.asyncio
+    async def test_initiate_chat_unknown_avatar(self, service, sample_user_id):
+        """测试头像不存在"""
+        with patch(
+            "src.services.chat.avatar_cache.get", new=AsyncMock(return_value=None)
+        ):
+            with pytest.raises(ValueError, match="not found"):
+                await service.initiate_chat(
+                    sample_user_id, ChatInitiateRequest(avatar_id=uuid4())
+                )
+
+
+def sample_chat_message_row():
+    """消息插入的默认返回字段"""
+    now = datetime.now().isoformat()
+    return {
+        "id": str(uuid4()),
+        "session_id": str(uuid4()),
+        "sender_type": "ai",
+        "content": "",
+        "timestamp": now,
+        "message_type": "text",
+        "related_data": None,
+        "created_at": now,
+        "updated_at": now,
+    }
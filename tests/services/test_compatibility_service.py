@@ -21,10 +21,7 @@ class TestCompatibilityService:
     @pytest.fixture
     def service(self, mock_supabase_client):
         """创建测试用的CompatibilityService实例"""
-        service = CompatibilityService()
-        service.supabase = mock_supabase_client
-        service.admin_supabase = mock_supabase_client
-        return service
+        return CompatibilityService(mock_supabase_client, mock_supabase_client)
 
     @pytest.mark.asyncio
     async def test_create_other_profile_success(
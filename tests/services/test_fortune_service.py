@@ -6,6 +6,7 @@ from unittest.mock import MagicMock, patch, AsyncMock
 from uuid import uuid4
 from datetime import date, datetime
 
+from src.services.background import background_tasks
 from src.services.fortune import FortuneService
 from src.types.database import (
     FortuneRequest,
@@ -20,10 +21,7 @@ class TestFortuneService:
     @pytest.fixture
     def service(self, mock_supabase_client):
         """创建测试用的FortuneService实例"""
-        service = FortuneService()
-        service.supabase = mock_supabase_client
-        service.admin_supabase = mock_supabase_client
-        return service
+        return FortuneService(mock_supabase_client, mock_supabase_client)
 
     @pytest.mark.asyncio
     async def test_get_daily_fortune_new_user(
@@ -81,8 +79,8 @@ class TestFortuneService:
             mock_profile_response
         )
 
-        # 第三次调用：插入新运势
-        mock_table.insert.return_value.execute.return_value = mock_insert_response
+        # 第三次调用：写入新运势
+        mock_table.upsert.return_value.execute.return_value = mock_insert_response
 
         # 执行测试
         response = await service.get_daily_fortune(sample_user_id, target_date)
@@ -161,14 +159,14 @@ class TestFortuneService:
             mock_result = MagicMock()
             mock_result.select.return_value = mock_result
             mock_result.eq.return_value = mock_result
-            mock_result.insert.return_value = mock_result
+            mock_result.upsert.return_value = mock_result
 
             if table_name == "daily_fortunes":
                 mock_result.execute.return_value = mock_existing_response
             elif table_name == "profiles":
                 mock_result.execute.return_value = mock_profile_response
 
-            # 对于insert操作
+            # 对于upsert操作
             mock_result.execute.return_value = mock_insert_response
             return mock_result
 
@@ -429,11 +427,66 @@ class TestFortuneService:
         result = await service._generate_daily_fortune(sample_user_id, fortune_date)
 
         # 验证fallback结果
+        assert result.degraded is True
         assert result["luck_level"] == "平"
         assert result["lucky_color"] == "蓝色"
         assert result["lucky_number"] == 7
         assert "平稳" in result["general_summary"]
 
+    @pytest.mark.asyncio
+    async def test_get_daily_fortune_degraded_not_stored(
+        self, service, mock_supabase_client, mock_httpx_client, sample_user_id
+    ):
+        """测试fallback运势不写入数据库并安排后台重试"""
+        mock_httpx_client.post.return_value.status_code = 500
+
+        with patch.object(background_tasks, "spawn_once") as spawn_once:
+            response = await service.get_daily_fortune(sample_user_id, "2024-01-15")
+
+        assert response.degraded is True
+        assert response.fortune.id is None
+        assert response.fortune.fortune_data["luck_level"] == "平"
+        mock_supabase_client.table.return_value.upsert.assert_not_called()
+
+        spawn_once.assert_called_once()
+        key, coro = spawn_once.call_args[0]
+        assert key == f"fortune-upgrade-{sample_user_id}-2024-01-15"
+        coro.close()
+
+    @pytest.mark.asyncio
+    async def test_upgrade_daily_fortune_stores_real_result(
+        self, service, mock_supabase_client, mock_httpx_client, sample_user_id
+    ):
+        """测试算法服务恢复后后台重试写入真实运势"""
+        algorithm_response = MagicMock(status_code=200, headers={})
+        algorithm_response.json.return_value = {"fortune_details": {"luck_level": "吉"}}
+        mock_httpx_client.post.return_value = algorithm_response
+        mock_table = mock_supabase_client.table.return_value
+        # 依次为：已有运势检查、用户profile、写入运势
+        mock_table.execute.side_effect = [
+            MagicMock(data=[]),
+            MagicMock(data=[]),
+            MagicMock(data=[{"id": str(uuid4())}]),
+        ]
+
+        assert await service._upgrade_daily_fortune(sample_user_id, "2024-01-15")
+
+        upsert = mock_table.upsert.call_args
+        record = upsert[0][0]
+        assert upsert.kwargs["on_conflict"] == "user_id,fortune_date"
+        assert record["fortune_data"] == {"luck_level": "吉"}
+        assert record["fortune_date"] == "2024-01-15"
+
+    @pytest.mark.asyncio
+    async def test_upgrade_daily_fortune_still_degraded(
+        self, service, mock_supabase_client, mock_httpx_client, sample_user_id
+    ):
+        """测试算法服务仍不可用时不写入"""
+        mock_httpx_client.post.return_value.status_code = 503
+
+        assert not await service._upgrade_daily_fortune(sample_user_id, "2024-01-15")
+        mock_supabase_client.table.return_value.upsert.assert_not_called()
+
     @pytest.mark.asyncio
     async def test_call_fortune_algorithm_success(
         self, service, mock_httpx_client, sample_user_id
@@ -531,6 +584,8 @@ class TestFortuneService:
         assert result is not None
         assert result["content"] == "你的塔罗牌结果已生成"
         assert result["message_type"] == "tarot_result"
+        # 只查询会话id，不读取整行
+        mock_table.select.assert_called_once_with("id")
 
     @pytest.mark.asyncio
     async def test_create_fortune_message_no_active_session(
@@ -22,10 +22,7 @@ class TestOnboardingService:
     @pytest.fixture
     def service(self, mock_supabase_client):
         """创建测试用的OnboardingService实例"""
-        service = OnboardingService()
-        service.supabase = mock_supabase_client
-        service.admin_supabase = mock_supabase_client
-        return service
+        return OnboardingService(mock_supabase_client, mock_supabase_client)
 
     @pytest.mark.asyncio
     async def test_get_avatars_success(
@@ -100,6 +97,25 @@ class TestOnboardingService:
         assert profile.selected_avatar.name == "星语者·小满"
         assert profile.analysis_completed is False
 
+    @pytest.mark.asyncio
+    async def test_get_user_profile_analysis_completed_from_profile(
+        self, service, mock_supabase_client, sample_profile_data
+    ):
+        """测试分析完成状态直接来自profiles，不读取分析结果表"""
+        profile_data = sample_profile_data.copy()
+        profile_data["analysis_completed"] = True
+
+        mock_response = MagicMock()
+        mock_response.data = [profile_data]
+        mock_supabase_client.table.return_value.execute.return_value = mock_response
+
+        profile = await service.get_user_profile(profile_data["id"])
+
+        assert profile.analysis_completed is True
+        mock_supabase_client.table.assert_called_once_with("profiles")
+        select_columns = mock_supabase_client.table.return_value.select.call_args[0][0]
+        assert "analysis_data" not in select_columns
+
     @pytest.mark.asyncio
     async def test_get_user_profile_not_exists(self, service, mock_supabase_client):
         """测试获取不存在的用户档案"""
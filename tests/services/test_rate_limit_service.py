@@ -0,0 +1,148 @@
+"""
+RateLimiter单元测试
+"""
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from src.services.rate_limit import (
+    RateLimit,
+    RateLimiter,
+    RedisBackend,
+)
+
+
+@pytest.fixture
+def limiter(mock_supabase_client):
+    """每小时10次、突发每分钟5次的限流器"""
+    return RateLimiter(
+        default_limit="10/hour",
+        premium_limit="100/hour",
+        burst_limit="5/minute",
+        costs={"/api/v1/compatibility/analyze": 3},
+        tier_ttl=60,
+        supabase=mock_supabase_client,
+    )
+
+
+class TestRateLimit:
+    """RateLimit解析测试类"""
+
+    def test_parse(self):
+        """测试解析限流配置字符串"""
+        limit = RateLimit.parse("100/hour")
+
+        assert limit.count == 100
+        assert limit.period == 3600
+        assert limit.interval == 36.0
+
+    def test_parse_invalid(self):
+        """测试非法配置抛出异常"""
+        with pytest.raises(ValueError):
+            RateLimit.parse("100/fortnight")
+
+
+class TestRateLimiter:
+    """RateLimiter测试类"""
+
+    @pytest.mark.asyncio
+    async def test_burst_limit_applies(self, limiter):
+        """测试突发限制先于小时限制生效"""
+        decisions = [
+            await limiter.check("user:1", "default", "/api/v1/fortune/daily")
+            for _ in range(6)
+        ]
+
+        assert [d.allowed for d in decisions] == [True] * 5 + [False]
+        assert decisions[4].remaining == 0
+        assert 0 < decisions[5].retry_after <= 12
+
+    @pytest.mark.asyncio
+    async def test_route_cost(self, limiter):
+        """测试昂贵路由消耗更多额度"""
+        first = await limiter.check(
+            "user:1", "default", "/api/v1/compatibility/analyze"
+        )
+        second = await limiter.check(
+            "user:1", "default", "/api/v1/compatibility/analyze"
+        )
+
+        assert first.allowed and first.remaining == 2
+        assert not second.allowed
+
+    @pytest.mark.asyncio
+    async def test_users_limited_separately(self, limiter):
+        """测试不同用户的额度相互独立"""
+        for _ in range(5):
+            await limiter.check("user:1", "default", "/api/v1/fortune/daily")
+
+        decision = await limiter.check("user:2", "default", "/api/v1/fortune/daily")
+
+        assert decision.allowed
+
+    @pytest.mark.asyncio
+    async def test_premium_tier_from_active_subscription(
+        self, limiter, mock_supabase_client
+    ):
+        """测试有效订阅的用户为高级等级，并缓存结果"""
+        end_date = (datetime.now(UTC) + timedelta(days=3)).isoformat()
+        mock_supabase_client.table.return_value.execute.return_value.data = [
+            {"end_date": end_date}
+        ]
+
+        assert await limiter.tier("user-1") == "premium"
+        assert await limiter.tier("user-1") == "premium"
+        assert mock_supabase_client.table.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_or_missing_subscription_is_default(
+        self, limiter, mock_supabase_client
+    ):
+        """测试过期或没有订阅的用户为默认等级"""
+        table = mock_supabase_client.table.return_value
+        table.execute.return_value.data = [
+            {"end_date": (datetime.now(UTC) - timedelta(days=1)).isoformat()}
+        ]
+        assert await limiter.tier("user-1") == "default"
+
+        table.execute.return_value.data = []
+        assert await limiter.tier("user-2") == "default"
+
+
+class TestRedisBackend:
+    """RedisBackend测试类"""
+
+    @pytest.mark.asyncio
+    async def test_shared_state_between_instances(self):
+        """测试多个实例通过Redis共享额度"""
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        server = fakeredis.FakeServer()
+        first = RateLimiter(default_limit="3/minute", costs={})
+        second = RateLimiter(default_limit="3/minute", costs={})
+        first.use_redis(fakeredis.FakeAsyncRedis(server=server))
+        second.use_redis(fakeredis.FakeAsyncRedis(server=server))
+
+        results = [
+            (await limiter.check("user:1", "default", "/x")).allowed
+            for limiter in (first, second, first, second)
+        ]
+
+        assert results == [True, True, True, False]
+
+    @pytest.mark.asyncio
+    async def test_rejected_request_spends_nothing(self):
+        """测试被拒绝的请求不消耗任何限制的额度"""
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        redis = fakeredis.FakeAsyncRedis()
+        backend = RedisBackend(redis)
+        limits = [RateLimit.parse("100/hour"), RateLimit.parse("2/minute")]
+
+        await backend.check(["a:hour", "a:minute"], limits, 2)
+        hour_tat = await redis.get("aura:ratelimit:a:hour")
+        decision = await backend.check(["a:hour", "a:minute"], limits, 1)
+
+        assert not decision.allowed
+        assert decision.retry_after > 0
+        assert await redis.get("aura:ratelimit:a:hour") == hour_tat
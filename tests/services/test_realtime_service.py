@@ -0,0 +1,84 @@
+"""
+RealtimeHub单元测试
+"""
+import asyncio
+import json
+from uuid import uuid4
+
+import pytest
+
+from src.services.realtime import LocalBackend, RealtimeHub
+
+
+class TestRealtimeHub:
+    """RealtimeHub测试类"""
+
+    @pytest.fixture
+    async def hub(self):
+        """创建使用内存后端的hub"""
+        hub = RealtimeHub(backend=LocalBackend(), queue_size=2, max_dropped=3)
+        await hub.start()
+        yield hub
+        await hub.stop()
+
+    async def _next(self, subscription):
+        return json.loads(await asyncio.wait_for(subscription.__anext__(), timeout=1))
+
+    @pytest.mark.asyncio
+    async def test_fan_out_to_session_and_user(self, hub, sample_user_id):
+        """测试消息推送到同一会话的多个设备和用户级订阅"""
+        session_id = str(uuid4())
+        phone = hub.subscribe(session_id=session_id)
+        tablet = hub.subscribe(session_id=session_id)
+        inbox = hub.subscribe(user_id=sample_user_id)
+        other = hub.subscribe(session_id=str(uuid4()))
+
+        await hub.publish_message(sample_user_id, session_id, {"content": "你的塔罗结果已生成"})
+
+        for subscription in (phone, tablet, inbox):
+            event = await self._next(subscription)
+            assert event["type"] == "chat_message"
+            assert event["session_id"] == session_id
+            assert event["message"]["content"] == "你的塔罗结果已生成"
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(other.__anext__(), timeout=0.05)
+
+    @pytest.mark.asyncio
+    async def test_slow_consumer_drops_oldest(self, hub, sample_user_id):
+        """测试慢消费者丢弃最旧消息"""
+        session_id = str(uuid4())
+        subscription = hub.subscribe(session_id=session_id)
+
+        for i in range(4):
+            await hub.publish_message(sample_user_id, session_id, {"content": str(i)})
+
+        assert subscription.dropped == 2
+        assert subscription.overflowed is False
+        assert (await self._next(subscription))["message"]["content"] == "2"
+        assert (await self._next(subscription))["message"]["content"] == "3"
+
+    @pytest.mark.asyncio
+    async def test_slow_consumer_overflow_ends_subscription(self, hub, sample_user_id):
+        """测试积压过多时结束订阅"""
+        session_id = str(uuid4())
+        subscription = hub.subscribe(session_id=session_id)
+
+        for i in range(10):
+            await hub.publish_message(sample_user_id, session_id, {"content": str(i)})
+
+        assert subscription.overflowed is True
+        received = [payload async for payload in subscription]
+        assert len(received) <= 2
+
+    @pytest.mark.asyncio
+    async def test_unsubscribe(self, hub, sample_user_id):
+        """测试取消订阅后不再接收消息"""
+        session_id = str(uuid4())
+        subscription = hub.subscribe(session_id=session_id)
+        hub.unsubscribe(subscription)
+
+        await hub.publish_message(sample_user_id, session_id, {"content": "hi"})
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(subscription.__anext__(), timeout=0.05)
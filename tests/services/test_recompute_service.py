@@ -0,0 +1,121 @@
+"""
+RecomputeSweeper单元测试
+"""
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+
+from src.services.algorithm import AlgorithmResult
+from src.services.recompute import RecomputeSweeper
+
+
+class TestRecomputeSweeper:
+    """RecomputeSweeper测试类"""
+
+    @pytest.fixture
+    def db_client(self):
+        """所有查询构造方法都返回自身的mock客户端"""
+        client = MagicMock()
+        query = client.table.return_value
+        for method in ("select", "eq", "gt", "gte", "or_", "order", "limit", "update"):
+            getattr(query, method).return_value = query
+        return client
+
+    def _responses(self, db_client, *rows_list):
+        responses = []
+        for rows in rows_list:
+            response = MagicMock()
+            response.data = rows
+            responses.append(response)
+        db_client.table.return_value.execute.side_effect = responses
+
+    @pytest.fixture
+    def sweeper(self, db_client):
+        return RecomputeSweeper(db_client, interval=0, rate=0, batch_size=10)
+
+    @pytest.mark.asyncio
+    async def test_stale_fortune_refreshed(self, sweeper, db_client, sample_user_id):
+        """测试旧版本运势被重新计算并更新"""
+        fortune_id = str(uuid4())
+        self._responses(
+            db_client,
+            [
+                {
+                    "id": fortune_id,
+                    "user_id": sample_user_id,
+                    "fortune_date": "2030-01-01",
+                }
+            ],
+            [{"id": sample_user_id, "birth_year": 1995}],
+            [{"id": fortune_id}],
+        )
+        refreshed = AlgorithmResult({"luck_level": "吉"}, version="2")
+
+        with patch(
+            "src.services.recompute.fortune_service._generate_daily_fortune",
+            AsyncMock(return_value=refreshed),
+        ):
+            assert await sweeper.sweep_daily_fortunes("2") == 1
+
+        query = db_client.table.return_value
+        query.or_.assert_called_once_with(
+            'algorithm_version.is.null,algorithm_version.neq."2"'
+        )
+        update = query.update.call_args[0][0]
+        assert update["fortune_data"] == {"luck_level": "吉"}
+        assert update["algorithm_version"] == "2"
+
+    @pytest.mark.asyncio
+    async def test_fallback_result_not_written(
+        self, sweeper, db_client, sample_user_id
+    ):
+        """测试算法服务不可用时不覆盖原结果"""
+        self._responses(
+            db_client,
+            [
+                {
+                    "id": str(uuid4()),
+                    "user_id": sample_user_id,
+                    "fortune_date": "2030-01-01",
+                }
+            ],
+            [],
+        )
+
+        with patch(
+            "src.services.recompute.fortune_service._generate_daily_fortune",
+            AsyncMock(return_value=AlgorithmResult({"luck_level": "平"})),
+        ):
+            assert await sweeper.sweep_daily_fortunes("2") == 0
+
+        db_client.table.return_value.update.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_cursor_moves_past_skipped_rows(self, db_client):
+        """测试无法重新计算的行不会阻塞后续扫描"""
+        sweeper = RecomputeSweeper(db_client, interval=0, rate=0, batch_size=2)
+        # 没有嵌入其他人档案的行会被跳过
+        first_batch = [{"id": "a", "other_profiles": []}, {"id": "b"}]
+        self._responses(db_client, first_batch, [{"id": "c"}], [])
+
+        assert await sweeper.sweep_compatibility("2") == 0
+        assert await sweeper.sweep_compatibility("2") == 0
+        assert await sweeper.sweep_compatibility("2") == 0
+
+        query = db_client.table.return_value
+        query.order.assert_called_with("id")
+        assert query.gt.call_args_list == [(("id", "b"),)]
+        assert sweeper._cursors["compatibility_analysis_results"] is None
+
+    @pytest.mark.asyncio
+    async def test_run_once_isolates_failures(self, sweeper):
+        """测试单个表扫描失败不影响其他表"""
+        with patch.object(
+            sweeper, "sweep_profile_analyses", AsyncMock(side_effect=Exception("x"))
+        ), patch.object(
+            sweeper, "sweep_daily_fortunes", AsyncMock(return_value=2)
+        ), patch.object(
+            sweeper, "sweep_compatibility", AsyncMock(return_value=1)
+        ):
+            assert await sweeper.run_once() == 3
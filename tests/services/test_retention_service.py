@@ -0,0 +1,66 @@
+"""
+AnalysisRetentionJob单元测试
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.services.retention import MAX_BATCHES_PER_RUN, AnalysisRetentionJob
+
+
+class TestAnalysisRetentionJob:
+    """AnalysisRetentionJob测试类"""
+
+    @pytest.fixture
+    def db_client(self):
+        return MagicMock()
+
+    def _respond(self, db_client, *deleted_counts):
+        responses = []
+        for count in deleted_counts:
+            response = MagicMock()
+            response.data = count
+            responses.append(response)
+        db_client.rpc.return_value.execute.side_effect = responses
+
+    @pytest.mark.asyncio
+    async def test_run_once_passes_retention_settings(self, db_client):
+        """测试压缩调用携带保留配置"""
+        self._respond(db_client, 3)
+        job = AnalysisRetentionJob(
+            db_client, keep_latest=2, min_age_days=7, batch_size=100, interval=0
+        )
+
+        deleted = await job.run_once()
+
+        assert deleted == 3
+        db_client.rpc.assert_called_once_with(
+            "compact_user_profiles_analysis",
+            {"keep_latest": 2, "min_age": "7 days", "batch_size": 100},
+        )
+
+    @pytest.mark.asyncio
+    async def test_run_once_drains_backlog_in_batches(self, db_client):
+        """测试积压时连续分批删除直到不足一批"""
+        self._respond(db_client, 10, 10, 4)
+        job = AnalysisRetentionJob(db_client, batch_size=10, interval=0)
+
+        assert await job.run_once() == 24
+        assert db_client.rpc.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_run_once_caps_batches_per_run(self, db_client):
+        """测试单次运行的批次数有上限"""
+        self._respond(db_client, *([10] * (MAX_BATCHES_PER_RUN + 5)))
+        job = AnalysisRetentionJob(db_client, batch_size=10, interval=0)
+
+        assert await job.run_once() == 10 * MAX_BATCHES_PER_RUN
+
+    @pytest.mark.asyncio
+    async def test_zero_interval_disables_schedule(self, db_client):
+        """测试间隔为0时不调度任务"""
+        job = AnalysisRetentionJob(db_client, interval=0)
+
+        job.start()
+        assert job._task is None
+        await job.stop()
@@ -0,0 +1,132 @@
+"""
+AlgorithmScheduler单元测试
+"""
+import asyncio
+
+import pytest
+
+from src.services.scheduler import AlgorithmScheduler, Priority, PriorityLimiter
+
+
+class TestPriorityLimiter:
+    """PriorityLimiter测试类"""
+
+    @pytest.mark.asyncio
+    async def test_higher_priority_admitted_first(self):
+        """测试交互请求优先于后台任务获得空闲槽位"""
+        limiter = PriorityLimiter(1)
+        await limiter.acquire(Priority.NORMAL)
+
+        admitted = []
+
+        async def waiter(name, priority):
+            await limiter.acquire(priority)
+            admitted.append(name)
+            limiter.release()
+
+        tasks = [
+            asyncio.create_task(waiter("background-1", Priority.BACKGROUND)),
+            asyncio.create_task(waiter("background-2", Priority.BACKGROUND)),
+            asyncio.create_task(waiter("chat", Priority.INTERACTIVE)),
+        ]
+        await asyncio.sleep(0)
+        assert limiter.queued(Priority.BACKGROUND) == 2
+        assert limiter.queued(Priority.INTERACTIVE) == 1
+
+        limiter.release()
+        await asyncio.gather(*tasks)
+
+        assert admitted == ["chat", "background-1", "background-2"]
+        assert limiter.active == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        """测试取消等待的调用不会占用槽位"""
+        limiter = PriorityLimiter(1)
+        await limiter.acquire(Priority.NORMAL)
+
+        task = asyncio.create_task(limiter.acquire(Priority.BACKGROUND))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert limiter.queued(Priority.BACKGROUND) == 0
+        limiter.release()
+        assert limiter.active == 0
+
+
+class TestAlgorithmScheduler:
+    """AlgorithmScheduler测试类"""
+
+    @pytest.mark.asyncio
+    async def test_endpoint_limit_and_metrics(self):
+        """测试单个接口的并发上限及队列指标"""
+        scheduler = AlgorithmScheduler(
+            total_limit=10, default_limit=5, endpoint_limits={"/slow": 1}
+        )
+        release = asyncio.Event()
+
+        async def call(endpoint, priority=Priority.NORMAL):
+            async with scheduler.slot(endpoint, priority):
+                await release.wait()
+
+        first = asyncio.create_task(call("/slow"))
+        second = asyncio.create_task(call("/slow", Priority.BACKGROUND))
+        other = asyncio.create_task(call("/fast"))
+        await asyncio.sleep(0)
+
+        metrics = scheduler.metrics()
+        assert metrics["endpoints"]["/slow"]["active"] == 1
+        assert metrics["endpoints"]["/slow"]["queued"]["background"] == 1
+        assert metrics["endpoints"]["/fast"]["active"] == 1
+        assert metrics["total"]["active"] == 2
+
+        release.set()
+        await asyncio.gather(first, second, other)
+
+        metrics = scheduler.metrics()
+        assert metrics["total"]["active"] == 0
+        assert metrics["endpoints"]["/slow"]["wait"]["background"]["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_total_limit_shared_across_endpoints(self):
+        """测试总并发上限跨接口共享"""
+        scheduler = AlgorithmScheduler(
+            total_limit=1, default_limit=5, endpoint_limits={}
+        )
+        release = asyncio.Event()
+
+        async def call(endpoint):
+            async with scheduler.slot(endpoint, Priority.NORMAL):
+                await release.wait()
+
+        tasks = [asyncio.create_task(call("/a")), asyncio.create_task(call("/b"))]
+        await asyncio.sleep(0)
+
+        assert scheduler.metrics()["total"]["queued"]["normal"] == 1
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert scheduler.metrics()["total"]["active"] == 0
+
+    @pytest.mark.asyncio
+    async def test_reserved_endpoint_slot(self):
+        """测试预留的接口槽位不占总槽位，发送时不再重复获取"""
+        scheduler = AlgorithmScheduler(
+            total_limit=10, default_limit=5, endpoint_limits={"/a": 1}
+        )
+
+        async with scheduler.reserve("/a", Priority.NORMAL):
+            metrics = scheduler.metrics()
+            assert metrics["endpoints"]["/a"]["active"] == 1
+            assert metrics["total"]["active"] == 0
+
+            async with scheduler.slot("/a", Priority.NORMAL, reserved=True):
+                metrics = scheduler.metrics()
+                assert metrics["endpoints"]["/a"]["active"] == 1
+                assert metrics["total"]["active"] == 1
+
+        metrics = scheduler.metrics()
+        assert metrics["endpoints"]["/a"]["active"] == 0
+        assert metrics["total"]["active"] == 0
@@ -0,0 +1,109 @@
+"""
+BlockingWatchdog单元测试
+"""
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from src.utils.metrics import REGISTRY
+from src.utils.watchdog import (
+    BlockingWatchdog,
+    _table,
+    route_scope,
+    track_postgrest,
+)
+
+
+def blocking_helper(seconds):
+    """模拟在协程中调用的同步阻塞代码"""
+    time.sleep(seconds)
+
+
+class TestBlockingWatchdog:
+    """BlockingWatchdog测试类"""
+
+    @pytest.mark.asyncio
+    async def test_reports_blocking_stack_with_route(self):
+        """测试阻塞超过阈值时记录调用栈和路由"""
+        watchdog = BlockingWatchdog(threshold=0.05)
+        watchdog.start()
+        try:
+            with route_scope("POST /api/v1/compatibility/analyze"):
+                await asyncio.sleep(0.06)
+                blocking_helper(0.3)
+            await asyncio.sleep(0.06)
+        finally:
+            watchdog.stop()
+
+        assert len(watchdog.reports) == 1
+        report = watchdog.reports[0]
+        assert report.route == "POST /api/v1/compatibility/analyze"
+        assert "blocking_helper" in report.stack
+        assert report.blocked_for > 0.05
+
+    @pytest.mark.asyncio
+    async def test_no_report_for_cooperative_code(self):
+        """测试未阻塞事件循环时不产生报告"""
+        watchdog = BlockingWatchdog(threshold=0.05)
+        watchdog.start()
+        try:
+            await asyncio.sleep(0.2)
+        finally:
+            watchdog.stop()
+
+        assert watchdog.reports == []
+
+    @pytest.mark.asyncio
+    async def test_reports_postgrest_table(self):
+        """测试阻塞发生在PostgREST调用中时记录表名"""
+
+        def slow_handler(request):
+            time.sleep(0.3)
+            return httpx.Response(200, json=[])
+
+        session = httpx.Client(transport=httpx.MockTransport(slow_handler))
+        supabase = MagicMock()
+        supabase.postgrest.session = session
+        track_postgrest(supabase)
+        before = (
+            REGISTRY.get_sample_value(
+                "aura_event_loop_blocks_total", {"table": "profiles"}
+            )
+            or 0
+        )
+
+        watchdog = BlockingWatchdog(threshold=0.05)
+        watchdog.start()
+        try:
+            await asyncio.sleep(0.06)
+            session.get("https://db.example.com/rest/v1/profiles?select=id")
+            await asyncio.sleep(0.06)
+        finally:
+            watchdog.stop()
+
+        assert [report.table for report in watchdog.reports] == ["profiles"]
+        assert (
+            REGISTRY.get_sample_value(
+                "aura_event_loop_blocks_total", {"table": "profiles"}
+            )
+            == before + 1
+        )
+
+    def test_postgrest_table_cleared_after_transport_error(self):
+        """测试PostgREST调用失败后不再记录该表"""
+
+        def refuse(request):
+            raise httpx.ConnectError("connection refused", request=request)
+
+        session = httpx.Client(transport=httpx.MockTransport(refuse))
+        supabase = MagicMock()
+        supabase.postgrest.session = session
+        track_postgrest(supabase)
+
+        with pytest.raises(httpx.ConnectError):
+            session.get("https://db.example.com/rest/v1/profiles?select=id")
+
+        assert _table.get() is None